@@ -0,0 +1,100 @@
+"""
+Admin building blocks for tables that grow to millions of rows.
+"""
+
+from django.contrib import admin
+from django.contrib.admin.views.main import SEARCH_VAR
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Func, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils.functional import cached_property
+
+
+def subquery_sum(queryset, expression, output_field):
+    """
+    Sum ``expression`` over ``queryset`` as a correlated scalar subquery.
+
+    ``queryset`` is filtered on an ``OuterRef``. Unlike a JOIN + GROUP BY
+    annotation, the subquery only runs for the rows of the displayed page.
+    """
+    total = Func(expression, function="SUM", output_field=output_field)
+    return Coalesce(
+        Subquery(queryset.order_by().annotate(total=total).values("total")),
+        Value(0),
+        output_field=output_field,
+    )
+
+
+def estimated_count(queryset):
+    """
+    Return the planner's row estimate for the table of ``queryset``.
+
+    Only PostgreSQL keeps one (refreshed by autovacuum/ANALYZE); ``None`` is
+    returned for other databases and for tables never analyzed.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that does not ``COUNT(*)`` unfiltered large tables.
+
+    Page links only need an approximate total, so unfiltered changelists use
+    the planner estimate. Filtered querysets and small tables are counted
+    exactly.
+    """
+
+    exact_count_below = 10000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, "query", None)
+        if query is not None and not query.where:
+            estimate = estimated_count(self.object_list)
+            if estimate is not None and estimate >= self.exact_count_below:
+                return estimate
+        return super().count
+
+
+class ScalableModelAdmin(admin.ModelAdmin):
+    """
+    ModelAdmin defaults for large tables.
+
+    Subclasses should also set ``list_select_related`` for the columns they
+    display and ``autocomplete_fields`` for their foreign keys. Searches
+    should only use columns with an index: exact primary keys (e.g.
+    ``"id__exact"``, used only when every search term is a number) or columns
+    with a trigram index (see ``config.db.operations.AddTrigramIndex``).
+    """
+
+    paginator = EstimatedCountPaginator
+    # Skip the second, unfiltered COUNT(*) shown next to filtered results
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        # Autocomplete results render str() of the rows as well
+        if isinstance(self.list_select_related, (list, tuple)):
+            queryset = queryset.select_related(*self.list_select_related)
+        return queryset
+
+    def get_search_fields(self, request):
+        search_fields = super().get_search_fields(request)
+        # Changelists search with ?q=, autocomplete widgets with ?term=
+        term = request.GET.get(SEARCH_VAR) or request.GET.get("term", "")
+        if all(bit.isdigit() for bit in term.split()):
+            return search_fields
+        return tuple(field for field in search_fields if not field.endswith("id__exact"))
@@ -0,0 +1,230 @@
+"""
+Helpers shared by the ``benchmark_*`` management commands.
+
+Benchmarks run in-process against a throwaway test database, record latency,
+CPU time, database queries and allocations per call, and write their summary
+as JSON so that results can be compared between commits.
+"""
+
+import json
+import math
+import platform
+import re
+import subprocess
+import time
+import tracemalloc
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.db import connections
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from config.metrics import QueryCounter
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = PROJECT_DIR / "bench_results"
+
+
+WRITE_RE = re.compile(
+    r'^\s*(INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+"?(\w+)"?', re.IGNORECASE
+)
+
+
+class WriteCounter:
+    """
+    Execute wrapper counting INSERT, UPDATE and DELETE statements per table.
+    """
+
+    def __init__(self):
+        self.writes = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        match = WRITE_RE.match(sql)
+        if match:
+            statement = f"{match.group(1).split()[0].upper()} {match.group(2)}"
+            self.writes[statement] = self.writes.get(statement, 0) + 1
+        return execute(sql, params, many, context)
+
+    @property
+    def total(self):
+        return sum(self.writes.values())
+
+
+def percentile(values, pct):
+    """
+    Return the ``pct`` percentile of ``values`` using linear interpolation.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    if low == high:
+        return ordered[low]
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+@contextmanager
+def benchmark_database(keepdb=False, verbosity=0):
+    """
+    Create the test databases for the duration of a benchmark run.
+    """
+    setup_test_environment()
+    old_config = setup_databases(verbosity, interactive=False, keepdb=keepdb)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity, keepdb=keepdb)
+        teardown_test_environment()
+
+
+class BenchmarkRecorder:
+    """
+    Collect per-call samples for named scenarios.
+    """
+
+    def __init__(self, trace_allocations=True):
+        self.trace_allocations = trace_allocations
+        self.samples = {}
+
+    @contextmanager
+    def measure(self, scenario):
+        """
+        Measure the wrapped block as one sample of ``scenario``.
+
+        Yields a dict in which the block may set ``ok`` to ``False`` to count
+        the call as an error.
+        """
+        sample = {"ok": True}
+        counter = QueryCounter()
+
+        if self.trace_allocations:
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            start = time.perf_counter()
+            cpu_start = time.process_time()
+            yield sample
+            sample["cpu_seconds"] = time.process_time() - cpu_start
+            sample["seconds"] = time.perf_counter() - start
+
+        sample["queries"] = counter.count
+        sample["query_seconds"] = counter.duration
+        if self.trace_allocations:
+            sample["peak_bytes"] = tracemalloc.get_traced_memory()[1] - start_memory
+
+        self.samples.setdefault(scenario, []).append(sample)
+
+    @contextmanager
+    def running(self):
+        if self.trace_allocations:
+            tracemalloc.start()
+        try:
+            yield self
+        finally:
+            if self.trace_allocations:
+                tracemalloc.stop()
+
+    def summary(self):
+        results = {}
+
+        for scenario, samples in self.samples.items():
+            latencies = [sample["seconds"] * 1000 for sample in samples]
+            cpu = [sample["cpu_seconds"] * 1000 for sample in samples]
+            queries = [sample["queries"] for sample in samples]
+            result = {
+                "calls": len(samples),
+                "errors": sum(1 for sample in samples if not sample["ok"]),
+                "p50_ms": percentile(latencies, 50),
+                "p95_ms": percentile(latencies, 95),
+                "p99_ms": percentile(latencies, 99),
+                "mean_ms": sum(latencies) / len(latencies),
+                "cpu_p50_ms": percentile(cpu, 50),
+                "cpu_mean_ms": sum(cpu) / len(cpu),
+                "queries_per_call": sum(queries) / len(queries),
+                "max_queries": max(queries),
+            }
+            if self.trace_allocations:
+                peaks = [sample["peak_bytes"] for sample in samples]
+                result["peak_alloc_kib_p50"] = percentile(peaks, 50) / 1024
+                result["peak_alloc_kib_max"] = max(peaks) / 1024
+            results[scenario] = result
+
+        return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_DIR,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def write_results(name, results, parameters, output=None):
+    """
+    Write ``results`` to ``output`` or to ``bench_results/<name>-<rev>-<ts>.json``.
+
+    Returns the path written to.
+    """
+    revision = git_revision()
+    now = datetime.now(timezone.utc)
+
+    if output is None:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        output = RESULTS_DIR / f"{name}-{revision}-{now:%Y%m%dT%H%M%S}.json"
+
+    document = {
+        "benchmark": name,
+        "revision": revision,
+        "created_at": now.isoformat(),
+        "python": platform.python_version(),
+        "parameters": parameters,
+        "results": results,
+    }
+    Path(output).write_text(json.dumps(document, indent=2))
+    return output
+
+
+def format_results(results):
+    """
+    Render ``BenchmarkRecorder.summary()`` as a fixed-width table.
+    """
+    columns = (
+        "calls",
+        "errors",
+        "p50_ms",
+        "p95_ms",
+        "p99_ms",
+        "cpu_p50_ms",
+        "queries_per_call",
+    )
+    if any("peak_alloc_kib_p50" in result for result in results.values()):
+        columns += ("peak_alloc_kib_p50",)
+
+    width = max([len("scenario")] + [len(name) for name in results])
+    lines = [
+        "scenario".ljust(width) + "".join(column.rjust(19) for column in columns)
+    ]
+    for name, result in results.items():
+        cells = []
+        for column in columns:
+            value = result[column]
+            cells.append(
+                (f"{value:.2f}" if isinstance(value, float) else str(value)).rjust(19)
+            )
+        lines.append(name.ljust(width) + "".join(cells))
+    return "\n".join(lines)
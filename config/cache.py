@@ -0,0 +1,80 @@
+"""
+Direct Redis access for data that does not fit Django's cache API.
+
+Django's ``RedisCache`` only offers ``aget``/``aset`` as thread-pool wrappers
+around the blocking client. Async views use the ``redis.asyncio`` client
+instead, which shares the event loop of the uvicorn worker. Sync code that
+needs native Redis types (hashes, scripts, TTLs) uses ``get_redis``.
+"""
+
+import asyncio
+import logging
+import weakref
+
+import redis
+from django.conf import settings
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+# redis.asyncio clients are bound to the event loop that created them
+_clients = weakref.WeakKeyDictionary()
+# Blocking clients are thread safe, one connection pool per URL and process
+_sync_clients = {}
+
+
+def get_redis(url):
+    """
+    Return the process wide blocking Redis client for ``url``.
+    """
+    client = _sync_clients.get(url)
+    if client is None:
+        client = redis.Redis.from_url(
+            url, socket_connect_timeout=0.5, socket_timeout=0.5
+        )
+        _sync_clients[url] = client
+    return client
+
+
+def get_async_redis():
+    """
+    Return the async Redis client for the running event loop, or ``None``
+    when ``ASYNC_REDIS_URL`` is not configured.
+    """
+    url = getattr(settings, "ASYNC_REDIS_URL", None)
+    if not url:
+        return None
+
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = aioredis.Redis.from_url(
+            url,
+            socket_connect_timeout=0.5,
+            socket_timeout=0.5,
+            max_connections=getattr(settings, "ASYNC_REDIS_MAX_CONNECTIONS", 100),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def aget_bytes(key):
+    client = get_async_redis()
+    if client is None:
+        return None
+    try:
+        return await client.get(key)
+    except RedisError:
+        logger.warning("Async cache read failed", exc_info=True)
+        return None
+
+
+async def aset_bytes(key, value, timeout):
+    client = get_async_redis()
+    if client is None:
+        return
+    try:
+        await client.set(key, value, ex=timeout)
+    except RedisError:
+        logger.warning("Async cache write failed", exc_info=True)
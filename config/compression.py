@@ -0,0 +1,92 @@
+"""
+Response compression with brotli or gzip, negotiated from ``Accept-Encoding``.
+
+Brotli is used when the ``brotli`` package is installed and the client accepts
+it, gzip otherwise. Only bodies of at least ``COMPRESSION_MIN_SIZE`` bytes and
+with a content type listed in ``COMPRESSION_CONTENT_TYPES`` are compressed, and
+they are sent as they are when compressing does not make them smaller.
+The allowlist leaves out HTML pages, which carry CSRF tokens and could leak
+them through the compressed size (BREACH).
+"""
+
+import gzip
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Supported encodings, preferred first
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def parse_accept_encoding(header):
+    """
+    Return the ``{coding: q}`` weights of an ``Accept-Encoding`` header.
+    """
+    weights = {}
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+    return weights
+
+
+def choose_encoding(header):
+    """
+    Return the encoding to use for a request's ``Accept-Encoding``, or ``None``.
+
+    The coding with the highest weight wins, ties go to the preferred one.
+    """
+    if not header:
+        return None
+    weights = parse_accept_encoding(header)
+    default = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        q = weights.get(encoding, default)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def is_compressible(content_type):
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return media_type in settings.COMPRESSION_CONTENT_TYPES
+
+
+def compress(body, encoding):
+    """
+    Return ``body`` compressed with ``encoding`` (``"br"`` or ``"gzip"``).
+    """
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    # mtime=0 keeps the output identical for identical bodies
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def encode(body, encoding):
+    """
+    Return ``(body, encoding)`` to send ``body`` to a client accepting ``encoding``.
+
+    The encoding is ``None``, and ``body`` unchanged, when ``encoding`` is
+    ``None``, the body is under ``COMPRESSION_MIN_SIZE`` or compressing it
+    does not make it smaller.
+    """
+    if encoding is None or len(body) < settings.COMPRESSION_MIN_SIZE:
+        return body, None
+    compressed = compress(body, encoding)
+    if len(compressed) >= len(body):
+        return body, None
+    return compressed, encoding
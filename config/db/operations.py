@@ -0,0 +1,86 @@
+"""
+Migration operations for PostgreSQL specific schema objects.
+
+They are no-ops, or fall back to the plain operation, on other databases
+(SQLite in development), so migrations using them still apply everywhere.
+"""
+
+from django.contrib.postgres import operations
+from django.db.migrations.operations import AddIndex
+from django.db.migrations.operations.base import Operation
+
+
+class AddIndexConcurrently(operations.AddIndexConcurrently):
+    """
+    ``AddIndexConcurrently`` creating a plain index on other databases.
+
+    Building the index does not lock the table against writes on PostgreSQL.
+    Migrations using it must set ``atomic = False``.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return AddIndex.database_forwards(
+                self, app_label, schema_editor, from_state, to_state
+            )
+        return super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return AddIndex.database_backwards(
+                self, app_label, schema_editor, from_state, to_state
+            )
+        return super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class AddTrigramIndex(Operation):
+    """
+    Concurrently create a ``pg_trgm`` GIN index on ``UPPER(column::text)``.
+
+    That is the expression Django generates for ``icontains``/``istartswith``
+    lookups on PostgreSQL, so admin and API searches on the column can use the
+    index. Migrations using it must set ``atomic = False``.
+    """
+
+    reversible = True
+
+    def __init__(self, model, field, name):
+        self.model = model
+        self.field = field
+        self.name = name
+
+    def deconstruct(self):
+        return (
+            self.__class__.__qualname__,
+            [],
+            {"model": self.model, "field": self.field, "name": self.name},
+        )
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        opts = to_state.apps.get_model(self.model)._meta
+        column = opts.get_field(self.field).column
+        quote = schema_editor.quote_name
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {quote(self.name)} "
+            f"ON {quote(opts.db_table)} USING gin (UPPER({quote(column)}::text) gin_trgm_ops)"
+        )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        schema_editor.execute(
+            f"DROP INDEX CONCURRENTLY IF EXISTS {schema_editor.quote_name(self.name)}"
+        )
+
+    def describe(self):
+        return f"Create trigram index {self.name} on {self.model}.{self.field}"
+
+    @property
+    def migration_name_fragment(self):
+        return self.name.lower()
@@ -0,0 +1,22 @@
+"""
+PostgreSQL backend recording how long it takes to open new connections.
+
+With persistent connections (CONN_MAX_AGE) new connections should be rare;
+a rising connect rate or connect time points at connection churn or at an
+exhausted pgbouncer/PostgreSQL pool.
+"""
+
+import time
+
+from django.db.backends.postgresql import base
+
+from config.metrics import DB_CONNECT_SECONDS
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            DB_CONNECT_SECONDS.labels(self.alias).observe(time.perf_counter() - start)
@@ -0,0 +1,142 @@
+"""
+Read replica routing.
+
+Views opt in with ``ReplicaReadMixin``: for their safe requests a replica is
+picked once per request (weighted by ``DATABASE_REPLICAS``) and every read
+made while handling that request goes to it. Everything else, including all
+writes and any read inside a transaction, uses the primary.
+
+Users who just wrote something are pinned to the primary for
+``REPLICA_PIN_SECONDS`` (see ``ReadYourWritesMiddleware``) so that they see
+their own cart, order and address changes even if the replicas lag.
+"""
+
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+from config.metrics import DB_REPLICA_LAG_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Alias of the replica serving the current request, if any
+read_alias = ContextVar("read_alias", default=None)
+
+LAG_QUERIES = {
+    "postgresql": (
+        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+        "THEN 0 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+    ),
+}
+
+# alias -> (checked_at, healthy), per process
+_replica_health = {}
+
+
+def pin_key(user_id):
+    return f"replica-pin:{user_id}"
+
+
+def get_replica_lag(alias):
+    """
+    Return the replication lag of ``alias`` in seconds.
+
+    Backends without a lag query (e.g. two local SQLite files) report 0.
+    """
+    connection = connections[alias]
+    query = LAG_QUERIES.get(connection.vendor)
+    if query is None:
+        return 0.0
+
+    with connection.cursor() as cursor:
+        cursor.execute(query)
+        lag = cursor.fetchone()[0]
+    return float(lag or 0)
+
+
+def is_replica_healthy(alias):
+    """
+    Check, at most every REPLICA_LAG_CHECK_SECONDS, that ``alias`` answers and
+    lags less than REPLICA_MAX_LAG_SECONDS behind the primary.
+    """
+    now = time.monotonic()
+    checked_at, healthy = _replica_health.get(alias, (None, True))
+    if checked_at is not None and now - checked_at < settings.REPLICA_LAG_CHECK_SECONDS:
+        return healthy
+
+    try:
+        lag = get_replica_lag(alias)
+    except DatabaseError:
+        logger.warning("Replica lag check failed", extra={"alias": alias}, exc_info=True)
+        healthy = False
+    else:
+        DB_REPLICA_LAG_SECONDS.labels(alias).set(lag)
+        healthy = lag <= settings.REPLICA_MAX_LAG_SECONDS
+        if not healthy:
+            logger.warning("Replica is lagging", extra={"alias": alias, "lag": lag})
+
+    _replica_health[alias] = (now, healthy)
+    return healthy
+
+
+def choose_replica():
+    """
+    Return a healthy replica alias picked by weight, or ``None``.
+    """
+    replicas = getattr(settings, "DATABASE_REPLICAS", {})
+    candidates = [alias for alias in replicas if is_replica_healthy(alias)]
+    if not candidates:
+        return None
+    weights = [replicas[alias] for alias in candidates]
+    return random.choices(candidates, weights)[0]
+
+
+class ReplicaRouter:
+    """
+    Route reads to the replica chosen for the current request.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+
+class ReplicaReadMixin:
+    """
+    ViewSet mixin serving the safe requests of ``replica_actions`` from a replica
+    """
+
+    replica_actions = ("list", "retrieve")
+
+    def initial(self, request, *args, **kwargs):
+        self._read_alias_token = None
+        super().initial(request, *args, **kwargs)
+
+        if request.method not in SAFE_METHODS or self.action not in self.replica_actions:
+            return
+        user = request.user
+        if user.is_authenticated and cache.get(pin_key(user.pk)):
+            return
+
+        self._read_alias_token = read_alias.set(choose_replica())
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if getattr(self, "_read_alias_token", None) is not None:
+            read_alias.reset(self._read_alias_token)
+            self._read_alias_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,58 @@
+"""
+Gunicorn configuration.
+
+Usage: gunicorn -c config/gunicorn.py
+
+With GUNICORN_ASYNC=True the ASGI application is served by uvicorn workers,
+each running an event loop instead of one thread per connection. Django's
+async ORM runs queries in per-request threads, so in that mode prefer
+DB_CONN_MAX_AGE=0 behind pgbouncer (DB_PGBOUNCER=True).
+
+Database connections: every worker thread keeps at most one persistent
+connection (DB_CONN_MAX_AGE). DB_MAX_CONNECTIONS is the number of connections
+this deployment may hold (its share of PostgreSQL max_connections, or the
+pgbouncer pool size); it is split across the workers as threads per worker so
+that the workers can never exhaust it.
+"""
+
+import os
+import shutil
+
+import decouple
+
+bind = decouple.config("GUNICORN_BIND", default="0.0.0.0:8000")
+workers = decouple.config("GUNICORN_WORKERS", default=1, cast=int)
+
+async_workers = decouple.config("GUNICORN_ASYNC", default=False, cast=bool)
+
+if async_workers:
+    wsgi_app = "config.asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+else:
+    wsgi_app = "config.wsgi:application"
+
+    db_max_connections = decouple.config("DB_MAX_CONNECTIONS", default=0, cast=int)
+    if db_max_connections:
+        threads = max(1, db_max_connections // workers)
+
+
+def on_starting(server):
+    if not async_workers:
+        server.log.info(
+            "Database connections: up to %s per worker, %s in total",
+            server.cfg.threads,
+            server.cfg.threads * server.cfg.workers,
+        )
+
+    # Start every deployment with a clean prometheus multiprocess directory
+    multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,208 @@
+"""
+Pooled outbound HTTP for third party APIs (Stripe, Twilio).
+
+Each service gets one ``requests.Session`` per process whose connections are
+kept alive and reused, so calls do not pay for TCP and TLS setup every time.
+Requests without an explicit timeout get ``(OUTBOUND_HTTP_CONNECT_TIMEOUT,
+OUTBOUND_HTTP_READ_TIMEOUT)``. Failures are retried with backoff, at most
+``OUTBOUND_HTTP_RETRIES`` times per request. Retries also draw from a budget
+per service, refilled by successful requests, so that an outage does not
+multiply the outbound traffic.
+
+Only connection errors are retried for non-idempotent methods (the request
+never reached the server). Latency, opened connections, requests in flight
+and retries are exported as Prometheus metrics.
+"""
+
+import os
+import threading
+import time
+
+from django.conf import settings
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+
+from config.metrics import (
+    OUTBOUND_HTTP_CONNECTIONS,
+    OUTBOUND_HTTP_IN_FLIGHT,
+    OUTBOUND_HTTP_LATENCY,
+    OUTBOUND_HTTP_RETRIES,
+)
+
+# Sessions are keyed by process id: pools must not be shared across a fork
+_sessions = {}
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to a fraction of the requests of a service.
+
+    Every request deposits ``ratio`` tokens, every retry takes one. The bucket
+    holds at most ``reserve`` tokens and starts full.
+    """
+
+    def __init__(self, ratio, reserve):
+        self.ratio = ratio
+        self.reserve = reserve
+        self.tokens = reserve
+        self.lock = threading.Lock()
+
+    def deposit(self):
+        with self.lock:
+            self.tokens = min(self.reserve, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self.lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class BudgetedRetry(Retry):
+    """
+    ``Retry`` that also needs a token of the service's ``RetryBudget``.
+    """
+
+    service = None
+    budget = None
+
+    def increment(self, method=None, url=None, response=None, error=None, **kwargs):
+        retry = super().increment(method, url, response, error, **kwargs)
+        if not self.budget.withdraw():
+            OUTBOUND_HTTP_RETRIES.labels(self.service, "budget_exhausted").inc()
+            raise MaxRetryError(
+                kwargs.get("_pool"), url, error or ResponseError("retry budget exhausted")
+            )
+        OUTBOUND_HTTP_RETRIES.labels(self.service, "retried").inc()
+        return retry
+
+
+def counted_pool(base, service):
+    """
+    Return a subclass of the urllib3 pool ``base`` counting opened connections.
+    """
+
+    class CountedPool(base):
+        def _new_conn(self):
+            OUTBOUND_HTTP_CONNECTIONS.labels(service).inc()
+            return super()._new_conn()
+
+    return CountedPool
+
+
+class PooledAdapter(HTTPAdapter):
+    """
+    ``HTTPAdapter`` with default timeouts and metrics for one service.
+    """
+
+    def __init__(self, service, timeout, budget, **kwargs):
+        self.service = service
+        self.timeout = timeout
+        self.budget = budget
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": counted_pool(HTTPConnectionPool, self.service),
+            "https": counted_pool(HTTPSConnectionPool, self.service),
+        }
+
+    def send(self, request, timeout=None, **kwargs):
+        if timeout is None:
+            timeout = self.timeout
+
+        status = "error"
+        in_flight = OUTBOUND_HTTP_IN_FLIGHT.labels(self.service)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            response = super().send(request, timeout=timeout, **kwargs)
+            status = response.status_code
+            if status < 500:
+                self.budget.deposit()
+            return response
+        finally:
+            in_flight.dec()
+            OUTBOUND_HTTP_LATENCY.labels(self.service, request.method, status).observe(
+                time.perf_counter() - start
+            )
+
+
+def timeout():
+    return (settings.OUTBOUND_HTTP_CONNECT_TIMEOUT, settings.OUTBOUND_HTTP_READ_TIMEOUT)
+
+
+def build_session(service):
+    retry_class = type(
+        "BudgetedRetry",
+        (BudgetedRetry,),
+        {
+            "service": service,
+            "budget": RetryBudget(
+                ratio=settings.OUTBOUND_HTTP_RETRY_RATIO,
+                reserve=settings.OUTBOUND_HTTP_RETRY_RESERVE,
+            ),
+        },
+    )
+    retries = settings.OUTBOUND_HTTP_RETRIES
+    adapter = PooledAdapter(
+        service,
+        timeout=timeout(),
+        budget=retry_class.budget,
+        pool_maxsize=settings.OUTBOUND_HTTP_POOL_SIZE,
+        max_retries=retry_class(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=0.2,
+            status_forcelist=(502, 503, 504),
+            raise_on_status=False,
+        ),
+    )
+    session = Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(service):
+    """
+    Return the pooled session of ``service`` for the current process.
+    """
+    key = (os.getpid(), service)
+    session = _sessions.get(key)
+    if session is None:
+        session = _sessions.setdefault(key, build_session(service))
+    return session
+
+
+def stripe_http_client():
+    """
+    Return a Stripe SDK HTTP client sending through the ``stripe`` session.
+    """
+    try:
+        from stripe import RequestsClient
+    except ImportError:  # stripe < 7
+        from stripe.http_client import RequestsClient
+
+    return RequestsClient(timeout=timeout(), session=get_session("stripe"))
+
+
+def get_twilio_client(account_sid, auth_token):
+    """
+    Return a Twilio REST client sending through the ``twilio`` session.
+    """
+    from twilio.http.http_client import TwilioHttpClient
+    from twilio.rest import Client
+
+    # No timeout here: Twilio only takes a number, the session's default
+    # (connect, read) timeout applies instead
+    http_client = TwilioHttpClient()
+    http_client.session = get_session("twilio")
+    return Client(account_sid, auth_token, http_client=http_client)
@@ -0,0 +1,140 @@
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord carries; anything else was passed through ``extra``
+RESERVED_ATTRS = frozenset(
+    vars(logging.LogRecord("", logging.NOTSET, "", 0, "", (), None)).keys()
+) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Render log records as one JSON object per line.
+
+    Values passed with ``extra={...}`` are emitted as top-level keys so that
+    log aggregators can index them without parsing the message.
+    """
+
+    def format(self, record):
+        data = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+
+        for key, value in record.__dict__.items():
+            if key not in RESERVED_ATTRS and not key.startswith("_"):
+                data[key] = value
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc_info"] = record.exc_text
+
+        return json.dumps(data, default=str)
+
+
+def level_number(level):
+    """
+    Return the number of a logging level given as a number or a name.
+    """
+    if isinstance(level, int):
+        return level
+    number = logging.getLevelName(str(level).upper())
+    if not isinstance(number, int):
+        raise ValueError(f"Unknown level: {level!r}")
+    return number
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Let through only a fraction of the records below ``always_level``.
+
+    Attach one instance per logger (or handler) in ``LOGGING`` to sample chatty
+    loggers on hot request paths while keeping every warning and error.
+    """
+
+    def __init__(self, rate=1.0, always_level="WARNING", name=""):
+        super().__init__(name)
+        self.rate = float(rate)
+        self.always_level = level_number(always_level)
+
+    def filter(self, record):
+        if record.levelno >= self.always_level or self.rate >= 1:
+            return True
+        return random.random() < self.rate
+
+
+class QueuedStreamHandler(QueueHandler):
+    """
+    Non-blocking stream handler.
+
+    The request thread only puts the record on a bounded in-memory queue; a
+    background ``QueueListener`` thread formats it and writes to the stream.
+    When the queue is full the record is dropped instead of blocking the
+    request, and the number of dropped records is kept in ``dropped``.
+
+    Threads do not survive ``fork()``, and gunicorn configures logging before
+    forking its workers, so the listener is started by the first record of
+    each process rather than here.
+    """
+
+    def __init__(self, stream=None, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.maxsize = maxsize
+        self.dropped = 0
+        self.target = logging.StreamHandler(stream)
+        self.listener = None
+        self.pid = None
+        self.start_lock = threading.Lock()
+
+    def start(self):
+        """
+        Start the listener thread of the current process, with a new queue.
+        """
+        with self.start_lock:
+            if self.pid == os.getpid():
+                return
+            self.queue = queue.Queue(self.maxsize)
+            self.listener = QueueListener(self.queue, self.target)
+            self.listener.start()
+            self.pid = os.getpid()
+
+    def setFormatter(self, fmt):
+        # Formatting happens on the listener thread
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self.pid != os.getpid():
+            self.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        # Called by ``logging.shutdown`` at exit; flushes what is still queued
+        if (
+            self.listener is not None
+            and self.pid == os.getpid()
+            and self.listener._thread is not None
+        ):
+            self.listener.stop()
+        self.target.close()
+        super().close()
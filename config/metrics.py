@@ -0,0 +1,130 @@
+import hmac
+import os
+import time
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+REQUEST_LATENCY = Histogram(
+    "django_view_latency_seconds",
+    "Time spent handling a request, per view",
+    ["view", "method", "status"],
+)
+REQUEST_QUERY_COUNT = Histogram(
+    "django_view_db_queries",
+    "Number of database queries executed per request",
+    ["view", "method"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, float("inf")),
+)
+REQUEST_QUERY_TIME = Histogram(
+    "django_view_db_query_seconds",
+    "Total time spent in database queries per request",
+    ["view", "method"],
+)
+RESPONSE_SIZE = Histogram(
+    "django_view_response_bytes",
+    "Size of the response body, per view",
+    ["view", "method"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, float("inf")),
+)
+DB_CONNECT_SECONDS = Histogram(
+    "django_db_connect_seconds",
+    "Time spent opening a new database connection (count = connections opened)",
+    ["alias"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, float("inf")),
+)
+DB_REPLICA_LAG_SECONDS = Gauge(
+    "django_db_replica_lag_seconds",
+    "Last measured replication lag of a read replica",
+    ["alias"],
+    multiprocess_mode="livemax",
+)
+OUTBOUND_HTTP_LATENCY = Histogram(
+    "outbound_http_request_seconds",
+    "Time spent on a request to a third party API, retries included",
+    ["service", "method", "status"],
+)
+OUTBOUND_HTTP_CONNECTIONS = Counter(
+    "outbound_http_connections_opened",
+    "Connections opened to third party APIs (requests minus reused connections)",
+    ["service"],
+)
+OUTBOUND_HTTP_IN_FLIGHT = Gauge(
+    "outbound_http_requests_in_flight",
+    "Requests to third party APIs waiting for a response",
+    ["service"],
+    multiprocess_mode="livesum",
+)
+OUTBOUND_HTTP_RETRIES = Counter(
+    "outbound_http_retries",
+    "Retries of requests to third party APIs, and retries refused by the budget",
+    ["service", "outcome"],
+)
+
+
+class QueryCounter:
+    """
+    Execute wrapper counting queries and the time spent running them.
+
+    Install with ``connection.execute_wrapper(QueryCounter())``.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+def get_view_name(request):
+    """
+    Return a low-cardinality label for the view that handled ``request``.
+
+    Router generated names already contain the ViewSet action,
+    e.g. ``products:cart-add-item``.
+    """
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "<unresolved>"
+    return match.view_name or match._func_path
+
+
+def metrics_view(request):
+    """
+    Expose collected metrics in the Prometheus text format.
+
+    Under gunicorn every worker writes its samples to
+    ``PROMETHEUS_MULTIPROC_DIR``, so they are aggregated here regardless of
+    which worker serves the scrape.
+
+    nginx does not proxy ``/metrics``; scrapers reach the app server directly.
+    When ``METRICS_TOKEN`` is set they must also send it as a bearer token.
+    """
+    if settings.METRICS_TOKEN and not hmac.compare_digest(
+        request.headers.get("Authorization", ""), f"Bearer {settings.METRICS_TOKEN}"
+    ):
+        return HttpResponseForbidden()
+
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
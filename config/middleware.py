@@ -1,3 +1,26 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from config.metrics import (
+    REQUEST_LATENCY,
+    REQUEST_QUERY_COUNT,
+    REQUEST_QUERY_TIME,
+    RESPONSE_SIZE,
+    QueryCounter,
+    get_view_name,
+)
+from config.compression import choose_encoding, encode, is_compressible
+from config.db.routers import pin_key
+from config.querycheck import QueryFingerprinter
+
+
 class NoCacheMiddleware:
     """
     Middleware to add no-cache headers to all API responses
@@ -14,4 +37,116 @@ class NoCacheMiddleware:
             response['Pragma'] = 'no-cache'
             response['Expires'] = '0'
         
-        return response 
\ No newline at end of file
+        return response
+
+
+class PrometheusMetricsMiddleware(MiddlewareMixin):
+    """
+    Middleware to record latency, database queries and response size per view
+
+    Based on MiddlewareMixin so that it runs natively under both WSGI and ASGI
+    """
+    def process_request(self, request):
+        if request.path == '/metrics':
+            return
+
+        request._metrics_queries = QueryCounter()
+        request._metrics_wrappers = ExitStack()
+        for connection in connections.all():
+            request._metrics_wrappers.enter_context(
+                connection.execute_wrapper(request._metrics_queries)
+            )
+        request._metrics_start = time.perf_counter()
+
+    def process_response(self, request, response):
+        if not hasattr(request, '_metrics_start'):
+            return response
+
+        duration = time.perf_counter() - request._metrics_start
+        request._metrics_wrappers.close()
+        counter = request._metrics_queries
+        view = get_view_name(request)
+        method = request.method
+
+        REQUEST_LATENCY.labels(view, method, response.status_code).observe(duration)
+        REQUEST_QUERY_COUNT.labels(view, method).observe(counter.count)
+        REQUEST_QUERY_TIME.labels(view, method).observe(counter.duration)
+        if not response.streaming:
+            RESPONSE_SIZE.labels(view, method).observe(len(response.content))
+
+        return response
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Middleware to compress responses with brotli or gzip, see config.compression
+
+    Bodies that already have a Content-Encoding, such as the precompressed
+    catalog cache entries, are left as they are.
+    """
+    def process_response(self, request, response):
+        if response.streaming or not is_compressible(response.get('Content-Type', '')):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if response.has_header('Content-Encoding'):
+            return response
+
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        compressed, encoding = encode(response.content, encoding)
+        if encoding is None:
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # The encoded body is no longer byte for byte the tagged one
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+
+        return response
+
+
+class ReadYourWritesMiddleware(MiddlewareMixin):
+    """
+    Middleware to pin users to the primary database for REPLICA_PIN_SECONDS
+    after a successful write, so replica reads never hide their own changes
+    """
+    def process_response(self, request, response):
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method not in ('GET', 'HEAD', 'OPTIONS')
+            and response.status_code < 400
+        ):
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                cache.set(pin_key(user.pk), 1, settings.REPLICA_PIN_SECONDS)
+
+        return response
+
+
+class NPlusOneDetectionMiddleware:
+    """
+    Development middleware to report statements repeated more than
+    NPLUSONE_THRESHOLD times in a single request
+    """
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'NPLUSONE_THRESHOLD', 5)
+        self.raise_error = getattr(settings, 'NPLUSONE_RAISE', False)
+
+    def __call__(self, request):
+        fingerprinter = QueryFingerprinter(self.threshold)
+
+        with fingerprinter.installed():
+            response = self.get_response(request)
+
+        fingerprinter.check(
+            f'{request.method} {get_view_name(request)}', raise_error=self.raise_error
+        )
+
+        return response
@@ -0,0 +1,33 @@
+"""
+JSON parser decoding with orjson when it is installed.
+"""
+
+import codecs
+
+from django.conf import settings
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+
+try:
+    import orjson
+except ImportError:  # the stdlib decoder is used instead
+    orjson = None
+
+
+class JSONParser(parsers.JSONParser):
+    """
+    ``JSONParser`` decoding UTF-8 bodies with orjson.
+
+    Like DRF's parser with ``STRICT_JSON``, ``NaN`` and ``Infinity`` are rejected.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or codecs.lookup(encoding).name != "utf-8":
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except ValueError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
@@ -0,0 +1,30 @@
+"""
+Per-action permission resolution for DRF views.
+"""
+
+
+class ActionPermissionsMixin:
+    """
+    Add permission classes for some actions without mutating class state.
+
+    ``extra_permission_classes`` maps a ViewSet action (e.g. ``"update"``) or,
+    for plain API views, an HTTP method (e.g. ``"PUT"``) to the permission
+    classes checked on top of ``permission_classes``. The combined lists are
+    computed once, when the view class is created.
+    """
+
+    extra_permission_classes = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.action_permission_classes = {
+            key: tuple(cls.permission_classes) + tuple(extra)
+            for key, extra in cls.extra_permission_classes.items()
+        }
+
+    def get_permissions(self):
+        key = getattr(self, "action", None) or self.request.method
+        permission_classes = self.action_permission_classes.get(
+            key, self.permission_classes
+        )
+        return [permission() for permission in permission_classes]
@@ -0,0 +1,130 @@
+"""
+N+1 query detection.
+
+``QueryFingerprinter`` groups the SQL executed while it is installed by a
+normalized fingerprint, so that the same statement run once per row of a
+list (the N+1 pattern) shows up as a single fingerprint with a high count.
+It is used by ``config.middleware.NPlusOneDetectionMiddleware`` in
+development and by ``config.testing.QueryBudgetMixin`` in tests.
+"""
+
+import logging
+import os
+import re
+import sys
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+IN_LIST_RE = re.compile(r"\bIN\s*\((?:\s*(?:%s|\?|NULL)\s*,?)+\)", re.IGNORECASE)
+WHITESPACE_RE = re.compile(r"\s+")
+
+CONFIG_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(CONFIG_DIR)
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def fingerprint(sql):
+    """
+    Return ``sql`` with literals, placeholders and IN lists normalized.
+    """
+    sql = STRING_LITERAL_RE.sub("?", sql)
+    sql = NUMBER_LITERAL_RE.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    sql = IN_LIST_RE.sub("IN (...)", sql)
+    return WHITESPACE_RE.sub(" ", sql).strip()
+
+
+def find_serializer_field():
+    """
+    Walk up the current stack and describe the serializer field being rendered,
+    e.g. ``OrderItemSerializer.price``, together with the app frames.
+    """
+    from rest_framework.fields import Field
+
+    field = None
+    stack = []
+    frame = sys._getframe(1)
+
+    while frame is not None:
+        code = frame.f_code
+        if field is None:
+            candidate = frame.f_locals.get("self")
+            if isinstance(candidate, Field) and candidate.field_name:
+                field = f"{type(candidate.parent).__name__}.{candidate.field_name}"
+        if (
+            code.co_filename.startswith(PROJECT_DIR)
+            and "site-packages" not in code.co_filename
+            and not code.co_filename.startswith(CONFIG_DIR)
+        ):
+            stack.append(f"{code.co_filename}:{frame.f_lineno} in {code.co_name}")
+        frame = frame.f_back
+
+    return field, stack
+
+
+class QueryFingerprinter:
+    """
+    Execute wrapper counting executed statements per fingerprint.
+
+    The stack is only inspected when a fingerprint first crosses
+    ``threshold``, so the cost on the normal path is one regex pass per query.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = Counter()
+        self.offenders = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        key = fingerprint(sql)
+        self.counts[key] += 1
+        if self.counts[key] == self.threshold + 1:
+            self.offenders[key] = find_serializer_field()
+        return execute(sql, params, many, context)
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def report(self):
+        """
+        Return a human readable description of the repeated statements.
+        """
+        lines = []
+        if not self.offenders:
+            for key, count in self.counts.most_common(10):
+                lines.append(f"{count}x {key}")
+        for key, (field, stack) in self.offenders.items():
+            lines.append(f"{self.counts[key]}x {key}")
+            if field:
+                lines.append(f"  serializer field: {field}")
+            lines.extend(f"  {entry}" for entry in stack)
+        return "\n".join(lines)
+
+    def check(self, label, raise_error=False):
+        """
+        Log, or raise ``NPlusOneError``, when a statement crossed the threshold.
+        """
+        if not self.offenders:
+            return
+
+        message = f"Possible N+1 queries in {label}\n{self.report()}"
+        if raise_error:
+            raise NPlusOneError(message)
+        logger.warning(message)
+
+    @contextmanager
+    def installed(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
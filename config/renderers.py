@@ -0,0 +1,69 @@
+"""
+JSON renderer encoding with orjson when it is installed.
+
+Output is the same as DRF's ``JSONRenderer`` with the default settings: compact,
+UTF-8, U+2028 and U+2029 escaped, and values DRF's encoder knows about
+(``Decimal``, datetimes, lazy strings, querysets...) converted the same way.
+``PhoneNumber`` and ``Country`` render as their string and code, as their
+serializer fields do. Without orjson, or when indentation is asked for, DRF's
+stdlib based rendering is used.
+"""
+
+from django_countries.fields import Country
+from phonenumber_field.phonenumber import PhoneNumber
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # the stdlib encoder is used instead
+    orjson = None
+
+_drf_default = JSONEncoder().default
+
+
+def default(obj):
+    """
+    Convert values orjson does not handle natively.
+    """
+    if isinstance(obj, PhoneNumber):
+        return str(obj)
+    if isinstance(obj, Country):
+        return obj.code
+    return _drf_default(obj)
+
+
+if orjson is not None:
+    # Datetimes go through DRF's encoder, which truncates to milliseconds
+    OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(data):
+    """
+    Return ``data`` encoded as compact UTF-8 JSON bytes.
+    """
+    if orjson is None:
+        return renderers.JSONRenderer().render(data)
+    ret = orjson.dumps(data, default=default, option=OPTIONS)
+    # Valid JSON but not valid JavaScript, escaped like DRF does
+    if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+        ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+    return ret
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """
+    ``JSONRenderer`` encoding with orjson.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+        return dumps(data)
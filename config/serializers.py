@@ -0,0 +1,307 @@
+"""
+Serializer helpers shared across apps.
+"""
+
+import datetime
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+
+def parse_field_list(value):
+    """
+    Parse a comma separated query parameter such as ``?expand=a,b`` into a set.
+    """
+    return {name.strip() for name in (value or "").split(",") if name.strip()}
+
+
+class ExpandableFieldsMixin:
+    """
+    ModelSerializer mixin adding sparse fieldsets and optional expansions.
+
+    Fields listed in ``Meta.expandable_fields`` are left out unless named in
+    the ``expand`` set of the serializer context. When the context has a
+    non-empty ``fields`` set, only those fields are returned. Views fill both
+    from the ``?expand=`` and ``?fields=`` query parameters.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+
+        expand = self.context.get("expand", set())
+        for name in getattr(self.Meta, "expandable_fields", ()):
+            if name not in expand:
+                fields.pop(name, None)
+
+        only = self.context.get("fields")
+        if only:
+            for name in list(fields):
+                if name not in only:
+                    fields.pop(name)
+
+        return fields
+
+
+def full_name(first_name, last_name):
+    """
+    ``User.get_full_name`` from the two columns.
+    """
+    return f"{first_name} {last_name}".strip()
+
+
+# Fields whose representation of a database value is the value itself
+IDENTITY_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.EmailField,
+    serializers.IntegerField,
+    serializers.PrimaryKeyRelatedField,
+    serializers.ReadOnlyField,
+)
+
+
+class Column:
+    """
+    Field read from one column, converted by ``convert`` unless null.
+    """
+
+    def __init__(self, path, convert=None):
+        self.path = path
+        self.convert = convert
+
+    def get_converter(self):
+        return self.convert
+
+    def bind(self, serializer, prefix):
+        column = prefix + self.path
+        convert = self.get_converter()
+        if convert is None:
+            return [column], lambda row, data: row[column]
+
+        def get(row, data):
+            value = row[column]
+            return None if value is None else convert(value)
+
+        return [column], get
+
+
+class DateTimeColumn(Column):
+    """
+    ``DateTimeField`` column in ISO 8601, with the time zone looked up once.
+    """
+
+    def __init__(self, path, field):
+        super().__init__(path)
+        self.field = field
+
+    def get_converter(self):
+        field = self.field
+        tz = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+
+        def convert(value):
+            if timezone.is_aware(value):
+                value = value.astimezone(tz) if tz is not None else timezone.make_naive(
+                    value, datetime.timezone.utc
+                )
+            value = value.isoformat()
+            if value.endswith("+00:00"):
+                value = value[:-6] + "Z"
+            return value
+
+        return convert
+
+
+class Computed:
+    """
+    Field computed by ``function`` from the values of ``columns``.
+
+    ``function`` may be the name of a method of the ``ValuesSerializer``.
+    """
+
+    def __init__(self, columns, function):
+        self.columns = columns
+        self.function = function
+
+    def bind(self, serializer, prefix):
+        columns = [prefix + column for column in self.columns]
+        function = self.function
+        if isinstance(function, str):
+            function = getattr(serializer, function)
+        if len(columns) == 1:
+            (column,) = columns
+            return columns, lambda row, data: function(row[column])
+        return columns, lambda row, data: function(*[row[column] for column in columns])
+
+
+class FromData:
+    """
+    Field computed by ``function`` from the fields that come before it.
+    """
+
+    def __init__(self, function):
+        self.function = function
+
+    def bind(self, serializer, prefix):
+        function = self.function
+        return [], lambda row, data: function(data)
+
+
+class Nested:
+    """
+    Object of a forward relation, read from the same rows.
+    """
+
+    def __init__(self, serializer_class, source):
+        self.serializer_class = serializer_class
+        self.source = source
+
+    def bind(self, serializer, prefix):
+        child = self.serializer_class(
+            None, context=serializer.context, prefix=f"{prefix}{self.source}__"
+        )
+        pk = child.pk_column
+        to_representation = child.to_representation
+        return child.columns, lambda row, data: (
+            None if row[pk] is None else to_representation(row)
+        )
+
+
+class Many:
+    """
+    Objects of a reverse relation, read with one more query for all rows.
+
+    ``related_field`` is the name of the foreign key of the related model.
+    """
+
+    def __init__(self, serializer_class, related_field):
+        self.serializer_class = serializer_class
+        self.related_field = related_field
+
+    def bind(self, serializer, prefix):
+        if prefix:
+            raise ImproperlyConfigured("Many cannot be nested in Nested")
+        child = self.serializer_class(None, context=serializer.context)
+        pk = serializer.pk_column
+        groups = {}
+
+        def load(rows):
+            groups.clear()
+            groups.update(child.group_by(self.related_field, [row[pk] for row in rows]))
+
+        serializer.loaders.append(load)
+        return [pk], lambda row, data: groups.get(row[pk], [])
+
+
+class ValuesSerializer:
+    """
+    Read-only list serializer building the output of ``serializer_class`` from
+    ``.values()`` rows.
+
+    Large lists then skip model instances and the per object work of
+    ``ModelSerializer``. The fields of ``serializer_class`` are compiled once
+    per class into mappers: model fields, including ones reached through a
+    dotted ``source``, are read from their column. Other fields (method fields,
+    nested serializers, properties) need a mapper in ``mappers``.
+    """
+
+    serializer_class = None
+    mappers = {}
+
+    def __init__(self, queryset, context=None, prefix=""):
+        self.queryset = queryset
+        self.context = context or {}
+        self.prefix = prefix
+        self.pk_column = f"{prefix}pk" if prefix else "pk"
+        self.loaders = []
+
+        columns = {self.pk_column: None}
+        self.fields = []
+        for name, mapper in self.get_mappers():
+            field_columns, get = mapper.bind(self, prefix)
+            columns.update(dict.fromkeys(field_columns))
+            self.fields.append((name, get))
+        self.columns = list(columns)
+
+    @classmethod
+    def get_mappers(cls):
+        if "_compiled" not in cls.__dict__:
+            cls._compiled = [
+                (name, cls.mappers[name] if name in cls.mappers else cls.map_field(field))
+                for name, field in cls.serializer_class().fields.items()
+                if not field.write_only
+            ]
+        return cls._compiled
+
+    @classmethod
+    def map_field(cls, field):
+        if (
+            isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField))
+            or field.source == "*"
+            or (
+                isinstance(field, serializers.RelatedField)
+                and not isinstance(field, serializers.PrimaryKeyRelatedField)
+            )
+        ):
+            raise ImproperlyConfigured(
+                f"{cls.__name__} needs a mapper for the {field.field_name!r} field"
+            )
+        path = field.source.replace(".", "__")
+        if type(field) in IDENTITY_FIELDS:
+            return Column(path)
+        if (
+            type(field) is serializers.DateTimeField
+            and getattr(field, "format", api_settings.DATETIME_FORMAT).lower() == ISO_8601
+        ):
+            return DateTimeColumn(path, field)
+        return Column(path, field.to_representation)
+
+    def to_representation(self, row):
+        data = {}
+        for name, get in self.fields:
+            data[name] = get(row, data)
+        return data
+
+    def group_by(self, related_field, ids):
+        """
+        Return the representations of objects related to ``ids``, by id.
+        """
+        queryset = self.serializer_class.Meta.model._default_manager.filter(
+            **{f"{related_field}__in": ids}
+        )
+        groups = {}
+        for row in self.rows(queryset, related_field):
+            groups.setdefault(row[related_field], []).append(self.to_representation(row))
+        return groups
+
+    def rows(self, queryset, *extra):
+        columns = self.columns + [column for column in extra if column not in self.columns]
+        rows = list(queryset.values(*columns))
+        for load in self.loaders:
+            load(rows)
+        return rows
+
+    @property
+    def data(self):
+        return [self.to_representation(row) for row in self.rows(self.queryset)]
+
+
+class ValuesListMixin:
+    """
+    Viewset mixin rendering the unpaginated ``list`` action with
+    ``values_serializer_class``.
+    """
+
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        if self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.values_serializer_class(
+            queryset, context=self.get_serializer_context()
+        )
+        return Response(serializer.data)
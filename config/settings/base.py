@@ -50,6 +50,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "config.middleware.PrometheusMetricsMiddleware",
+    # Before anything reading or changing response bodies
+    "config.middleware.CompressionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -59,6 +62,7 @@ MIDDLEWARE = [
     # "django.middleware.cache.FetchFromCacheMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "config.middleware.ReadYourWritesMiddleware",
     "allauth.account.middleware.AccountMiddleware",  # Required for django-allauth
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
@@ -83,11 +87,59 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "config.wsgi.application"
+ASGI_APPLICATION = "config.asgi.application"
 
 
 # Database
 # https://docs.djangoproject.com/en/4.0/ref/settings/#databases
 
+# Keep connections open between requests and check them before reuse
+DB_CONN_MAX_AGE = config("DB_CONN_MAX_AGE", default=600, cast=int)
+
+# Set when DB_HOSTNAME points at pgbouncer in transaction pooling mode. A
+# transaction may run on a different server connection than the previous one,
+# so server-side cursors (which outlive a transaction) must be disabled.
+DB_PGBOUNCER = config("DB_PGBOUNCER", default=False, cast=bool)
+
+DATABASES = {
+    "default": {
+        "ENGINE": "config.db.postgresql",
+        "NAME": config("DB_NAME", default="postgres"),
+        "USER": config("DB_USERNAME", default="postgres"),
+        "PASSWORD": config("DB_PASSWORD", default=""),
+        "HOST": config("DB_HOSTNAME", default="localhost"),
+        "PORT": config("DB_PORT", default="5432"),
+        "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": True,
+        "DISABLE_SERVER_SIDE_CURSORS": DB_PGBOUNCER,
+        "OPTIONS": {
+            "connect_timeout": config("DB_CONNECT_TIMEOUT", default=5, cast=int),
+        },
+    }
+}
+
+# Read replicas, e.g. DB_REPLICA_HOSTS=replica-a,replica-b DB_REPLICA_WEIGHTS=3,1
+# Safe requests of views using config.db.routers.ReplicaReadMixin read from them
+DATABASE_REPLICAS = {}
+DB_REPLICA_WEIGHTS = config("DB_REPLICA_WEIGHTS", default="", cast=Csv(int))
+for index, host in enumerate(config("DB_REPLICA_HOSTS", default="", cast=Csv())):
+    alias = f"replica_{index}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS[alias] = (
+        DB_REPLICA_WEIGHTS[index] if index < len(DB_REPLICA_WEIGHTS) else 1
+    )
+
+DATABASE_ROUTERS = ["config.db.routers.ReplicaRouter"]
+
+# Seconds a user reads from the primary after writing
+REPLICA_PIN_SECONDS = config("REPLICA_PIN_SECONDS", default=10, cast=int)
+# Replicas further behind than this are skipped until they catch up
+REPLICA_MAX_LAG_SECONDS = config("REPLICA_MAX_LAG_SECONDS", default=5, cast=float)
+REPLICA_LAG_CHECK_SECONDS = config("REPLICA_LAG_CHECK_SECONDS", default=5, cast=float)
 
 
 # Password validation
@@ -161,6 +213,16 @@ REST_FRAMEWORK = {
         "dj_rest_auth.jwt_auth.JWTCookieAuthentication",  # Cookie-based JWT
     ),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # orjson based, falling back to the stdlib json module when not installed
+    "DEFAULT_RENDERER_CLASSES": (
+        "config.renderers.JSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "config.parsers.JSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
 }
 
 SITE_ID = 1
@@ -226,11 +288,32 @@ TOKEN_LENGTH = 6
 # Token expiry
 TOKEN_EXPIRE_MINUTES = 3
 
+# OTP codes are kept in Redis (see users/otp.py)
+OTP_REDIS_URL = config("REDIS_BACKEND", default="redis://localhost:6379")
+OTP_MAX_ATTEMPTS = config("OTP_MAX_ATTEMPTS", default=5, cast=int)
+OTP_LOCKOUT_SECONDS = config("OTP_LOCKOUT_SECONDS", default=60 * 15, cast=int)
+
 # Twilio
 TWILIO_ACCOUNT_SID = config("TWILIO_ACCOUNT_SID", default="")
 TWILIO_AUTH_TOKEN = config("TWILIO_AUTH_TOKEN", default="")
 TWILIO_PHONE_NUMBER = config("TWILIO_PHONE_NUMBER", default="")
 
+# Google OpenID configuration and signing keys are cached in Redis (see users/oauth.py)
+GOOGLE_OPENID_CONFIGURATION_URL = config(
+    "GOOGLE_OPENID_CONFIGURATION_URL",
+    default="https://accounts.google.com/.well-known/openid-configuration",
+)
+OAUTH_CACHE_REDIS_URL = config("REDIS_BACKEND", default="redis://localhost:6379")
+
+# Outbound HTTP to Stripe and Twilio (see config/http.py)
+OUTBOUND_HTTP_CONNECT_TIMEOUT = config("OUTBOUND_HTTP_CONNECT_TIMEOUT", default=3.05, cast=float)
+OUTBOUND_HTTP_READ_TIMEOUT = config("OUTBOUND_HTTP_READ_TIMEOUT", default=20, cast=float)
+OUTBOUND_HTTP_POOL_SIZE = config("OUTBOUND_HTTP_POOL_SIZE", default=10, cast=int)
+OUTBOUND_HTTP_RETRIES = config("OUTBOUND_HTTP_RETRIES", default=2, cast=int)
+# Retries allowed per request (on average) and burst of retries allowed
+OUTBOUND_HTTP_RETRY_RATIO = config("OUTBOUND_HTTP_RETRY_RATIO", default=0.1, cast=float)
+OUTBOUND_HTTP_RETRY_RESERVE = config("OUTBOUND_HTTP_RETRY_RESERVE", default=10, cast=int)
+
 # Stripe
 STRIPE_PUBLISHABLE_KEY = config("STRIPE_PUBLISHABLE_KEY", default="")
 STRIPE_SECRET_KEY = config("STRIPE_SECRET_KEY", default="")
@@ -262,6 +345,80 @@ CACHES = {
         "LOCATION": config("REDIS_BACKEND", default="redis://localhost:6379"),
     },
 }
+# Non-blocking Redis client used by the async catalog views
+ASYNC_REDIS_URL = config("REDIS_BACKEND", default="redis://localhost:6379")
+ASYNC_REDIS_MAX_CONNECTIONS = config("ASYNC_REDIS_MAX_CONNECTIONS", default=100, cast=int)
+CATALOG_CACHE_SECONDS = config("CATALOG_CACHE_SECONDS", default=60, cast=int)
+
+# Bearer token required by /metrics when set
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+
+# Response compression (config.compression), brotli when installed, else gzip
+COMPRESSION_MIN_SIZE = config("COMPRESSION_MIN_SIZE", default=1024, cast=int)
+COMPRESSION_CONTENT_TYPES = (
+    "application/json",
+    "application/vnd.oai.openapi",
+    "application/vnd.oai.openapi+json",
+    "application/javascript",
+    "text/css",
+    "text/plain",
+)
+COMPRESSION_GZIP_LEVEL = config("COMPRESSION_GZIP_LEVEL", default=6, cast=int)
+COMPRESSION_BROTLI_QUALITY = config("COMPRESSION_BROTLI_QUALITY", default=5, cast=int)
+
+# Cart storage engine: "database" or "redis" (see products/cart.py)
+CART_STORAGE = config("CART_STORAGE", default="database")
+CART_REDIS_URL = config("REDIS_BACKEND", default="redis://localhost:6379")
+CART_TTL_SECONDS = config("CART_TTL_SECONDS", default=60 * 60 * 24 * 7, cast=int)
+
 CACHE_MIDDLEWARE_ALIAS = "default"
 CACHE_MIDDLEWARE_SECONDS = 3600
 CACHE_MIDDLEWARE_KEY_PREFIX = ""
+
+# Logging
+# Records are queued in the request thread and written as JSON lines by a
+# background thread. Hot request paths are sampled below WARNING.
+LOG_LEVEL = config("LOG_LEVEL", default="INFO")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "json": {"()": "config.log.JSONFormatter"},
+    },
+    "filters": {
+        "sample_hot_path": {
+            "()": "config.log.SamplingFilter",
+            "rate": config("LOG_HOT_PATH_SAMPLE_RATE", default=0.01, cast=float),
+        },
+    },
+    "handlers": {
+        "console": {
+            "class": "config.log.QueuedStreamHandler",
+            "formatter": "json",
+        },
+    },
+    "root": {
+        "handlers": ["console"],
+        "level": LOG_LEVEL,
+    },
+    "loggers": {
+        "django": {
+            "handlers": ["console"],
+            "level": LOG_LEVEL,
+            "propagate": False,
+        },
+        "products.views": {
+            "handlers": ["console"],
+            "level": LOG_LEVEL,
+            "filters": ["sample_hot_path"],
+            "propagate": False,
+        },
+        "users.views": {
+            "handlers": ["console"],
+            "level": LOG_LEVEL,
+            "filters": ["sample_hot_path"],
+            "propagate": False,
+        },
+    },
+}
@@ -10,6 +10,18 @@ DATABASES = {
     }
 }
 
+# A second SQLite file acting as a read replica, to exercise the replica router
+# locally (python manage.py migrate --database replica). The alias always
+# exists, for the router tests, but is only read from with DEV_SQLITE_REPLICA.
+DATABASES["replica"] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': BASE_DIR / 'db.replica.sqlite3',
+    'TEST': {'MIRROR': 'default'},
+}
+DATABASE_REPLICAS = {}
+if os.getenv("DEV_SQLITE_REPLICA", "False") == "True":
+    DATABASE_REPLICAS = {"replica": 1}
+
 # For Render deployment with development settings
 ALLOWED_HOSTS = [
     '.onrender.com',
@@ -36,26 +48,16 @@ CACHES = {
     }
 }
 
+# Report repeated SQL statements (N+1 queries) per request
+MIDDLEWARE += ["config.middleware.NPlusOneDetectionMiddleware"]
+NPLUSONE_THRESHOLD = int(os.getenv("NPLUSONE_THRESHOLD", 5))
+NPLUSONE_RAISE = os.getenv("NPLUSONE_RAISE", "False") == "True"
+
+# No Redis in development, async catalog views read straight from the database
+ASYNC_REDIS_URL = None
+
 # CORS settings for development (allow local frontend)
 CORS_ALLOW_ALL_ORIGINS = True  # For development convenience
 
 # Logging for debugging on Render
-LOGGING = {
-    'version': 1,
-    'disable_existing_loggers': False,
-    'handlers': {
-        'console': {
-            'class': 'logging.StreamHandler',
-        },
-    },
-    'root': {
-        'handlers': ['console'],
-    },
-    'loggers': {
-        'django': {
-            'handlers': ['console'],
-            'level': os.getenv('DJANGO_LOG_LEVEL', 'DEBUG'),
-            'propagate': False,
-        },
-    },
-}
+LOGGING["loggers"]["django"]["level"] = os.getenv("DJANGO_LOG_LEVEL", "DEBUG")
@@ -16,7 +16,8 @@ if 'RENDER' in os.environ:
     ALLOWED_HOSTS.append(os.environ.get('RENDER_EXTERNAL_HOSTNAME'))
 
 # Database for production (if different from base)
-# DATABASES will be inherited from base.py
+# DATABASES will be inherited from base.py, connection settings come from the
+# DB_* environment variables (see config/gunicorn.py for pool sizing)
 
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = '/static/'
@@ -40,22 +41,4 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 # Logging
-LOGGING = {
-    'version': 1,
-    'disable_existing_loggers': False,
-    'handlers': {
-        'console': {
-            'class': 'logging.StreamHandler',
-        },
-    },
-    'root': {
-        'handlers': ['console'],
-    },
-    'loggers': {
-        'django': {
-            'handlers': ['console'],
-            'level': os.getenv('DJANGO_LOG_LEVEL', 'INFO'),
-            'propagate': False,
-        },
-    },
-}
+LOGGING["loggers"]["django"]["level"] = os.getenv("DJANGO_LOG_LEVEL", "INFO")
@@ -0,0 +1,67 @@
+"""
+TestCase mixins shared by the test suites of the apps.
+
+Only tests import this module, the assertions are not loaded in production.
+"""
+
+import json
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from config.querycheck import QueryFingerprinter
+from config.renderers import dumps
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin failing when a block executes more queries than its budget.
+
+    Budgets are declared per view name, e.g.::
+
+        class ProductViewTests(QueryBudgetMixin, TestCase):
+            query_budgets = {"products:product-list": 3}
+
+            def test_list(self):
+                with self.assertQueryBudget("products:product-list"):
+                    self.client.get(reverse("products:product-list"))
+    """
+
+    query_budgets = {}
+
+    @contextmanager
+    def assertQueryBudget(self, budget):
+        if isinstance(budget, str):
+            name, budget = budget, self.query_budgets[budget]
+        else:
+            name = "block"
+
+        fingerprinter = QueryFingerprinter(
+            threshold=getattr(settings, "NPLUSONE_THRESHOLD", 5)
+        )
+        with fingerprinter.installed():
+            yield fingerprinter
+
+        if fingerprinter.total > budget:
+            self.fail(
+                f"{name} executed {fingerprinter.total} queries, budget is {budget}\n"
+                + fingerprinter.report()
+            )
+
+
+class ValuesParityMixin:
+    """
+    TestCase mixin checking that a ``ValuesSerializer`` renders exactly what
+    its ``serializer_class`` renders for the same queryset.
+    """
+
+    def assertValuesParity(self, queryset, values_serializer_class, context=None):
+        context = context or {}
+        serializer_class = values_serializer_class.serializer_class
+        expected = dumps(serializer_class(queryset.all(), many=True, context=context).data)
+        actual = dumps(values_serializer_class(queryset.all(), context=context).data)
+        # Compared parsed first for a readable diff, then as rendered bytes,
+        # which also covers the order of the keys
+        self.assertEqual(json.loads(actual), json.loads(expected))
+        self.assertEqual(actual, expected)
+        return json.loads(actual)
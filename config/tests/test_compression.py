@@ -0,0 +1,107 @@
+import gzip
+import random
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from config.compression import choose_encoding, encode
+from config.middleware import CompressionMiddleware
+
+# Long and repetitive enough to shrink when compressed
+BODY = b'{"name": "Book", "price": "5.00"}' * 64
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024)
+class NegotiationTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch("config.compression.ENCODINGS", ("br", "gzip"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_choose_encoding(self):
+        cases = {
+            "": None,
+            "identity": None,
+            "gzip": "gzip",
+            "gzip, br": "br",
+            "GZIP;q=1.0, br;q=0.5": "gzip",
+            "br;q=0, gzip": "gzip",
+            "br;q=0, gzip;q=0": None,
+            "*": "br",
+            "*;q=0.5, br;q=0": "gzip",
+            "gzip;q=0, *": "br",
+            "*;q=0": None,
+            "br;q=oops, gzip;q=0.1": "gzip",
+        }
+        for header, expected in cases.items():
+            with self.subTest(header=header):
+                self.assertEqual(choose_encoding(header), expected)
+
+    def test_gzip_only(self):
+        with mock.patch("config.compression.ENCODINGS", ("gzip",)):
+            self.assertIsNone(choose_encoding("br"))
+            self.assertEqual(choose_encoding("br, gzip;q=0.1"), "gzip")
+
+    def test_size_threshold(self):
+        self.assertEqual(encode(BODY[:1023], "gzip"), (BODY[:1023], None))
+        body, applied = encode(BODY[:1024], "gzip")
+        self.assertEqual(applied, "gzip")
+        self.assertEqual(gzip.decompress(body), BODY[:1024])
+
+    def test_incompressible_body_is_sent_as_is(self):
+        noise = random.Random(0).randbytes(2048)
+        self.assertEqual(encode(noise, "gzip"), (noise, None))
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024)
+class CompressionMiddlewareTests(SimpleTestCase):
+    def process(self, response, accept_encoding="gzip"):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_compresses_json(self):
+        response = HttpResponse(BODY, content_type="application/json; charset=utf-8")
+        response["ETag"] = '"abc"'
+        response = self.process(response)
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), BODY)
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(response["ETag"], 'W/"abc"')
+
+    def test_weak_etag_is_kept(self):
+        response = HttpResponse(BODY, content_type="application/json")
+        response["ETag"] = 'W/"abc"'
+        self.assertEqual(self.process(response)["ETag"], 'W/"abc"')
+
+    def test_client_without_compression(self):
+        response = self.process(HttpResponse(BODY, content_type="application/json"), "")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content, BODY)
+        # Shared caches must still tell the variants apart
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+
+    def test_small_body(self):
+        response = self.process(HttpResponse(BODY[:100], content_type="application/json"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content, BODY[:100])
+
+    def test_content_type_allowlist(self):
+        for content_type in ("text/html; charset=utf-8", "image/png", "text/csv"):
+            with self.subTest(content_type=content_type):
+                response = self.process(HttpResponse(BODY, content_type=content_type))
+                self.assertFalse(response.has_header("Content-Encoding"))
+                self.assertFalse(response.has_header("Vary"))
+                self.assertEqual(response.content, BODY)
+
+    def test_encoded_body_passes_through(self):
+        body = gzip.compress(BODY, mtime=0)
+        response = HttpResponse(body, content_type="application/json")
+        response["Content-Encoding"] = "gzip"
+        response = self.process(response, "gzip, br")
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response.content, body)
+        self.assertEqual(response["Vary"], "Accept-Encoding")
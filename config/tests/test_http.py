@@ -0,0 +1,135 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.test import SimpleTestCase, override_settings
+
+from config.http import build_session, get_session
+
+
+class StubAPIHandler(BaseHTTPRequestHandler):
+    """
+    ``/ok`` answers 200, ``/unavailable`` 503 and ``/slow`` 200 after a second.
+    """
+
+    # Keeps connections open between requests
+    protocol_version = "HTTP/1.1"
+
+    def respond(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.command, self.path))
+            server.client_ports.add(self.client_address[1])
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+
+        if self.path == "/ok":
+            status = 200
+        elif self.path == "/unavailable":
+            status = 503
+        elif self.path == "/slow":
+            time.sleep(1)
+            status = 200
+        else:
+            status = 404
+
+        body = b"{}"
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except BrokenPipeError:
+            # The client timed out
+            self.close_connection = True
+
+    do_GET = do_POST = respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubAPIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubAPIHandler)
+        self.url = f"http://127.0.0.1:{self.server_address[1]}"
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = []
+        self.client_ports = set()
+
+
+@override_settings(
+    OUTBOUND_HTTP_CONNECT_TIMEOUT=1,
+    OUTBOUND_HTTP_READ_TIMEOUT=5,
+    OUTBOUND_HTTP_POOL_SIZE=2,
+    OUTBOUND_HTTP_RETRIES=2,
+    OUTBOUND_HTTP_RETRY_RATIO=0.1,
+    OUTBOUND_HTTP_RETRY_RESERVE=10,
+)
+class PooledSessionTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = StubAPIServer()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.addClassCleanup(cls.server.server_close)
+        cls.addClassCleanup(cls.server.shutdown)
+
+    def setUp(self):
+        self.server.reset()
+
+    def session(self):
+        session = build_session("stub")
+        self.addCleanup(session.close)
+        return session
+
+    def test_connections_are_reused(self):
+        session = self.session()
+        for _ in range(3):
+            self.assertEqual(session.get(f"{self.server.url}/ok").status_code, 200)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(self.server.client_ports), 1)
+
+    def test_session_per_process(self):
+        self.assertIs(get_session("stub"), get_session("stub"))
+        self.assertIsNot(get_session("stub"), get_session("other stub"))
+
+    def test_get_is_retried(self):
+        response = self.session().get(f"{self.server.url}/unavailable")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.server.requests, [("GET", "/unavailable")] * 3)
+
+    def test_post_is_not_retried(self):
+        response = self.session().post(f"{self.server.url}/unavailable", data=b"{}")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.server.requests, [("POST", "/unavailable")])
+
+    @override_settings(OUTBOUND_HTTP_RETRY_RATIO=0, OUTBOUND_HTTP_RETRY_RESERVE=1)
+    def test_retries_stop_when_the_budget_is_exhausted(self):
+        session = self.session()
+        # The only token is spent on the first retry, the last 503 is returned
+        response = session.get(f"{self.server.url}/unavailable")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.server.requests), 2)
+
+        # Nothing left, no retry at all
+        response = session.get(f"{self.server.url}/unavailable")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.server.requests), 3)
+
+    @override_settings(OUTBOUND_HTTP_READ_TIMEOUT=0.2, OUTBOUND_HTTP_RETRIES=0)
+    def test_default_read_timeout(self):
+        start = time.perf_counter()
+        with self.assertRaises(requests.exceptions.ConnectionError) as raised:
+            self.session().get(f"{self.server.url}/slow")
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertIn("Read timed out", str(raised.exception))
@@ -0,0 +1,73 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+
+from orders.models import Order, OrderItem
+from orders.views import OrderItemViewSet, OrderViewSet
+from payment.models import Payment
+from payment.views import CheckoutAPIView, PaymentViewSet
+from products.models import Product, ProductCategory
+
+User = get_user_model()
+
+
+class ActionPermissionsTests(APITestCase):
+    views = (OrderViewSet, OrderItemViewSet, PaymentViewSet, CheckoutAPIView)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="secret"
+        )
+        product = Product.objects.create(
+            seller=cls.user,
+            category=ProductCategory.objects.create(name="Books", icon="books.png"),
+            name="Book",
+            image="products/book.jpg",
+            price=Decimal("5.00"),
+            quantity=3,
+        )
+        cls.order = Order.objects.create(buyer=cls.user, status=Order.COMPLETED)
+        cls.item = OrderItem.objects.create(order=cls.order, product=product, quantity=1)
+        cls.payment = Payment.objects.create(
+            order=cls.order, payment_option=Payment.STRIPE, status=Payment.COMPLETED
+        )
+        cls.pending = Order.objects.create(buyer=cls.user)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_extra_permissions_do_not_accumulate(self):
+        permission_classes = {view: list(view.permission_classes) for view in self.views}
+        urls = (
+            f"/api/user/orders/{self.order.id}/",
+            f"/api/user/orders/{self.order.id}/order-items/{self.item.id}/",
+            f"/api/user/payments/{self.payment.id}/",
+            f"/api/user/payments/checkout/{self.order.id}/",
+        )
+
+        for _ in range(3):
+            for url in urls:
+                for method in (self.client.patch, self.client.put):
+                    with self.subTest(url=url, method=method.__name__):
+                        response = method(url, {}, format="json")
+                        self.assertEqual(response.status_code, 403)
+
+        for view, classes in permission_classes.items():
+            self.assertEqual(view.permission_classes, classes)
+
+        # The extra permissions only apply to their own actions
+        for url in urls:
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_pending_order_can_be_updated(self):
+        for _ in range(2):
+            response = self.client.patch(
+                f"/api/user/orders/{self.order.id}/", {}, format="json"
+            )
+            self.assertEqual(response.status_code, 403)
+            response = self.client.patch(
+                f"/api/user/orders/{self.pending.id}/", {}, format="json"
+            )
+            self.assertEqual(response.status_code, 200)
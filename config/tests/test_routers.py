@@ -0,0 +1,116 @@
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connections, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from config.db import routers
+from config.db.routers import choose_replica, read_alias
+from products.models import Product, ProductCategory
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS={"replica": 1}, REPLICA_PIN_SECONDS=10)
+class ReplicaRouterTests(TransactionTestCase):
+    """
+    The test replica mirrors the primary: both hold the same rows and the
+    queries of each connection are captured separately.
+    """
+
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        routers._replica_health.clear()
+        self.addCleanup(routers._replica_health.clear)
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="secret"
+        )
+        seller = User.objects.create_user(
+            username="seller", email="seller@example.com", password="secret"
+        )
+        self.product = Product.objects.create(
+            seller=seller,
+            category=ProductCategory.objects.create(name="Books", icon="books.png"),
+            name="Book",
+            image="products/book.jpg",
+            price=Decimal("5.00"),
+            quantity=3,
+        )
+
+    def capture(self):
+        return (
+            CaptureQueriesContext(connections["default"]),
+            CaptureQueriesContext(connections["replica"]),
+        )
+
+    def test_product_list_reads_from_the_replica(self):
+        primary, replica = self.capture()
+        with primary, replica:
+            response = self.client.get("/api/products/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+        self.assertTrue(any("products_product" in q["sql"] for q in replica.captured_queries))
+        self.assertFalse(any("products_product" in q["sql"] for q in primary.captured_queries))
+
+    def test_writes_and_transactions_use_the_primary(self):
+        token = read_alias.set("replica")
+        self.addCleanup(read_alias.reset, token)
+
+        self.assertEqual(Product.objects.all().db, "replica")
+        with transaction.atomic():
+            self.assertEqual(Product.objects.all().db, "default")
+        self.assertEqual(Product.objects.all().db, "replica")
+
+        primary, replica = self.capture()
+        with primary, replica:
+            Product.objects.filter(pk=self.product.pk).update(quantity=2)
+        self.assertEqual(len(primary.captured_queries), 1)
+        self.assertEqual(replica.captured_queries, [])
+
+    def test_writers_are_pinned_to_the_primary(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            "/api/products/cart/add_item/",
+            {"product_id": self.product.id, "quantity": 1},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+
+        primary, replica = self.capture()
+        with primary, replica:
+            self.client.get("/api/user/orders/")
+        self.assertEqual(replica.captured_queries, [])
+        self.assertTrue(any("orders_order" in q["sql"] for q in primary.captured_queries))
+
+        # Once REPLICA_PIN_SECONDS have passed the replica serves reads again
+        later = time.time() + 11
+        with mock.patch("django.core.cache.backends.locmem.time.time", return_value=later):
+            primary, replica = self.capture()
+            with primary, replica:
+                self.client.get("/api/user/orders/")
+        self.assertTrue(any("orders_order" in q["sql"] for q in replica.captured_queries))
+
+    def test_unhealthy_replicas_are_skipped(self):
+        with mock.patch.object(routers, "get_replica_lag", return_value=0.5):
+            self.assertEqual(choose_replica(), "replica")
+
+        routers._replica_health.clear()
+        with mock.patch.object(routers, "get_replica_lag", return_value=60):
+            self.assertIsNone(choose_replica())
+
+        routers._replica_health.clear()
+        with mock.patch.object(
+            routers, "get_replica_lag", side_effect=DatabaseError("gone")
+        ):
+            self.assertIsNone(choose_replica())
+
+        # The result is kept for REPLICA_LAG_CHECK_SECONDS
+        with mock.patch.object(routers, "get_replica_lag", return_value=0) as lag:
+            self.assertIsNone(choose_replica())
+        lag.assert_not_called()
@@ -15,7 +15,8 @@ from django.urls import include, path, re_path
 from django.views.generic import TemplateView
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
-from users.views import GoogleLogin
+from config.metrics import metrics_view
+from users.views import GoogleLogin, TokenLoginView
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -25,7 +26,9 @@ urlpatterns = [
     path("api/user/payments/", include("payment.urls", namespace="payment")),
     path("api-auth/", include("rest_framework.urls", namespace="rest_framework")),
     
-    # JWT Authentication URLs
+    # JWT Authentication URLs, the login views also merge the anonymous cart
+    path("api/auth/login/", TokenLoginView.as_view()),
+    path("api/token/login/", TokenLoginView.as_view()),
     path("api/auth/", include("dj_rest_auth.urls")),
     path("api/token/", include("dj_rest_auth.urls")),
     path("api/auth/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
@@ -52,6 +55,7 @@ urlpatterns = [
     ),
     path("password/change/", PasswordChangeView.as_view(), name="rest_password_change"),
     path("logout/", LogoutView.as_view(), name="rest_logout"),
+    path("metrics", metrics_view, name="prometheus_metrics"),
 ]
 
 # Media Assets
@@ -1,6 +1,73 @@
 from django.contrib import admin
+from django.db.models import DecimalField, ExpressionWrapper, F, IntegerField, OuterRef
 
+from config.admin import ScalableModelAdmin, subquery_sum
 from orders.models import Order, OrderItem
 
-admin.site.register(Order)
-admin.site.register(OrderItem)
+MONEY = DecimalField(decimal_places=2, max_digits=12)
+
+
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    extra = 0
+    autocomplete_fields = ("product",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("product")
+
+
+class OrderAdmin(ScalableModelAdmin):
+    list_display = ("id", "buyer", "status", "total_items", "total_cost", "created_at")
+    list_filter = ("status", "created_at")
+    list_select_related = ("buyer",)
+    search_fields = ("id__exact", "buyer__email", "buyer__username")
+    autocomplete_fields = ("buyer", "shipping_address", "billing_address")
+    inlines = [OrderItemInline]
+
+    def get_queryset(self, request):
+        items = OrderItem.objects.filter(order=OuterRef("pk"))
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(
+                _total_items=subquery_sum(items, F("quantity"), IntegerField()),
+                _total_cost=subquery_sum(
+                    items, F("quantity") * F("product__price"), MONEY
+                ),
+            )
+        )
+
+    @admin.display(ordering="_total_items")
+    def total_items(self, obj):
+        return obj._total_items
+
+    @admin.display(ordering="_total_cost")
+    def total_cost(self, obj):
+        return obj._total_cost
+
+
+class OrderItemAdmin(ScalableModelAdmin):
+    list_display = ("order", "product", "quantity", "cost", "created_at")
+    list_filter = ("created_at",)
+    list_select_related = ("order__buyer", "product")
+    search_fields = ("order__id__exact", "product__name", "order__buyer__email")
+    autocomplete_fields = ("order", "product")
+
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(
+                _cost=ExpressionWrapper(
+                    F("quantity") * F("product__price"), output_field=MONEY
+                )
+            )
+        )
+
+    @admin.display(ordering="_cost")
+    def cost(self, obj):
+        return obj._cost
+
+
+admin.site.register(Order, OrderAdmin)
+admin.site.register(OrderItem, OrderItemAdmin)
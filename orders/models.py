@@ -37,6 +37,7 @@ class Order(models.Model):
 
     class Meta:
         ordering = ("-created_at",)
+        indexes = [models.Index(fields=["created_at", "id"], name="order_created_idx")]
 
     def __str__(self):
         return self.buyer.get_full_name()
@@ -63,6 +64,7 @@ class OrderItem(models.Model):
 
     class Meta:
         ordering = ("-created_at",)
+        indexes = [models.Index(fields=["created_at", "id"], name="orderitem_created_idx")]
 
     def __str__(self):
         return self.order.buyer.get_full_name()
@@ -1,9 +1,6 @@
-from django.shortcuts import get_object_or_404
 from django.utils.translation import gettext_lazy as _
 from rest_framework.permissions import BasePermission
 
-from orders.models import Order
-
 
 class IsOrderPending(BasePermission):
     """
@@ -24,12 +21,12 @@ class IsOrderItemByBuyerOrAdmin(BasePermission):
     """
 
     def has_permission(self, request, view):
-        order_id = view.kwargs.get("order_id")
-        order = get_object_or_404(Order, id=order_id)
+        order = view.get_order()
         return order.buyer == request.user or request.user.is_staff
 
     def has_object_permission(self, request, view, obj):
-        return obj.order.buyer == request.user or request.user.is_staff
+        order = view.get_order()
+        return order.buyer == request.user or request.user.is_staff
 
 
 class IsOrderByBuyerOrAdmin(BasePermission):
@@ -54,15 +51,12 @@ class IsOrderItemPending(BasePermission):
     )
 
     def has_permission(self, request, view):
-        order_id = view.kwargs.get("order_id")
-        order = get_object_or_404(Order, id=order_id)
-
         if view.action in ("list",):
             return True
 
-        return order.status == "P"
+        return view.get_order().status == "P"
 
     def has_object_permission(self, request, view, obj):
         if view.action in ("retrieve",):
             return True
-        return obj.order.status == "P"
+        return view.get_order().status == "P"
@@ -2,6 +2,7 @@ from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 from rest_framework.exceptions import PermissionDenied
 
+from config.serializers import Computed, FromData, Many, ValuesSerializer, full_name
 from orders.models import Order, OrderItem
 
 
@@ -31,19 +32,23 @@ class OrderItemSerializer(serializers.ModelSerializer):
         order_quantity = validated_data["quantity"]
         product_quantity = validated_data["product"].quantity
 
-        order_id = self.context["view"].kwargs.get("order_id")
+        # Only set on nested order item routes, new orders have no items yet
+        order = self.context.get("order")
         product = validated_data["product"]
-        current_item = OrderItem.objects.filter(order__id=order_id, product=product)
 
         if order_quantity > product_quantity:
             error = {"quantity": _("Ordered quantity is more than the stock.")}
             raise serializers.ValidationError(error)
 
-        if not self.instance and current_item.count() > 0:
+        if (
+            order is not None
+            and not self.instance
+            and order.order_items.filter(product=product).exists()
+        ):
             error = {"product": _("Product already exists in your order.")}
             raise serializers.ValidationError(error)
 
-        if self.context["request"].user == product.seller:
+        if self.context["request"].user.id == product.seller_id:
             error = _("Adding your own product to your order is not allowed")
             raise PermissionDenied(error)
 
@@ -84,6 +89,35 @@ class OrderReadSerializer(serializers.ModelSerializer):
         return obj.total_cost
 
 
+class OrderItemValuesSerializer(ValuesSerializer):
+    """
+    ``OrderItemSerializer`` output for lists, built from ``.values()`` rows
+    """
+
+    serializer_class = OrderItemSerializer
+    mappers = {
+        "price": Computed(("product__price",), lambda price: price),
+        "cost": Computed(
+            ("quantity", "product__price"), lambda quantity, price: round(quantity * price, 2)
+        ),
+    }
+
+
+class OrderValuesSerializer(ValuesSerializer):
+    """
+    ``OrderReadSerializer`` output for lists, built from ``.values()`` rows
+    """
+
+    serializer_class = OrderReadSerializer
+    mappers = {
+        "buyer": Computed(("buyer__first_name", "buyer__last_name"), full_name),
+        "order_items": Many(OrderItemValuesSerializer, "order"),
+        "total_cost": FromData(
+            lambda data: round(sum([item["cost"] for item in data["order_items"]]), 2)
+        ),
+    }
+
+
 class OrderWriteSerializer(serializers.ModelSerializer):
     """
     Serializer class for creating orders and order items
@@ -0,0 +1,137 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase
+from rest_framework.test import APITestCase
+
+from config.testing import QueryBudgetMixin, ValuesParityMixin
+from orders.models import Order, OrderItem
+from orders.serializers import OrderItemValuesSerializer, OrderValuesSerializer
+from payment.models import Payment
+from products.models import Product, ProductCategory
+from users.models import Address
+
+User = get_user_model()
+
+
+class OrderValuesSerializerTests(ValuesParityMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seller = User.objects.create_user(
+            username="seller", email="seller@example.com", password="secret"
+        )
+        buyer = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="secret",
+            first_name="Ravi", last_name="",
+        )
+        category = ProductCategory.objects.create(name="Books", icon="category/books.png")
+        products = [
+            Product.objects.create(
+                seller=seller,
+                category=category,
+                name=f"Product {price}",
+                image="products/product.jpg",
+                price=Decimal(price),
+                quantity=10,
+            )
+            for price in ("10.10", "0.33", "199.99")
+        ]
+        address = Address.objects.create(
+            user=buyer,
+            address_type=Address.SHIPPING,
+            country="IN",
+            city="Pune",
+            street_address="1 Test Street",
+            apartment_address="Flat 2",
+        )
+
+        # Addresses, payment and items set
+        paid = Order.objects.create(
+            buyer=buyer, shipping_address=address, billing_address=address
+        )
+        Payment.objects.create(order=paid, payment_option=Payment.STRIPE)
+        OrderItem.objects.bulk_create(
+            OrderItem(order=paid, product=product, quantity=quantity)
+            for product, quantity in zip(products, (3, 7, 1))
+        )
+        # Nothing but the buyer: null addresses, no payment, no items
+        Order.objects.create(buyer=buyer)
+
+        cls.contexts = {
+            "without request": {},
+            "with request": {"request": RequestFactory().get("/api/user/orders/")},
+        }
+
+    def test_orders(self):
+        queryset = Order.objects.select_related("buyer", "payment").prefetch_related(
+            "order_items__product"
+        )
+        for label, context in self.contexts.items():
+            with self.subTest(label):
+                data = self.assertValuesParity(queryset, OrderValuesSerializer, context)
+                self.assertEqual(len(data), 2)
+
+        empty = next(order for order in data if order["payment"] is None)
+        self.assertEqual(empty["order_items"], [])
+        self.assertEqual(empty["total_cost"], 0)
+        self.assertIsNone(empty["shipping_address"])
+
+    def test_order_items(self):
+        queryset = OrderItem.objects.select_related("product")
+        for label, context in self.contexts.items():
+            with self.subTest(label):
+                self.assertValuesParity(queryset, OrderItemValuesSerializer, context)
+
+
+class OrderItemQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    # The order, loaded once for the permissions, and the items with their price
+    query_budgets = {"orders:orderitem-list": 2}
+
+    @classmethod
+    def setUpTestData(cls):
+        seller = User.objects.create_user(
+            username="seller", email="seller@example.com", password="secret"
+        )
+        cls.buyer = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="secret"
+        )
+        category = ProductCategory.objects.create(name="Books", icon="category/books.png")
+        products = Product.objects.bulk_create(
+            Product(
+                seller=seller,
+                category=category,
+                name=f"Product {i}",
+                image="products/product.jpg",
+                price=Decimal("9.99"),
+                quantity=10,
+            )
+            for i in range(10)
+        )
+        cls.small_order = Order.objects.create(buyer=cls.buyer)
+        OrderItem.objects.create(order=cls.small_order, product=products[0], quantity=1)
+        cls.large_order = Order.objects.create(buyer=cls.buyer)
+        OrderItem.objects.bulk_create(
+            OrderItem(order=cls.large_order, product=product, quantity=2)
+            for product in products
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.buyer)
+
+    def test_order_items_list(self):
+        # The budget does not depend on the number of items
+        for order, count in ((self.small_order, 1), (self.large_order, 10)):
+            # The router prefix is a regex, which reverse() cannot rebuild
+            url = f"/api/user/orders/{order.id}/order-items/"
+            with self.subTest(items=count):
+                with self.assertQueryBudget("orders:orderitem-list"):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()), count)
+
+    def test_budget_exceeded(self):
+        with self.assertRaisesRegex(AssertionError, "block executed 10 queries, budget is 2"):
+            with self.assertQueryBudget(2):
+                # One query per item, the N+1 pattern the budget guards against
+                for item in OrderItem.objects.filter(order=self.large_order).order_by("id")[:9]:
+                    item.product.name
@@ -1,6 +1,9 @@
 from django.shortcuts import get_object_or_404
 from rest_framework import viewsets
 
+from config.db.routers import ReplicaReadMixin
+from config.permissions import ActionPermissionsMixin
+from config.serializers import ValuesListMixin
 from orders.models import Order, OrderItem
 from orders.permissions import (
     IsOrderByBuyerOrAdmin,
@@ -10,43 +13,67 @@ from orders.permissions import (
 )
 from orders.serializers import (
     OrderItemSerializer,
+    OrderItemValuesSerializer,
     OrderReadSerializer,
+    OrderValuesSerializer,
     OrderWriteSerializer,
 )
 
 
-class OrderItemViewSet(viewsets.ModelViewSet):
+class OrderItemViewSet(ValuesListMixin, ActionPermissionsMixin, viewsets.ModelViewSet):
     """
     CRUD order items that are associated with the current order id.
     """
 
     queryset = OrderItem.objects.all()
     serializer_class = OrderItemSerializer
+    values_serializer_class = OrderItemValuesSerializer
     permission_classes = [IsOrderItemByBuyerOrAdmin]
+    extra_permission_classes = {
+        action: [IsOrderItemPending]
+        for action in ("create", "update", "partial_update", "destroy")
+    }
 
     def get_queryset(self):
         res = super().get_queryset()
         order_id = self.kwargs.get("order_id")
-        return res.filter(order__id=order_id)
+        return res.filter(order__id=order_id).select_related("product")
+
+    def get_order(self):
+        """
+        Get the order of the nested route, loaded once per request and shared
+        by the permissions, the view and the serializer
+        """
+        if not hasattr(self, "_order"):
+            self._order = get_object_or_404(
+                Order.objects.select_related("buyer"), id=self.kwargs.get("order_id")
+            )
+        return self._order
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if "order_id" in self.kwargs:
+            context["order"] = self.get_order()
+        return context
 
     def perform_create(self, serializer):
-        order = get_object_or_404(Order, id=self.kwargs.get("order_id"))
-        serializer.save(order=order)
-
-    def get_permissions(self):
-        if self.action in ("create", "update", "partial_update", "destroy"):
-            self.permission_classes += [IsOrderItemPending]
-
-        return super().get_permissions()
+        serializer.save(order=self.get_order())
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(
+    ValuesListMixin, ActionPermissionsMixin, ReplicaReadMixin, viewsets.ModelViewSet
+):
     """
     CRUD orders of a user
     """
 
     queryset = Order.objects.all()
+    values_serializer_class = OrderValuesSerializer
     permission_classes = [IsOrderByBuyerOrAdmin]
+    extra_permission_classes = {
+        action: [IsOrderPending] for action in ("update", "partial_update", "destroy")
+    }
+    replica_actions = ("list",)
 
     def get_serializer_class(self):
         if self.action in ("create", "update", "partial_update", "destroy"):
@@ -58,9 +85,3 @@ class OrderViewSet(viewsets.ModelViewSet):
         res = super().get_queryset()
         user = self.request.user
         return res.filter(buyer=user)
-
-    def get_permissions(self):
-        if self.action in ("update", "partial_update", "destroy"):
-            self.permission_classes += [IsOrderPending]
-
-        return super().get_permissions()
@@ -1,5 +1,15 @@
 from django.contrib import admin
 
+from config.admin import ScalableModelAdmin
 from payment.models import Payment
 
-admin.site.register(Payment)
+
+class PaymentAdmin(ScalableModelAdmin):
+    list_display = ("order", "payment_option", "status", "created_at")
+    list_filter = ("status", "payment_option", "created_at")
+    list_select_related = ("order__buyer",)
+    search_fields = ("order__id__exact", "order__buyer__email")
+    autocomplete_fields = ("order",)
+
+
+admin.site.register(Payment, PaymentAdmin)
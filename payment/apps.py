@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class PaymentConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "payment"
+
+    def ready(self):
+        import stripe
+        from django.conf import settings
+
+        from config.http import stripe_http_client
+
+        stripe.api_key = settings.STRIPE_SECRET_KEY
+        # Keep-alive connections, timeouts and retries shared by all Stripe calls
+        stripe.default_http_client = stripe_http_client()
@@ -0,0 +1,125 @@
+"""
+Products and prices mirrored in the Stripe catalog.
+
+Every ``Product`` gets a Stripe Product and a Price for its current price. Their
+ids are stored on the product, so a checkout session only sends a price id per
+line instead of the whole product. Stripe prices cannot change amount: when
+the price of a product changes a new Price is created and the old one is
+archived.
+
+Syncing happens in ``payment.tasks.sync_stripe_product_task``, scheduled by
+``schedule_product_sync`` once the change is committed. Until a product is
+synced, checkout falls back to inline ``price_data``.
+"""
+
+import logging
+
+import stripe
+from django.conf import settings
+from django.db import transaction
+
+from products.models import Product
+
+logger = logging.getLogger(__name__)
+
+CURRENCY = "usd"
+
+
+def product_image_url(product):
+    image = str(product.image)
+    if image.startswith(("http://", "https://")):
+        return image
+    return f"{settings.BACKEND_DOMAIN}{product.image.url}"
+
+
+# Product fields Stripe objects are built from, other edits (stock) need no sync
+SYNCED_FIELDS = ("name", "desc", "image", "price")
+
+
+def product_data(product):
+    data = {
+        "name": product.name,
+        "images": [product_image_url(product)] if product.image else [],
+        "metadata": {"product_id": product.id},
+    }
+    if product.desc:
+        data["description"] = product.desc
+    return data
+
+
+def sync_product(product):
+    """
+    Create or update the Stripe Product and Price of ``product``.
+    """
+    updates = {}
+    data = product_data(product)
+
+    stripe_product_id = product.stripe_product_id
+    if stripe_product_id:
+        # An empty description removes the one set before
+        stripe.Product.modify(stripe_product_id, **{"description": "", **data})
+    else:
+        stripe_product_id = stripe.Product.create(
+            **data, idempotency_key=f"product-{product.id}"
+        ).id
+        updates["stripe_product_id"] = stripe_product_id
+
+    if not product.has_stripe_price:
+        # The key includes the replaced price, so going back to an earlier
+        # amount still creates a new Price
+        price = stripe.Price.create(
+            product=stripe_product_id,
+            currency=CURRENCY,
+            unit_amount_decimal=str(product.price),
+            idempotency_key=(
+                f"price-{product.id}-{product.price}-{product.stripe_price_id or 'new'}"
+            ),
+        )
+        if product.stripe_price_id:
+            stripe.Price.modify(product.stripe_price_id, active=False)
+        updates["stripe_price_id"] = price.id
+        updates["stripe_price_amount"] = product.price
+
+    if updates:
+        Product.objects.filter(id=product.id).update(**updates)
+        logger.info(
+            "Synced product %s to Stripe", product.id, extra={"fields": sorted(updates)}
+        )
+
+
+def synced_values(product):
+    """
+    Return the values of the ``SYNCED_FIELDS`` of ``product``, to tell whether
+    an edit needs a sync.
+    """
+    values = {field: getattr(product, field) for field in SYNCED_FIELDS}
+    # The file object is updated in place when a new image is saved
+    values["image"] = product.image.name
+    return values
+
+
+def schedule_product_sync(product):
+    """
+    Sync ``product`` to Stripe in the background once the transaction commits.
+    """
+    from payment.tasks import sync_stripe_product_task
+
+    transaction.on_commit(lambda: sync_stripe_product_task.delay(product.id))
+
+
+def checkout_line_item(product, quantity):
+    """
+    Return the checkout session line item for ``quantity`` of ``product``.
+    """
+    if product.has_stripe_price:
+        return {"price": product.stripe_price_id, "quantity": quantity}
+
+    # Not synced yet, or the price changed since
+    return {
+        "price_data": {
+            "currency": CURRENCY,
+            "unit_amount_decimal": product.price,
+            "product_data": product_data(product),
+        },
+        "quantity": quantity,
+    }
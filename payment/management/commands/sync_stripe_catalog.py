@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from payment.catalog import sync_product
+from payment.tasks import sync_stripe_product_task
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Create or update the Stripe Products and Prices of products that have "
+        "none, or whose price changed since"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all", action="store_true", help="Sync every product, e.g. after renames"
+        )
+        parser.add_argument(
+            "--now", action="store_true", help="Sync here instead of in Celery tasks"
+        )
+
+    def handle(self, *args, **options):
+        products = Product.objects.order_by("id")
+        if not options["all"]:
+            products = products.filter(
+                Q(stripe_price_id="")
+                | Q(stripe_price_amount__isnull=True)
+                | ~Q(stripe_price_amount=F("price"))
+            )
+
+        count = 0
+        for product in products.iterator():
+            if options["now"]:
+                sync_product(product)
+            else:
+                sync_stripe_product_task.delay(product.id)
+            count += 1
+
+        action = "Synced" if options["now"] else "Scheduled sync of"
+        self.stdout.write(self.style.SUCCESS(f"{action} {count} products"))
@@ -1,3 +1,4 @@
+from django.db import transaction
 from rest_framework import serializers
 
 from orders.models import Order
@@ -6,6 +7,15 @@ from users.models import Address
 from users.serializers import BillingAddressSerializer, ShippingAddressSerializer
 
 
+def save_fields(instance, data):
+    """
+    Set ``data`` on ``instance`` and write only those columns
+    """
+    for attr, value in data.items():
+        setattr(instance, attr, value)
+    instance.save(update_fields=[*data, "updated_at"])
+
+
 class PaymentSerializer(serializers.ModelSerializer):
     """
     Serializer to CRUD payments for an order.
@@ -67,55 +77,70 @@ class CheckoutSerializer(serializers.ModelSerializer):
         )
 
     def update(self, instance, validated_data):
-        order_shipping_address = None
-        order_billing_address = None
-        order_payment = None
-
-        shipping_address = validated_data["shipping_address"]
-
-        # Shipping address for an order is not set
-        if not instance.shipping_address:
-            order_shipping_address = Address(**shipping_address)
-            order_shipping_address.save()
-        else:
-            # Shipping address for an order is already set so update its value
-            address = Address.objects.filter(shipping_orders=instance.id)
-            address.update(**shipping_address)
-
-            order_shipping_address = address.first()
-
-        billing_address = validated_data["billing_address"]
-
-        # Billing address is not set for an order
-        if not instance.billing_address:
-            order_billing_address = Address(**billing_address)
-            order_billing_address.save()
-
-        else:
-            # Billing address is set so update its value
-            address = Address.objects.filter(billing_orders=instance.id)
-            address.update(**billing_address)
-
-            order_billing_address = address.first()
-
-        payment = validated_data["payment"]
-
-        # Payment option is not set for an order
-        if not instance.payment:
-            order_payment = Payment(**payment, order=instance)
-            order_payment.save()
-
-        else:
-            # Payment option is set so update its value
-            p = Payment.objects.filter(order=instance)
-            p.update(**payment)
-
-            order_payment = p.first()
-
-        # Update order
-        instance.shipping_address = order_shipping_address
-        instance.billing_address = order_billing_address
-        instance.payment = order_payment
-        instance.save()
-
+        """
+        Set addresses and payment of the order in one transaction
+
+        Addresses are taken from the buyer's address book, payment rows the
+        order already has (selected along with it by the view) are updated in
+        place with only the submitted columns, and nothing is read back
+        afterwards.
+        """
+        with transaction.atomic():
+            instance.shipping_address, instance.billing_address = self.get_addresses(
+                instance,
+                validated_data["shipping_address"],
+                validated_data["billing_address"],
+            )
+
+            payment_data = validated_data["payment"]
+            try:
+                payment = instance.payment
+            except Payment.DoesNotExist:
+                # update_or_create copes with a concurrent checkout creating it first
+                payment, _ = Payment.objects.update_or_create(
+                    order=instance, defaults=payment_data
+                )
+            else:
+                save_fields(payment, payment_data)
+
+            instance.save(
+                update_fields=["shipping_address", "billing_address", "updated_at"]
+            )
+
+        instance.payment = payment
         return instance
+
+    @staticmethod
+    def get_addresses(instance, *addresses_data):
+        """
+        Return the address book rows matching ``addresses_data``, creating the
+        missing ones
+
+        Rows are shared by fingerprint, so they are never edited in place.
+        """
+        user = addresses_data[0]["user"]
+        fingerprints = [Address.make_fingerprint(data) for data in addresses_data]
+
+        known = {
+            address.fingerprint: address
+            for address in (instance.shipping_address, instance.billing_address)
+            if address is not None and address.user_id == user.id
+        }
+        missing = set(fingerprints) - set(known)
+        if missing:
+            known.update(
+                (address.fingerprint, address)
+                for address in Address.objects.filter(
+                    user=user, fingerprint__in=missing
+                )
+            )
+
+        addresses = []
+        for fingerprint, data in zip(fingerprints, addresses_data):
+            if fingerprint not in known:
+                # get_or_create copes with a concurrent checkout creating it first
+                known[fingerprint], _ = Address.objects.get_or_create(
+                    user=user, fingerprint=fingerprint, defaults=data
+                )
+            addresses.append(known[fingerprint])
+        return addresses
@@ -1,7 +1,11 @@
+import stripe
 from celery import shared_task
 from django.conf import settings
 from django.core.mail import send_mail
 
+from payment.catalog import sync_product
+from products.models import Product
+
 
 @shared_task()
 def send_payment_success_email_task(email_address):
@@ -14,3 +18,17 @@ def send_payment_success_email_task(email_address):
         recipient_list=[email_address],
         from_email=settings.EMAIL_HOST_USER,
     )
+
+
+@shared_task(
+    autoretry_for=(stripe.error.APIConnectionError, stripe.error.RateLimitError),
+    retry_backoff=True,
+    max_retries=5,
+)
+def sync_stripe_product_task(product_id):
+    """
+    Celery task to create or update the Stripe Product and Price of a product
+    """
+    product = Product.objects.filter(id=product_id).first()
+    if product is not None:
+        sync_product(product)
@@ -0,0 +1,195 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from orders.models import Order
+from payment.catalog import checkout_line_item, sync_product
+from payment.models import Payment
+from products.models import Product, ProductCategory
+from products.serializers import ProductWriteSerializer
+from users.models import Address
+
+User = get_user_model()
+
+
+class CheckoutAddressTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="secret"
+        )
+        cls.address = {
+            "country": "IN",
+            "city": "Pune",
+            "street_address": "1 Test Street",
+            "apartment_address": "Flat 2",
+            "postal_code": "411001",
+        }
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def checkout(self, order, shipping, billing):
+        return self.client.put(
+            reverse("payment:checkout", kwargs={"pk": order.pk}),
+            {
+                "shipping_address": shipping,
+                "billing_address": billing,
+                "payment": {"payment_option": Payment.STRIPE},
+            },
+            format="json",
+        )
+
+    def test_addresses_are_reused(self):
+        first = Order.objects.create(buyer=self.user)
+        response = self.checkout(first, self.address, self.address)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Address.objects.filter(user=self.user).count(), 1)
+
+        # The same address typed differently maps to the same row
+        retyped = {
+            **self.address,
+            "city": " PUNE ",
+            "street_address": "1  test street",
+            "postal_code": "411 001",
+        }
+        second = Order.objects.create(buyer=self.user)
+        response = self.checkout(second, retyped, self.address)
+        self.assertEqual(response.status_code, 200)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(Address.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(second.shipping_address_id, first.shipping_address_id)
+        self.assertEqual(second.billing_address_id, first.billing_address_id)
+
+    def test_changed_address_does_not_edit_shared_row(self):
+        first = Order.objects.create(buyer=self.user)
+        self.checkout(first, self.address, self.address)
+        second = Order.objects.create(buyer=self.user)
+        self.checkout(second, self.address, self.address)
+
+        moved = {**self.address, "city": "Mumbai"}
+        response = self.checkout(second, moved, self.address)
+        self.assertEqual(response.status_code, 200)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.shipping_address.city, "Pune")
+        self.assertEqual(second.shipping_address.city, "Mumbai")
+        self.assertEqual(second.billing_address_id, first.billing_address_id)
+        self.assertEqual(Address.objects.filter(user=self.user).count(), 2)
+
+
+class StripeCatalogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(
+            seller=User.objects.create_user(
+                username="seller", email="seller@example.com", password="secret"
+            ),
+            category=ProductCategory.objects.create(name="Books", icon="books.png"),
+            name="Book",
+            image="https://cdn.example.com/book.jpg",
+            price=Decimal("5.00"),
+            quantity=3,
+        )
+
+    def setUp(self):
+        patcher = mock.patch("payment.catalog.stripe")
+        self.stripe = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.stripe.Product.create.return_value = mock.Mock(id="prod_1")
+        self.prices = iter(f"price_{number}" for number in range(1, 10))
+        self.stripe.Price.create.side_effect = lambda **kwargs: mock.Mock(
+            id=next(self.prices)
+        )
+
+    def sync(self, **changes):
+        Product.objects.filter(id=self.product.id).update(**changes)
+        self.product.refresh_from_db()
+        sync_product(self.product)
+        self.product.refresh_from_db()
+
+    def test_first_sync_creates_product_and_price(self):
+        self.sync()
+
+        self.stripe.Product.create.assert_called_once()
+        self.stripe.Price.create.assert_called_once()
+        self.assertEqual(
+            self.stripe.Price.create.call_args.kwargs["unit_amount_decimal"], "5.00"
+        )
+        self.stripe.Price.modify.assert_not_called()
+        self.assertEqual(self.product.stripe_product_id, "prod_1")
+        self.assertEqual(self.product.stripe_price_id, "price_1")
+        self.assertTrue(self.product.has_stripe_price)
+
+    def test_price_change_replaces_the_price(self):
+        self.sync()
+        self.sync(price=Decimal("6.00"))
+
+        self.stripe.Product.create.assert_called_once()
+        self.stripe.Product.modify.assert_called_once()
+        self.assertEqual(self.stripe.Price.create.call_count, 2)
+        self.stripe.Price.modify.assert_called_once_with("price_1", active=False)
+        self.assertEqual(self.product.stripe_price_id, "price_2")
+        self.assertEqual(self.product.stripe_price_amount, Decimal("6.00"))
+
+    def test_earlier_amount_gets_a_new_price(self):
+        self.sync()
+        self.sync(price=Decimal("6.00"))
+        self.sync(price=Decimal("5.00"))
+
+        keys = [
+            call.kwargs["idempotency_key"]
+            for call in self.stripe.Price.create.call_args_list
+        ]
+        self.assertEqual(len(keys), 3)
+        self.assertEqual(len(set(keys)), 3)
+        self.assertEqual(self.product.stripe_price_id, "price_3")
+
+    def test_synced_product_is_left_alone(self):
+        self.sync()
+        self.sync(quantity=10)
+
+        self.stripe.Price.create.assert_called_once()
+        self.assertEqual(self.product.stripe_price_id, "price_1")
+
+    def test_line_item_falls_back_to_price_data(self):
+        self.assertEqual(
+            checkout_line_item(self.product, 2)["price_data"]["unit_amount_decimal"],
+            Decimal("5.00"),
+        )
+
+        self.sync()
+        self.assertEqual(
+            checkout_line_item(self.product, 2), {"price": "price_1", "quantity": 2}
+        )
+
+        # Changed but not synced again yet
+        Product.objects.filter(id=self.product.id).update(price=Decimal("6.00"))
+        self.product.refresh_from_db()
+        self.assertFalse(self.product.has_stripe_price)
+        line_item = checkout_line_item(self.product, 2)
+        self.assertNotIn("price", line_item)
+        self.assertEqual(
+            line_item["price_data"]["unit_amount_decimal"], Decimal("6.00")
+        )
+
+    def update(self, data):
+        serializer = ProductWriteSerializer(self.product, data=data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        with mock.patch("payment.tasks.sync_stripe_product_task.delay") as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                serializer.save()
+        return delay
+
+    def test_stock_edit_is_not_synced(self):
+        self.update({"quantity": 10}).assert_not_called()
+
+    def test_price_edit_is_synced(self):
+        self.update({"price": "6.00"}).assert_called_once_with(self.product.id)
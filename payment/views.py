@@ -1,3 +1,5 @@
+import logging
+
 import stripe
 from django.conf import settings
 from django.shortcuts import get_object_or_404
@@ -7,8 +9,10 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
+from config.permissions import ActionPermissionsMixin
 from orders.models import Order
 from orders.permissions import IsOrderByBuyerOrAdmin
+from payment.catalog import checkout_line_item
 from payment.models import Payment
 from payment.permissions import (
     DoesOrderHaveAddress,
@@ -20,10 +24,10 @@ from payment.permissions import (
 from payment.serializers import CheckoutSerializer, PaymentSerializer
 from payment.tasks import send_payment_success_email_task
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
+logger = logging.getLogger(__name__)
 
 
-class PaymentViewSet(ModelViewSet):
+class PaymentViewSet(ActionPermissionsMixin, ModelViewSet):
     """
     CRUD payment for an order
     """
@@ -31,33 +35,29 @@ class PaymentViewSet(ModelViewSet):
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
     permission_classes = [IsPaymentByUser]
+    extra_permission_classes = {
+        action: [IsPaymentPending] for action in ("update", "partial_update", "destroy")
+    }
 
     def get_queryset(self):
         res = super().get_queryset()
         user = self.request.user
         return res.filter(order__buyer=user)
 
-    def get_permissions(self):
-        if self.action in ("update", "partial_update", "destroy"):
-            self.permission_classes += [IsPaymentPending]
-
-        return super().get_permissions()
-
 
-class CheckoutAPIView(RetrieveUpdateAPIView):
+class CheckoutAPIView(ActionPermissionsMixin, RetrieveUpdateAPIView):
     """
     Create, Retrieve, Update billing address, shipping address and payment of an order
     """
 
-    queryset = Order.objects.all()
+    queryset = Order.objects.select_related(
+        "buyer", "payment", "shipping_address", "billing_address"
+    )
     serializer_class = CheckoutSerializer
     permission_classes = [IsOrderByBuyerOrAdmin]
-
-    def get_permissions(self):
-        if self.request.method in ("PUT", "PATCH"):
-            self.permission_classes += [IsOrderPendingWhenCheckout]
-
-        return super().get_permissions()
+    extra_permission_classes = {
+        method: [IsOrderPendingWhenCheckout] for method in ("PUT", "PATCH")
+    }
 
 
 class StripeCheckoutSessionCreateAPIView(APIView):
@@ -73,30 +73,14 @@ class StripeCheckoutSessionCreateAPIView(APIView):
     def post(self, request, *args, **kwargs):
         order = get_object_or_404(Order, id=self.kwargs.get("order_id"))
 
-        order_items = []
-
-        for order_item in order.order_items.all():
-            product = order_item.product
-            quantity = order_item.quantity
-
-            data = {
-                "price_data": {
-                    "currency": "usd",
-                    "unit_amount_decimal": product.price,
-                    "product_data": {
-                        "name": product.name,
-                        "description": product.desc,
-                        "images": [f"{settings.BACKEND_DOMAIN}{product.image.url}"],
-                    },
-                },
-                "quantity": quantity,
-            }
-
-            order_items.append(data)
+        line_items = [
+            checkout_line_item(order_item.product, order_item.quantity)
+            for order_item in order.order_items.select_related("product")
+        ]
 
         checkout_session = stripe.checkout.Session.create(
             payment_method_types=["card"],
-            line_items=order_items,
+            line_items=line_items,
             metadata={"order_id": order.id},
             mode="payment",
             success_url=settings.PAYMENT_SUCCESS_URL,
@@ -131,7 +115,7 @@ class StripeWebhookAPIView(APIView):
             customer_email = session["customer_details"]["email"]
             order_id = session["metadata"]["order_id"]
 
-            print("Payment successfull")
+            logger.info("Payment successful", extra={"order_id": order_id})
 
             payment = get_object_or_404(Payment, order=order_id)
             payment.status = "C"
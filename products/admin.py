@@ -1,27 +1,78 @@
 from django.contrib import admin
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, PositiveIntegerField
 
+from config.admin import ScalableModelAdmin, subquery_sum
+from payment.catalog import SYNCED_FIELDS, schedule_product_sync
 from products.models import Product, ProductCategory, Cart, CartItem
 
+MONEY = DecimalField(decimal_places=2, max_digits=12)
+
 
 class CartItemInline(admin.TabularInline):
     model = CartItem
     extra = 0
+    autocomplete_fields = ('product',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product')
 
 
-class CartAdmin(admin.ModelAdmin):
+class CartAdmin(ScalableModelAdmin):
     list_display = ('user', 'total_items', 'total_cost', 'created_at')
     list_filter = ('created_at', 'updated_at')
+    list_select_related = ('user',)
     search_fields = ('user__email', 'user__first_name', 'user__last_name')
+    autocomplete_fields = ('user',)
     inlines = [CartItemInline]
 
+    def get_queryset(self, request):
+        items = CartItem.objects.filter(cart=OuterRef('pk'))
+        return super().get_queryset(request).annotate(
+            _total_items=subquery_sum(items, F('quantity'), PositiveIntegerField()),
+            _total_cost=subquery_sum(items, F('quantity') * F('product__price'), MONEY),
+        )
+
+    @admin.display(ordering='_total_items')
+    def total_items(self, obj):
+        return obj._total_items
+
+    @admin.display(ordering='_total_cost')
+    def total_cost(self, obj):
+        return obj._total_cost
+
 
-class CartItemAdmin(admin.ModelAdmin):
+class CartItemAdmin(ScalableModelAdmin):
     list_display = ('cart', 'product', 'quantity', 'total_price', 'created_at')
     list_filter = ('created_at', 'updated_at')
+    list_select_related = ('cart__user', 'product')
     search_fields = ('product__name', 'cart__user__email')
+    autocomplete_fields = ('cart', 'product')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            _total_price=ExpressionWrapper(F('quantity') * F('product__price'), output_field=MONEY)
+        )
+
+    @admin.display(ordering='_total_price')
+    def total_price(self, obj):
+        return obj._total_price
+
+
+class ProductAdmin(ScalableModelAdmin):
+    list_display = ('name', 'seller', 'category', 'price', 'quantity', 'created_at')
+    list_filter = ('category', 'created_at')
+    list_select_related = ('seller', 'category')
+    search_fields = ('name',)
+    autocomplete_fields = ('seller',)
+    readonly_fields = ('stripe_product_id', 'stripe_price_id', 'stripe_price_amount')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if not change or set(form.changed_data) & set(SYNCED_FIELDS):
+            schedule_product_sync(obj)
 
 
 admin.site.register(ProductCategory)
-admin.site.register(Product)
+admin.site.register(Product, ProductAdmin)
 admin.site.register(Cart, CartAdmin)
 admin.site.register(CartItem, CartItemAdmin)
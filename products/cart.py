@@ -0,0 +1,461 @@
+"""
+Cart storage engines.
+
+``CART_STORAGE = "database"`` (default) keeps carts as ``Cart``/``CartItem``
+rows. ``CART_STORAGE = "redis"`` keeps them as Redis hashes that expire after
+``CART_TTL_SECONDS`` of inactivity, supports anonymous carts identified by an
+``X-Cart-Token`` header and only touches PostgreSQL when the cart is checked
+out into an order.
+
+Both engines return the same representation as ``CartSerializer``.
+"""
+
+import logging
+import re
+import uuid
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from redis.exceptions import RedisError
+from rest_framework import serializers
+
+from config.cache import get_redis
+from products.models import Cart, CartItem, Product
+from products.serializers import CartItemValuesSerializer, ProductValuesSerializer
+
+logger = logging.getLogger(__name__)
+
+CART_TOKEN_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class CartError(Exception):
+    """
+    Raised when a cart operation cannot be applied, e.g. not enough stock.
+    """
+
+
+def apply_operations(quantities, operations):
+    """
+    Apply batch ``operations`` to a ``{product_id: quantity}`` mapping.
+
+    Operations are applied in order and the resulting mapping is returned.
+    """
+    quantities = dict(quantities)
+    for operation in operations:
+        product_id = operation["product_id"]
+        if operation["op"] == "add":
+            quantities[product_id] = quantities.get(product_id, 0) + operation["quantity"]
+        elif product_id not in quantities:
+            raise CartError(f"Product {product_id} is not in the cart")
+        elif operation["op"] == "update":
+            quantities[product_id] = operation["quantity"]
+        else:
+            del quantities[product_id]
+    return quantities
+
+
+def check_stock(quantities, product_ids):
+    """
+    Check the final quantities of ``product_ids`` against stock in one query.
+    """
+    product_ids = [product_id for product_id in product_ids if product_id in quantities]
+    products = Product.objects.in_bulk(product_ids)
+    for product_id in product_ids:
+        product = products.get(product_id)
+        if product is None:
+            raise CartError(f"Product {product_id} does not exist")
+        if quantities[product_id] > product.quantity:
+            raise CartError(
+                f"Only {product.quantity} items of {product.name} available in stock"
+            )
+
+
+class CartOwner:
+    """
+    The user, or the anonymous cart token, a cart belongs to.
+    """
+
+    def __init__(self, user=None, token=None):
+        self.user = user
+        self.token = token
+
+    @classmethod
+    def from_request(cls, request):
+        if request.user.is_authenticated:
+            return cls(user=request.user)
+
+        token = request.headers.get("X-Cart-Token", "")
+        if not CART_TOKEN_RE.match(token):
+            token = uuid.uuid4().hex
+        return cls(token=token)
+
+    @property
+    def key(self):
+        if self.user is not None:
+            return f"user:{self.user.pk}"
+        return f"anon:{self.token}"
+
+
+class DatabaseCartStore:
+    """
+    Carts stored as ``Cart`` and ``CartItem`` rows.
+    """
+
+    supports_anonymous = False
+
+    def get_cart(self, owner):
+        """
+        Get or create cart for the owner, once per request.
+        """
+        if not hasattr(owner, "_cart"):
+            cart, created = Cart.objects.get_or_create(user=owner.user)
+            if created:
+                logger.info(
+                    "Cart created", extra={"cart_id": cart.id, "user_id": cart.user_id}
+                )
+            owner._cart = cart
+        return owner._cart
+
+    def render(self, owner, context=None):
+        cart = self.get_cart(owner)
+        cart_items = CartItemValuesSerializer(
+            CartItem.objects.filter(cart=cart), context=context
+        ).data
+        timestamp = serializers.DateTimeField().to_representation
+
+        return {
+            "id": cart.id,
+            "user": str(owner.user),
+            "cart_items": cart_items,
+            "total_cost": sum(item["total_price"] for item in cart_items),
+            "total_items": sum(item["quantity"] for item in cart_items),
+            "created_at": timestamp(cart.created_at),
+            "updated_at": timestamp(cart.updated_at),
+        }
+
+    def add(self, owner, product, quantity):
+        cart = self.get_cart(owner)
+
+        # Check if item already exists in cart
+        cart_item, created = CartItem.objects.get_or_create(
+            cart=cart, product=product, defaults={"quantity": quantity}
+        )
+
+        if not created:
+            # Update quantity if item already exists
+            new_quantity = cart_item.quantity + quantity
+            if new_quantity > product.quantity:
+                raise CartError(f"Only {product.quantity} items available in stock")
+            cart_item.product = product
+            cart_item.quantity = new_quantity
+            cart_item.save()
+
+    def update(self, owner, item_id, quantity):
+        cart = self.get_cart(owner)
+        cart_item = get_object_or_404(
+            CartItem.objects.select_related("product"), id=item_id, cart=cart
+        )
+
+        # Check stock availability
+        if quantity > cart_item.product.quantity:
+            raise CartError(
+                f"Only {cart_item.product.quantity} items available in stock"
+            )
+
+        cart_item.quantity = quantity
+        cart_item.save()
+
+    def remove(self, owner, item_id):
+        cart = self.get_cart(owner)
+        cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
+        cart_item.delete()
+
+    def clear(self, owner):
+        self.get_cart(owner).cart_items.all().delete()
+
+    def batch(self, owner, operations):
+        """
+        Apply ``operations`` in one transaction with one statement per kind of write.
+        """
+        cart = self.get_cart(owner)
+        product_ids = {operation["product_id"] for operation in operations}
+
+        with transaction.atomic():
+            items = {
+                item.product_id: item
+                for item in cart.cart_items.select_for_update()
+            }
+            quantities = apply_operations(
+                {product_id: item.quantity for product_id, item in items.items()},
+                operations,
+            )
+            check_stock(quantities, product_ids)
+
+            now = timezone.now()
+            created, updated, removed = [], [], []
+            for product_id in product_ids:
+                item = items.get(product_id)
+                if product_id not in quantities:
+                    if item is not None:
+                        removed.append(item.id)
+                elif item is None:
+                    created.append(
+                        CartItem(
+                            cart=cart,
+                            product_id=product_id,
+                            quantity=quantities[product_id],
+                        )
+                    )
+                elif item.quantity != quantities[product_id]:
+                    # bulk_update() does not apply auto_now
+                    item.quantity = quantities[product_id]
+                    item.updated_at = now
+                    updated.append(item)
+
+            # Stock was checked above, CartItem.clean() is not needed
+            if created:
+                CartItem.objects.bulk_create(created)
+            if updated:
+                CartItem.objects.bulk_update(updated, ["quantity", "updated_at"])
+            if removed:
+                CartItem.objects.filter(id__in=removed).delete()
+
+    def lines(self, owner):
+        """
+        Return the ``(product, quantity)`` pairs in the cart.
+        """
+        items = self.get_cart(owner).cart_items.select_related("product")
+        return [(item.product, item.quantity) for item in items]
+
+    def merge(self, token, user):
+        """
+        Anonymous carts are not supported by this engine.
+        """
+
+
+class RedisCartStore:
+    """
+    Carts stored as two Redis hashes per owner.
+
+    ``cart:<owner>`` maps product ids to quantities, ``cart:<owner>:meta``
+    holds the creation and update timestamps of the cart and of each line.
+    Line ids are product ids.
+    """
+
+    supports_anonymous = True
+
+    # KEYS: items, meta. ARGV: product id, quantity, stock, now, ttl
+    ADD_SCRIPT = """
+    local quantity = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0') + tonumber(ARGV[2])
+    if quantity > tonumber(ARGV[3]) then
+        return -1
+    end
+    redis.call('HSET', KEYS[1], ARGV[1], quantity)
+    redis.call('HSETNX', KEYS[2], 'c:' .. ARGV[1], ARGV[4])
+    redis.call('HSET', KEYS[2], 'u:' .. ARGV[1], ARGV[4], '_updated', ARGV[4])
+    redis.call('HSETNX', KEYS[2], '_created', ARGV[4])
+    redis.call('EXPIRE', KEYS[1], ARGV[5])
+    redis.call('EXPIRE', KEYS[2], ARGV[5])
+    return quantity
+    """
+
+    # KEYS: anonymous items, anonymous meta, user items, user meta. ARGV: now, ttl
+    MERGE_SCRIPT = """
+    local items = redis.call('HGETALL', KEYS[1])
+    for i = 1, #items, 2 do
+        redis.call('HINCRBY', KEYS[3], items[i], items[i + 1])
+        redis.call('HSETNX', KEYS[4], 'c:' .. items[i], ARGV[1])
+        redis.call('HSET', KEYS[4], 'u:' .. items[i], ARGV[1])
+    end
+    if #items > 0 then
+        redis.call('HSETNX', KEYS[4], '_created', ARGV[1])
+        redis.call('HSET', KEYS[4], '_updated', ARGV[1])
+        redis.call('EXPIRE', KEYS[3], ARGV[2])
+        redis.call('EXPIRE', KEYS[4], ARGV[2])
+    end
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return #items / 2
+    """
+
+    def __init__(self):
+        self.redis = get_redis(settings.CART_REDIS_URL)
+        self.ttl = settings.CART_TTL_SECONDS
+        self.add_script = self.redis.register_script(self.ADD_SCRIPT)
+        self.merge_script = self.redis.register_script(self.MERGE_SCRIPT)
+
+    def keys(self, owner):
+        items = f"cart:{owner.key}"
+        return items, f"{items}:meta"
+
+    def now(self):
+        return serializers.DateTimeField().to_representation(timezone.now())
+
+    def touch(self, pipe, owner, now):
+        items, meta = self.keys(owner)
+        pipe.hset(meta, "_updated", now)
+        pipe.expire(items, self.ttl)
+        pipe.expire(meta, self.ttl)
+
+    def read(self, owner):
+        items, meta = self.keys(owner)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hgetall(items)
+        pipe.hgetall(meta)
+        quantities, timestamps = pipe.execute()
+        quantities = {int(key): int(value) for key, value in quantities.items()}
+        timestamps = {key.decode(): value.decode() for key, value in timestamps.items()}
+        return quantities, timestamps
+
+    def render(self, owner, context=None):
+        quantities, timestamps = self.read(owner)
+        products = {
+            product["id"]: product
+            for product in ProductValuesSerializer(
+                Product.objects.filter(id__in=list(quantities)), context=context
+            ).data
+        }
+
+        cart_items = []
+        for product_id, quantity in quantities.items():
+            product = products.get(product_id)
+            if product is None:
+                # Product was deleted since it was added
+                continue
+            cart_items.append(
+                {
+                    "id": product_id,
+                    "product": product,
+                    "quantity": quantity,
+                    "total_price": float(product["price"]) * quantity,
+                    "created_at": timestamps.get(f"c:{product_id}"),
+                    "updated_at": timestamps.get(f"u:{product_id}"),
+                }
+            )
+        cart_items.sort(key=lambda item: item["created_at"] or "", reverse=True)
+
+        return {
+            "id": None,
+            "user": str(owner.user) if owner.user is not None else None,
+            "cart_token": owner.token,
+            "cart_items": cart_items,
+            "total_cost": sum(item["total_price"] for item in cart_items),
+            "total_items": sum(item["quantity"] for item in cart_items),
+            "created_at": timestamps.get("_created"),
+            "updated_at": timestamps.get("_updated"),
+        }
+
+    def add(self, owner, product, quantity):
+        result = self.add_script(
+            keys=self.keys(owner),
+            args=[product.id, quantity, product.quantity, self.now(), self.ttl],
+        )
+        if result == -1:
+            raise CartError(f"Only {product.quantity} items available in stock")
+
+    def update(self, owner, item_id, quantity):
+        items, meta = self.keys(owner)
+        if not self.redis.hexists(items, item_id):
+            raise Http404
+
+        product = get_object_or_404(Product, id=item_id)
+        if quantity > product.quantity:
+            raise CartError(f"Only {product.quantity} items available in stock")
+
+        now = self.now()
+        pipe = self.redis.pipeline()
+        pipe.hset(items, item_id, quantity)
+        pipe.hset(meta, f"u:{item_id}", now)
+        self.touch(pipe, owner, now)
+        pipe.execute()
+
+    def remove(self, owner, item_id):
+        items, meta = self.keys(owner)
+        pipe = self.redis.pipeline()
+        pipe.hdel(items, item_id)
+        pipe.hdel(meta, f"c:{item_id}", f"u:{item_id}")
+        self.touch(pipe, owner, self.now())
+        removed = pipe.execute()[0]
+        if not removed:
+            raise Http404
+
+    def clear(self, owner):
+        self.redis.delete(*self.keys(owner))
+
+    def batch(self, owner, operations):
+        """
+        Apply ``operations`` in one MULTI/EXEC, retried if the cart changes meanwhile.
+        """
+        items, meta = self.keys(owner)
+        product_ids = {operation["product_id"] for operation in operations}
+
+        def apply(pipe):
+            current = {int(key): int(value) for key, value in pipe.hgetall(items).items()}
+            quantities = apply_operations(current, operations)
+            check_stock(quantities, product_ids)
+
+            now = self.now()
+            pipe.multi()
+            for product_id in product_ids:
+                if product_id in quantities:
+                    pipe.hset(items, product_id, quantities[product_id])
+                    pipe.hsetnx(meta, f"c:{product_id}", now)
+                    pipe.hset(meta, f"u:{product_id}", now)
+                elif product_id in current:
+                    pipe.hdel(items, product_id)
+                    pipe.hdel(meta, f"c:{product_id}", f"u:{product_id}")
+            pipe.hsetnx(meta, "_created", now)
+            self.touch(pipe, owner, now)
+
+        self.redis.transaction(apply, items)
+
+    def lines(self, owner):
+        quantities, _ = self.read(owner)
+        products = Product.objects.in_bulk(list(quantities))
+        return [
+            (products[product_id], quantity)
+            for product_id, quantity in quantities.items()
+            if product_id in products
+        ]
+
+    def merge(self, token, user):
+        """
+        Move the anonymous cart identified by ``token`` into the user's cart.
+        """
+        if not CART_TOKEN_RE.match(token or ""):
+            return
+        keys = self.keys(CartOwner(token=token)) + self.keys(CartOwner(user=user))
+        self.merge_script(keys=keys, args=[self.now(), self.ttl])
+
+
+CART_STORES = {
+    "database": DatabaseCartStore,
+    "redis": RedisCartStore,
+}
+
+
+@lru_cache(maxsize=None)
+def get_cart_store():
+    return CART_STORES[getattr(settings, "CART_STORAGE", "database")]()
+
+
+def merge_anonymous_cart(request, user):
+    """
+    Move the cart of the request's ``X-Cart-Token``, if any, into the cart of
+    ``user``, who just logged in.
+
+    The login has succeeded already, so a Redis failure is logged and only
+    loses the anonymous cart.
+    """
+    token = request.headers.get("X-Cart-Token")
+    if not token:
+        return
+    try:
+        get_cart_store().merge(token, user)
+    except RedisError:
+        logger.warning(
+            "Merging the anonymous cart failed", exc_info=True, extra={"user_id": user.pk}
+        )
@@ -0,0 +1,290 @@
+import hashlib
+import hmac
+import json
+import random
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from config.benchmark import (
+    BenchmarkRecorder,
+    benchmark_database,
+    format_results,
+    write_results,
+)
+from orders.models import Order, OrderItem
+from payment.models import Payment
+from products.models import Cart, CartItem, Product, ProductCategory
+from users.models import Profile
+
+User = get_user_model()
+
+WEBHOOK_SECRET = "whsec_benchmark"
+
+
+def seed(users, categories, products, orders, cart_items, seed_value=0):
+    """
+    Bulk create a synthetic catalog, carts and order history.
+
+    Returns the created buyers, products and the ids of orders that have a
+    pending payment attached.
+    """
+    rng = random.Random(seed_value)
+    password = make_password("benchmark-password")
+
+    User.objects.bulk_create(
+        User(
+            username=f"bench-user-{i}",
+            email=f"bench-user-{i}@example.com",
+            first_name="Bench",
+            last_name=f"User {i}",
+            password=password,
+        )
+        for i in range(users)
+    )
+    created_users = list(User.objects.filter(username__startswith="bench-user-"))
+    Profile.objects.bulk_create(Profile(user=user) for user in created_users)
+
+    # The first tenth of the users sell, everybody else buys
+    sellers = created_users[: max(1, users // 10)]
+    buyers = created_users[len(sellers) :] or created_users
+
+    ProductCategory.objects.bulk_create(
+        ProductCategory(
+            name=f"Bench category {i}", icon="product/category/icons/bench.png"
+        )
+        for i in range(categories)
+    )
+    created_categories = list(
+        ProductCategory.objects.filter(name__startswith="Bench category ")
+    )
+
+    Product.objects.bulk_create(
+        Product(
+            seller=rng.choice(sellers),
+            category=rng.choice(created_categories),
+            name=f"Bench product {i}",
+            desc="Synthetic product used by the API benchmark. " * 5,
+            image="product/images/bench/image.jpeg",
+            price=Decimal(rng.randint(100, 100000)) / 100,
+            quantity=1_000_000,
+        )
+        for i in range(products)
+    )
+    created_products = list(Product.objects.filter(name__startswith="Bench product "))
+
+    carts = Cart.objects.bulk_create(Cart(user=buyer) for buyer in buyers)
+    CartItem.objects.bulk_create(
+        CartItem(cart=cart, product=product, quantity=rng.randint(1, 5))
+        for cart in carts
+        for product in rng.sample(created_products, min(cart_items, products))
+    )
+
+    created_orders = Order.objects.bulk_create(
+        Order(buyer=rng.choice(buyers)) for _ in range(orders)
+    )
+    OrderItem.objects.bulk_create(
+        OrderItem(order=order, product=product, quantity=rng.randint(1, 3))
+        for order in created_orders
+        for product in rng.sample(created_products, min(3, products))
+    )
+
+    # Half of the orders already went through checkout and wait for the webhook
+    paid = created_orders[: len(created_orders) // 2]
+    Payment.objects.bulk_create(
+        Payment(order=order, payment_option=Payment.STRIPE) for order in paid
+    )
+
+    return buyers, created_products, [order.id for order in paid]
+
+
+def sign_webhook(payload):
+    """
+    Build a ``Stripe-Signature`` header for ``payload`` signed with WEBHOOK_SECRET.
+    """
+    timestamp = int(time.time())
+    signature = hmac.new(
+        WEBHOOK_SECRET.encode(),
+        f"{timestamp}.{payload}".encode(),
+        hashlib.sha256,
+    ).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+class Command(BaseCommand):
+    help = "Benchmark the main API flows in-process against a synthetic dataset"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--categories", type=int, default=10)
+        parser.add_argument("--products", type=int, default=500)
+        parser.add_argument("--orders", type=int, default=200)
+        parser.add_argument("--cart-items", type=int, default=3)
+        parser.add_argument(
+            "--iterations", type=int, default=50, help="Calls per scenario"
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--no-allocations",
+            action="store_true",
+            help="Do not trace allocations (lower overhead on latency)",
+        )
+        parser.add_argument("--keepdb", action="store_true")
+        parser.add_argument("--output", help="Path of the JSON results file")
+
+    def handle(self, *args, **options):
+        with benchmark_database(keepdb=options["keepdb"]):
+            with override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET):
+                results = self.run(options)
+
+        self.stdout.write(format_results(results))
+
+        parameters = {
+            key: options[key]
+            for key in (
+                "users",
+                "categories",
+                "products",
+                "orders",
+                "cart_items",
+                "iterations",
+                "seed",
+            )
+        }
+        path = write_results("api", results, parameters, options["output"])
+        self.stdout.write(self.style.SUCCESS(f"Results written to {path}"))
+
+    def run(self, options):
+        self.stdout.write("Seeding benchmark dataset...")
+        buyers, products, paid_order_ids = seed(
+            options["users"],
+            options["categories"],
+            options["products"],
+            options["orders"],
+            options["cart_items"],
+            options["seed"],
+        )
+
+        rng = random.Random(options["seed"])
+        client = Client(raise_request_exception=False)
+        tokens = {
+            buyer.id: f"Bearer {RefreshToken.for_user(buyer).access_token}"
+            for buyer in buyers
+        }
+        recorder = BenchmarkRecorder(trace_allocations=not options["no_allocations"])
+
+        def call(scenario, method, path, expected, user=None, **kwargs):
+            if user is not None:
+                kwargs["HTTP_AUTHORIZATION"] = tokens[user.id]
+            with recorder.measure(scenario) as sample:
+                response = getattr(client, method)(path, **kwargs)
+                sample["ok"] = response.status_code == expected
+            return response
+
+        self.stdout.write("Running scenarios...")
+
+        # The success email is sent through celery, keep the broker out of it
+        with recorder.running(), mock.patch(
+            "payment.views.send_payment_success_email_task.delay"
+        ):
+            for _ in range(options["iterations"]):
+                buyer = rng.choice(buyers)
+                product = rng.choice(products)
+
+                call("browse_products", "get", "/api/products/", 200)
+                call("product_detail", "get", f"/api/products/{product.id}/", 200)
+                call("browse_categories", "get", "/api/products/categories/", 200)
+                call("cart", "get", "/api/products/cart/me/", 200, user=buyer)
+                call(
+                    "add_to_cart",
+                    "post",
+                    "/api/products/cart/add_item/",
+                    201,
+                    user=buyer,
+                    data={"product_id": product.id, "quantity": 1},
+                    content_type="application/json",
+                )
+                call(
+                    "cart_batch",
+                    "post",
+                    "/api/products/cart/batch/",
+                    200,
+                    user=buyer,
+                    data={
+                        "operations": [
+                            {"op": "add", "product_id": p.id, "quantity": 1}
+                            for p in rng.sample(products, min(5, len(products)))
+                        ]
+                    },
+                    content_type="application/json",
+                )
+
+                order_products = rng.sample(products, min(3, len(products)))
+                response = call(
+                    "create_order",
+                    "post",
+                    "/api/user/orders/",
+                    201,
+                    user=buyer,
+                    data={
+                        "order_items": [
+                            {"product": p.id, "quantity": 1} for p in order_products
+                        ]
+                    },
+                    content_type="application/json",
+                )
+                call("order_history", "get", "/api/user/orders/", 200, user=buyer)
+
+                if response.status_code == 201:
+                    address = {
+                        "country": "IN",
+                        "city": "Pune",
+                        "street_address": "1 Benchmark Road",
+                        "apartment_address": "Flat 2",
+                        "postal_code": "411001",
+                    }
+                    call(
+                        "checkout",
+                        "put",
+                        f"/api/user/payments/checkout/{response.json()['id']}/",
+                        200,
+                        user=buyer,
+                        data={
+                            "payment": {"payment_option": Payment.STRIPE},
+                            "shipping_address": address,
+                            "billing_address": address,
+                        },
+                        content_type="application/json",
+                    )
+
+                if paid_order_ids:
+                    payload = json.dumps(
+                        {
+                            "id": "evt_benchmark",
+                            "object": "event",
+                            "type": "checkout.session.completed",
+                            "data": {
+                                "object": {
+                                    "customer_details": {"email": "buyer@example.com"},
+                                    "metadata": {"order_id": paid_order_ids.pop()},
+                                }
+                            },
+                        }
+                    )
+                    call(
+                        "stripe_webhook",
+                        "post",
+                        "/api/user/payments/stripe/webhook/",
+                        200,
+                        data=payload,
+                        content_type="application/json",
+                        HTTP_STRIPE_SIGNATURE=sign_webhook(payload),
+                    )
+
+        return recorder.summary()
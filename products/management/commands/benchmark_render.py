@@ -0,0 +1,142 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework import parsers, renderers
+
+from config import parsers as fast_parsers
+from config import renderers as fast_renderers
+from config.benchmark import (
+    BenchmarkRecorder,
+    benchmark_database,
+    format_results,
+    write_results,
+)
+from orders.models import Order
+from orders.serializers import OrderReadSerializer
+from products.management.commands.benchmark_api import seed
+from products.models import Cart, Product
+from products.serializers import CartSerializer, ProductReadSerializer
+from users.models import Address, PhoneNumber
+from users.serializers import UserSerializer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the time spent rendering and parsing the JSON of the largest "
+        "API payloads, with DRF's stdlib based classes and the orjson based ones"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=500)
+        parser.add_argument("--orders", type=int, default=100)
+        parser.add_argument("--cart-items", type=int, default=20)
+        parser.add_argument(
+            "--iterations", type=int, default=200, help="Calls per scenario"
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--keepdb", action="store_true")
+        parser.add_argument("--output", help="Path of the JSON results file")
+
+    def handle(self, *args, **options):
+        if fast_renderers.orjson is None:
+            self.stderr.write("orjson is not installed, both sides use the stdlib")
+
+        with benchmark_database(keepdb=options["keepdb"]):
+            results = self.run(options)
+
+        self.stdout.write(format_results(results))
+
+        parameters = {
+            key: options[key]
+            for key in ("products", "orders", "cart_items", "iterations", "seed")
+        }
+        path = write_results("render", results, parameters, options["output"])
+        self.stdout.write(self.style.SUCCESS(f"Results written to {path}"))
+
+    def payloads(self, options):
+        """
+        Return the serialized data of each payload, keyed by name.
+        """
+        buyers, _, _ = seed(
+            users=20,
+            categories=10,
+            products=options["products"],
+            orders=options["orders"],
+            cart_items=options["cart_items"],
+            seed_value=options["seed"],
+        )
+        buyer = buyers[0]
+        PhoneNumber.objects.create(
+            user=buyer, phone_number="+919876500000", is_verified=True
+        )
+        Address.objects.bulk_create(
+            Address(
+                user=buyer,
+                address_type=address_type,
+                country="IN",
+                city="Pune",
+                street_address="1 Bench Street",
+                apartment_address="Flat 2",
+                postal_code="411001",
+            )
+            for address_type in (Address.SHIPPING, Address.BILLING)
+        )
+
+        request = RequestFactory().get("/")
+        context = {"request": request}
+        user = User.objects.prefetch_related("profile", "phone", "addresses").get(
+            id=buyer.id
+        )
+        cart = Cart.objects.prefetch_related("cart_items__product").get(user=buyer)
+        orders = Order.objects.select_related("buyer").prefetch_related(
+            "order_items__product"
+        )
+        products = Product.objects.select_related("seller", "category")
+
+        return {
+            "cart": CartSerializer(cart, context=context).data,
+            "orders": OrderReadSerializer(orders, many=True, context=context).data,
+            "user": UserSerializer(
+                user,
+                context={
+                    **context,
+                    "expand": {"profile", "phone_number", "addresses"},
+                    "fields": set(),
+                },
+            ).data,
+            "products": ProductReadSerializer(
+                products, many=True, context=context
+            ).data,
+        }
+
+    def run(self, options):
+        self.stdout.write("Seeding benchmark dataset...")
+        payloads = self.payloads(options)
+
+        recorder = BenchmarkRecorder(trace_allocations=False)
+        implementations = {
+            "stdlib": (renderers.JSONRenderer(), parsers.JSONParser()),
+            "orjson": (fast_renderers.JSONRenderer(), fast_parsers.JSONParser()),
+        }
+
+        self.stdout.write("Running scenarios...")
+        for name, data in payloads.items():
+            expected = renderers.JSONRenderer().render(data)
+            expected_data = parsers.JSONParser().parse(io.BytesIO(expected))
+            self.stdout.write(f"{name}: {len(expected)} bytes")
+            for _ in range(options["iterations"]):
+                for implementation, (renderer, parser) in implementations.items():
+                    with recorder.measure(f"{name}_render_{implementation}") as sample:
+                        body = renderer.render(data)
+                    # Both must produce the very same bytes
+                    sample["ok"] = body == expected
+
+                    with recorder.measure(f"{name}_parse_{implementation}") as sample:
+                        parsed = parser.parse(io.BytesIO(expected))
+                    sample["ok"] = parsed == expected_data
+
+        return recorder.summary()
@@ -0,0 +1,133 @@
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from config.benchmark import (
+    BenchmarkRecorder,
+    benchmark_database,
+    format_results,
+    write_results,
+)
+from orders.models import Order
+from orders.views import OrderItemViewSet, OrderViewSet
+from payment.models import Payment
+from payment.views import CheckoutAPIView, PaymentViewSet
+from products.management.commands.benchmark_api import seed
+
+# Views whose permissions depend on the action or method
+SOAKED_VIEWS = (OrderViewSet, OrderItemViewSet, PaymentViewSet, CheckoutAPIView)
+
+
+class Command(BaseCommand):
+    help = (
+        "Send a long stream of update requests and report the per-request cost "
+        "for each window of requests; it should stay flat"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=5000)
+        parser.add_argument(
+            "--window", type=int, default=500, help="Requests per reported window"
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--no-allocations",
+            action="store_true",
+            help="Do not trace allocations (lower overhead on latency)",
+        )
+        parser.add_argument("--keepdb", action="store_true")
+        parser.add_argument("--output", help="Path of the JSON results file")
+
+    def handle(self, *args, **options):
+        with benchmark_database(keepdb=options["keepdb"]):
+            results = self.run(options)
+
+        self.stdout.write(format_results(results))
+
+        first, last = results[min(results)], results[max(results)]
+        self.stdout.write(
+            f"p50 drift (last/first window): {last['p50_ms'] / first['p50_ms']:.2f}x"
+        )
+        if "traced_kib" in first:
+            self.stdout.write(
+                f"Traced memory growth: {last['traced_kib'] - first['traced_kib']:.1f} KiB"
+            )
+        for view in SOAKED_VIEWS:
+            self.stdout.write(
+                f"{view.__name__}.permission_classes: {len(view.permission_classes)}"
+            )
+
+        parameters = {
+            key: options[key] for key in ("requests", "window", "seed")
+        }
+        path = write_results("soak", results, parameters, options["output"])
+        self.stdout.write(self.style.SUCCESS(f"Results written to {path}"))
+
+    def run(self, options):
+        self.stdout.write("Seeding benchmark dataset...")
+        _, _, paid_order_ids = seed(
+            users=20,
+            categories=2,
+            products=50,
+            orders=10,
+            cart_items=1,
+            seed_value=options["seed"],
+        )
+
+        # A pending order that already has a pending payment and items
+        order = Order.objects.select_related("buyer").get(id=paid_order_ids[0])
+        item = order.order_items.first()
+        payment = Payment.objects.get(order=order)
+        address = {
+            "country": "IN",
+            "city": "Pune",
+            "street_address": "1 Benchmark Road",
+            "apartment_address": "Flat 2",
+            "postal_code": "411001",
+        }
+        requests = [
+            ("patch", f"/api/user/orders/{order.id}/", {}),
+            (
+                "put",
+                f"/api/user/orders/{order.id}/order-items/{item.id}/",
+                {"product": item.product_id, "quantity": 1},
+            ),
+            ("patch", f"/api/user/payments/{payment.id}/", {}),
+            (
+                "put",
+                f"/api/user/payments/checkout/{order.id}/",
+                {
+                    "payment": {"payment_option": Payment.STRIPE},
+                    "shipping_address": address,
+                    "billing_address": address,
+                },
+            ),
+        ]
+
+        client = Client(raise_request_exception=False)
+        token = f"Bearer {RefreshToken.for_user(order.buyer).access_token}"
+        recorder = BenchmarkRecorder(trace_allocations=not options["no_allocations"])
+        traced = {}
+
+        self.stdout.write("Running soak...")
+        with recorder.running():
+            for i in range(options["requests"]):
+                window = f"requests_{i // options['window'] * options['window']:06d}"
+                method, path, data = requests[i % len(requests)]
+                with recorder.measure(window) as sample:
+                    response = getattr(client, method)(
+                        path,
+                        data=data,
+                        content_type="application/json",
+                        HTTP_AUTHORIZATION=token,
+                    )
+                    sample["ok"] = response.status_code == 200
+                if recorder.trace_allocations:
+                    traced[window] = tracemalloc.get_traced_memory()[0] / 1024
+
+        results = recorder.summary()
+        for window, kib in traced.items():
+            results[window]["traced_kib"] = kib
+        return results
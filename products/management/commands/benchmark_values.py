@@ -0,0 +1,170 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+
+from config.benchmark import (
+    BenchmarkRecorder,
+    benchmark_database,
+    format_results,
+    write_results,
+)
+from config.renderers import dumps
+from orders.models import Order
+from orders.serializers import OrderReadSerializer, OrderValuesSerializer
+from products.management.commands.benchmark_api import seed
+from products.models import CartItem, Product
+from products.serializers import (
+    CartItemSerializer,
+    CartItemValuesSerializer,
+    ProductCardSerializer,
+    ProductCardValuesSerializer,
+    ProductReadSerializer,
+    ProductValuesSerializer,
+)
+from users.models import Address
+from users.serializers import AddressReadOnlySerializer, AddressValuesSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the list serializers built on .values() rows with the model "
+        "serializers they replace: check that the output is identical and "
+        "measure the cost per row"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            nargs="+",
+            default=[1000, 10000],
+            help="List sizes to measure",
+        )
+        parser.add_argument(
+            "--iterations", type=int, default=5, help="Calls per scenario"
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--keepdb", action="store_true")
+        parser.add_argument("--output", help="Path of the JSON results file")
+
+    def handle(self, *args, **options):
+        with benchmark_database(keepdb=options["keepdb"]):
+            results, mismatches = self.run(options)
+
+        self.stdout.write(format_results(results))
+        for scenario, result in results.items():
+            self.stdout.write(f"{scenario}: {result['per_row_us']:.2f} us per row")
+
+        parameters = {key: options[key] for key in ("rows", "iterations", "seed")}
+        path = write_results("values", results, parameters, options["output"])
+        self.stdout.write(self.style.SUCCESS(f"Results written to {path}"))
+
+        if mismatches:
+            raise CommandError(f"Output differs for: {', '.join(mismatches)}")
+
+    def seed(self, rows):
+        buyers, _, _ = seed(
+            users=100,
+            categories=10,
+            products=rows,
+            orders=rows,
+            cart_items=rows // 90 + 1,
+        )
+        Address.objects.bulk_create(
+            Address(
+                user=buyers[i % len(buyers)],
+                address_type=Address.SHIPPING if i % 2 else Address.BILLING,
+                default=i % 7 == 0,
+                country="IN" if i % 3 else "",
+                city=f"City {i}",
+                street_address=f"{i} Bench Street",
+                apartment_address=f"Flat {i}",
+                postal_code=f"{411000 + i}" if i % 5 else "",
+            )
+            for i in range(rows)
+        )
+
+    def cases(self):
+        """
+        Return (name, queryset, model serializer, values serializer) per list.
+        """
+        return [
+            (
+                "products",
+                Product.objects.select_related("seller", "category"),
+                ProductReadSerializer,
+                ProductValuesSerializer,
+            ),
+            (
+                "product_cards",
+                Product.objects.all(),
+                ProductCardSerializer,
+                ProductCardValuesSerializer,
+            ),
+            (
+                "cart_items",
+                CartItem.objects.select_related("product__seller", "product__category"),
+                CartItemSerializer,
+                CartItemValuesSerializer,
+            ),
+            (
+                "orders",
+                Order.objects.select_related("buyer", "payment").prefetch_related(
+                    "order_items__product"
+                ),
+                OrderReadSerializer,
+                OrderValuesSerializer,
+            ),
+            (
+                "addresses",
+                Address.objects.select_related("user"),
+                AddressReadOnlySerializer,
+                AddressValuesSerializer,
+            ),
+        ]
+
+    def run(self, options):
+        self.stdout.write("Seeding benchmark dataset...")
+        self.seed(max(options["rows"]))
+
+        context = {"request": RequestFactory().get("/")}
+        recorder = BenchmarkRecorder(trace_allocations=False)
+        mismatches = []
+        row_counts = {}
+
+        self.stdout.write("Running scenarios...")
+        for name, queryset, serializer_class, values_serializer_class in self.cases():
+            for rows in options["rows"]:
+                page = queryset[:rows]
+                expected = serializer_class(page, many=True, context=context).data
+                actual = values_serializer_class(page, context=context).data
+                # Compared as rendered, the way clients see them
+                if dumps(actual) != dumps(expected):
+                    mismatches.append(f"{name}_{rows}")
+                    self.stderr.write(self.diff(name, expected, actual))
+
+                for implementation, build in (
+                    ("model", lambda: serializer_class(page.all(), many=True, context=context)),
+                    ("values", lambda: values_serializer_class(page.all(), context=context)),
+                ):
+                    scenario = f"{name}_{rows}_{implementation}"
+                    row_counts[scenario] = len(expected)
+                    for _ in range(options["iterations"]):
+                        with recorder.measure(scenario):
+                            build().data
+
+        results = recorder.summary()
+        for scenario, result in results.items():
+            result["per_row_us"] = result["mean_ms"] * 1000 / max(row_counts[scenario], 1)
+        return results, mismatches
+
+    def diff(self, name, expected, actual):
+        if len(expected) != len(actual):
+            return f"{name}: {len(expected)} rows expected, {len(actual)} built"
+        for expected_row, actual_row in zip(expected, actual):
+            expected_row = json.loads(dumps(expected_row))
+            actual_row = json.loads(dumps(actual_row))
+            if expected_row != actual_row or list(expected_row) != list(actual_row):
+                return f"{name}:\n  expected {expected_row}\n  built    {actual_row}"
+        return f"{name}: rendered output differs"
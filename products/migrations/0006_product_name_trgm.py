@@ -0,0 +1,16 @@
+from django.db import migrations
+
+from config.db.operations import AddTrigramIndex
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('products', '0005_created_at_indexes'),
+    ]
+
+    operations = [
+        AddTrigramIndex(model='products.Product', field='name', name='product_name_trgm'),
+    ]
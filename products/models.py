@@ -46,11 +46,27 @@ class Product(models.Model):
     price = models.DecimalField(decimal_places=2, max_digits=10)
     quantity = models.IntegerField(default=1)
 
+    # Stripe catalog objects, kept up to date by payment.tasks.sync_stripe_product_task
+    stripe_product_id = models.CharField(max_length=255, blank=True, editable=False)
+    stripe_price_id = models.CharField(max_length=255, blank=True, editable=False)
+    # Price of this product when stripe_price_id was created
+    stripe_price_amount = models.DecimalField(
+        decimal_places=2, max_digits=10, null=True, editable=False
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ("-created_at",)
+        indexes = [models.Index(fields=["created_at", "id"], name="product_created_idx")]
+
+    @property
+    def has_stripe_price(self):
+        """
+        Whether the synced Stripe price can be charged for this product.
+        """
+        return bool(self.stripe_price_id) and self.stripe_price_amount == self.price
 
     def __str__(self):
         return self.name
@@ -63,6 +79,7 @@ class Cart(models.Model):
 
     class Meta:
         ordering = ("-created_at",)
+        indexes = [models.Index(fields=["created_at", "id"], name="cart_created_idx")]
 
     def __str__(self):
         return f"Cart for {self.user.get_full_name()}"
@@ -91,6 +108,7 @@ class CartItem(models.Model):
 
     class Meta:
         ordering = ("-created_at",)
+        indexes = [models.Index(fields=["created_at", "id"], name="cartitem_created_idx")]
         unique_together = ("cart", "product")  # Ensure one product per cart
 
     def __str__(self):
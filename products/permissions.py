@@ -1,5 +1,7 @@
 from rest_framework.permissions import SAFE_METHODS, BasePermission
 
+from products.cart import get_cart_store
+
 
 class IsSellerOrAdmin(BasePermission):
     """
@@ -14,3 +16,15 @@ class IsSellerOrAdmin(BasePermission):
             return True
 
         return obj.seller == request.user or request.user.is_admin
+
+
+class IsAuthenticatedOrCartToken(BasePermission):
+    """
+    Check if user is authenticated, or the cart engine supports anonymous carts
+    """
+
+    def has_permission(self, request, view):
+        if request.user.is_authenticated:
+            return True
+
+        return get_cart_store().supports_anonymous
@@ -1,10 +1,61 @@
 from rest_framework import serializers
 from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.utils.encoding import filepath_to_uri
+from django.utils.functional import cached_property
 import os
 
+from config.serializers import Computed, Nested, ValuesSerializer, full_name
+from payment.catalog import schedule_product_sync, synced_values
 from products.models import Product, ProductCategory, Cart, CartItem
 
 
+def media_url_builder(storage, request=None):
+    """
+    Return a function turning a stored file name into its URL, absolute when
+    there is a request.
+
+    With ``FileSystemStorage`` the scheme, host and media prefix are resolved
+    once instead of once per file. Names that are already URLs are returned
+    unchanged.
+    """
+    if isinstance(storage, FileSystemStorage):
+        base_url = storage.base_url
+        if request is not None:
+            base_url = request.build_absolute_uri(base_url)
+
+        def url(name):
+            return base_url + filepath_to_uri(name).lstrip('/')
+    else:
+        def url(name):
+            location = storage.url(name)
+            return request.build_absolute_uri(location) if request is not None else location
+
+    def build(name):
+        if not name:
+            return None
+        if name.startswith(('http://', 'https://')):
+            return name
+        return url(name)
+
+    return build
+
+
+class ProductImageURLMixin:
+    """
+    Adds ``image_url``, building product image URLs for the request.
+
+    A list is serialized by a single instance, so the builder is made once
+    per list.
+    """
+
+    @cached_property
+    def image_url(self):
+        return media_url_builder(
+            Product._meta.get_field('image').storage, self.context.get('request')
+        )
+
+
 class ProductCategoryReadSerializer(serializers.ModelSerializer):
     """
     Serializer class for product categories
@@ -49,7 +100,7 @@ class ProductCategoryWriteSerializer(serializers.ModelSerializer):
         return instance
 
 
-class ProductReadSerializer(serializers.ModelSerializer):
+class ProductReadSerializer(ProductImageURLMixin, serializers.ModelSerializer):
     """
     Serializer class for reading products
     """
@@ -60,23 +111,57 @@ class ProductReadSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Product
-        fields = "__all__"
-    
+        exclude = ("stripe_product_id", "stripe_price_id", "stripe_price_amount")
+
     def get_image(self, obj):
         """
         Return the image URL, handling both local files and external URLs
         """
-        if obj.image:
-            image_str = str(obj.image)
-            # Check if it's already a full URL
-            if image_str.startswith('http://') or image_str.startswith('https://'):
-                return image_str
-            # Otherwise, build the full URL for local files
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.image.url)
-            return obj.image.url
-        return None
+        return self.image_url(obj.image.name)
+
+
+class ProductCardSerializer(ProductImageURLMixin, serializers.ModelSerializer):
+    """
+    Serializer class for the compact product cards of listings
+    """
+
+    thumbnail = serializers.SerializerMethodField()
+    category_id = serializers.IntegerField(read_only=True)
+    in_stock = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = ("id", "name", "price", "thumbnail", "category_id", "in_stock")
+
+    def get_thumbnail(self, obj):
+        return self.image_url(obj.image.name)
+
+    def get_in_stock(self, obj):
+        return obj.quantity > 0
+
+
+class ProductValuesSerializer(ProductImageURLMixin, ValuesSerializer):
+    """
+    ``ProductReadSerializer`` output for lists, built from ``.values()`` rows
+    """
+
+    serializer_class = ProductReadSerializer
+    mappers = {
+        "seller": Computed(("seller__first_name", "seller__last_name"), full_name),
+        "image": Computed(("image",), "image_url"),
+    }
+
+
+class ProductCardValuesSerializer(ProductImageURLMixin, ValuesSerializer):
+    """
+    ``ProductCardSerializer`` output for lists, built from ``.values()`` rows
+    """
+
+    serializer_class = ProductCardSerializer
+    mappers = {
+        "thumbnail": Computed(("image",), "image_url"),
+        "in_stock": Computed(("quantity",), lambda quantity: quantity > 0),
+    }
 
 
 class ProductWriteSerializer(serializers.ModelSerializer):
@@ -112,10 +197,12 @@ class ProductWriteSerializer(serializers.ModelSerializer):
                 file_name = os.path.basename(image_path)
                 product.image.save(file_name, ContentFile(f.read()), save=True)
 
+        schedule_product_sync(product)
         return product
 
     def update(self, instance, validated_data):
         image_path = validated_data.pop('image', None)
+        synced = synced_values(instance)
         
         if "category" in validated_data:
             nested_serializer = self.fields["category"]
@@ -130,6 +217,8 @@ class ProductWriteSerializer(serializers.ModelSerializer):
                 file_name = os.path.basename(image_path)
                 instance.image.save(file_name, ContentFile(f.read()), save=True)
 
+        if synced_values(instance) != synced:
+            schedule_product_sync(instance)
         return instance
 
 
@@ -176,6 +265,20 @@ class CartItemSerializer(serializers.ModelSerializer):
         return data
 
 
+class CartItemValuesSerializer(ValuesSerializer):
+    """
+    ``CartItemSerializer`` output for lists, built from ``.values()`` rows
+    """
+
+    serializer_class = CartItemSerializer
+    mappers = {
+        "product": Nested(ProductValuesSerializer, "product"),
+        "total_price": Computed(
+            ("quantity", "product__price"), lambda quantity, price: float(price) * quantity
+        ),
+    }
+
+
 class CartSerializer(serializers.ModelSerializer):
     """
     Serializer for cart with cart items
@@ -197,16 +300,6 @@ class AddToCartSerializer(serializers.Serializer):
     product_id = serializers.IntegerField()
     quantity = serializers.IntegerField(default=1)
 
-    def validate_product_id(self, value):
-        """
-        Validate that the product exists
-        """
-        try:
-            Product.objects.get(id=value)
-        except Product.DoesNotExist:
-            raise serializers.ValidationError("Product does not exist")
-        return value
-
     def validate_quantity(self, value):
         """
         Validate that quantity is positive
@@ -217,13 +310,16 @@ class AddToCartSerializer(serializers.Serializer):
 
     def validate(self, data):
         """
-        Validate that quantity doesn't exceed available stock
+        Validate that the product exists and quantity doesn't exceed available stock
         """
-        product = Product.objects.get(id=data['product_id'])
+        product = Product.objects.filter(id=data['product_id']).first()
+        if product is None:
+            raise serializers.ValidationError({'product_id': ["Product does not exist"]})
         if data['quantity'] > product.quantity:
             raise serializers.ValidationError(
                 f"Only {product.quantity} items available in stock"
             )
+        data['product'] = product
         return data
 
 
@@ -240,3 +336,51 @@ class UpdateCartItemSerializer(serializers.Serializer):
         if value <= 0:
             raise serializers.ValidationError("Quantity must be greater than 0")
         return value
+
+
+class CartOperationSerializer(serializers.Serializer):
+    """
+    Serializer for one operation of a batch cart update
+    """
+    ADD = 'add'
+    UPDATE = 'update'
+    REMOVE = 'remove'
+
+    op = serializers.ChoiceField(choices=(ADD, UPDATE, REMOVE))
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(required=False)
+
+    def validate_quantity(self, value):
+        """
+        Validate that quantity is positive
+        """
+        if value <= 0:
+            raise serializers.ValidationError("Quantity must be greater than 0")
+        return value
+
+    def validate(self, data):
+        """
+        Validate that adds and updates have a quantity
+        """
+        if data['op'] != self.REMOVE and 'quantity' not in data:
+            raise serializers.ValidationError({'quantity': ["This field is required."]})
+        return data
+
+
+class CartBatchSerializer(serializers.Serializer):
+    """
+    Serializer for applying several cart operations at once
+    """
+    MAX_OPERATIONS = 100
+
+    operations = CartOperationSerializer(many=True, allow_empty=False)
+
+    def validate_operations(self, value):
+        """
+        Validate the number of operations
+        """
+        if len(value) > self.MAX_OPERATIONS:
+            raise serializers.ValidationError(
+                f"At most {self.MAX_OPERATIONS} operations are allowed per request"
+            )
+        return value
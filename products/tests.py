@@ -0,0 +1,372 @@
+import gzip
+from decimal import Decimal
+from unittest import mock
+
+import fakeredis
+from allauth.account.models import EmailAddress
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from fakeredis import aioredis as fakeaioredis
+from redis.exceptions import ConnectionError as RedisConnectionError
+from rest_framework.test import APITestCase
+
+from config.cache import _sync_clients
+from config.testing import ValuesParityMixin
+from orders.models import Order
+from products.cart import get_cart_store
+from products.models import Cart, CartItem, Product, ProductCategory
+from products.serializers import (
+    CartItemValuesSerializer,
+    ProductCardValuesSerializer,
+    ProductValuesSerializer,
+)
+from products.views import AsyncCatalogView, AsyncProductDetailView
+
+User = get_user_model()
+
+
+class ProductValuesSerializerTests(ValuesParityMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seller = User.objects.create_user(
+            username="seller", email="seller@example.com", password="secret",
+            first_name="Asha", last_name="Rao",
+        )
+        # No name at all, get_full_name() is empty
+        unnamed = User.objects.create_user(
+            username="unnamed", email="unnamed@example.com", password="secret"
+        )
+        category = ProductCategory.objects.create(name="Books", icon="category/books.png")
+
+        cls.local = Product.objects.create(
+            seller=seller,
+            category=category,
+            name="Local image",
+            desc="Stored in MEDIA_ROOT",
+            image="products/with space é.jpg",
+            price=Decimal("12.50"),
+            quantity=3,
+        )
+        cls.external = Product.objects.create(
+            seller=unnamed,
+            category=category,
+            name="External image",
+            image="https://cdn.example.com/products/external.jpg",
+            price=Decimal("0.99"),
+            quantity=5,
+        )
+        cls.no_image = Product.objects.create(
+            seller=unnamed,
+            category=category,
+            name="No image",
+            price=Decimal("7"),
+            quantity=0,
+        )
+
+        buyer = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="secret"
+        )
+        cls.cart = Cart.objects.create(user=buyer)
+        CartItem.objects.create(cart=cls.cart, product=cls.local, quantity=2)
+        CartItem.objects.create(cart=cls.cart, product=cls.external, quantity=1)
+
+        cls.contexts = {
+            "without request": {},
+            "with request": {"request": RequestFactory().get("/api/products/")},
+        }
+
+    def test_products(self):
+        queryset = Product.objects.select_related("seller", "category")
+        for label, context in self.contexts.items():
+            with self.subTest(label):
+                data = self.assertValuesParity(queryset, ProductValuesSerializer, context)
+                self.assertEqual(len(data), 3)
+
+    def test_image_urls(self):
+        queryset = Product.objects.order_by("id")
+        images = {}
+        for label, context in self.contexts.items():
+            data = self.assertValuesParity(queryset, ProductValuesSerializer, context)
+            images[label] = [row["image"] for row in data]
+
+        self.assertEqual(
+            images["without request"],
+            [
+                "/media/products/with%20space%20%C3%A9.jpg",
+                "https://cdn.example.com/products/external.jpg",
+                None,
+            ],
+        )
+        self.assertEqual(
+            images["with request"][0],
+            "http://testserver/media/products/with%20space%20%C3%A9.jpg",
+        )
+        self.assertEqual(images["with request"][1:], images["without request"][1:])
+
+    def test_product_cards(self):
+        for label, context in self.contexts.items():
+            with self.subTest(label):
+                self.assertValuesParity(
+                    Product.objects.all(), ProductCardValuesSerializer, context
+                )
+
+    def test_cart_items(self):
+        queryset = CartItem.objects.select_related("product__seller", "product__category")
+        for label, context in self.contexts.items():
+            with self.subTest(label):
+                data = self.assertValuesParity(queryset, CartItemValuesSerializer, context)
+                self.assertEqual(len(data), 2)
+
+    def test_empty_list(self):
+        data = self.assertValuesParity(
+            CartItem.objects.filter(cart__user__username="seller"), CartItemValuesSerializer
+        )
+        self.assertEqual(data, [])
+
+
+@override_settings(CART_STORAGE="redis", CART_REDIS_URL="redis://cart-tests")
+class RedisCartStoreTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seller = User.objects.create_user(
+            username="seller", email="seller@example.com", password="secret"
+        )
+        cls.buyer = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="secret"
+        )
+        EmailAddress.objects.create(
+            user=cls.buyer, email=cls.buyer.email, verified=True, primary=True
+        )
+        category = ProductCategory.objects.create(name="Books", icon="category/books.png")
+        cls.book, cls.pen = [
+            Product.objects.create(
+                seller=seller,
+                category=category,
+                name=name,
+                image="products/product.jpg",
+                price=Decimal("5.00"),
+                quantity=3,
+            )
+            for name in ("Book", "Pen")
+        ]
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        _sync_clients["redis://cart-tests"] = self.redis
+        get_cart_store.cache_clear()
+        self.addCleanup(get_cart_store.cache_clear)
+        self.addCleanup(_sync_clients.pop, "redis://cart-tests")
+
+    def add(self, product, quantity, token=None):
+        headers = {"HTTP_X_CART_TOKEN": token} if token else {}
+        return self.client.post(
+            "/api/products/cart/add_item/",
+            {"product_id": product.id, "quantity": quantity},
+            format="json",
+            **headers,
+        )
+
+    def quantities(self, response):
+        return {item["id"]: item["quantity"] for item in response.json()["cart_items"]}
+
+    def test_add_is_capped_by_stock(self):
+        response = self.add(self.book, 2)
+        self.assertEqual(response.status_code, 201)
+        token = response.json()["cart_token"]
+
+        # 2 + 2 is more than the 3 in stock, the cart is left as it was
+        response = self.add(self.book, 2, token)
+        self.assertEqual(response.status_code, 400)
+        response = self.add(self.book, 1, token)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.quantities(response), {self.book.id: 3})
+
+        # Anonymous carts only live in Redis
+        self.assertFalse(Cart.objects.exists())
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_anonymous_cart_is_merged_at_login(self):
+        token = self.add(self.book, 1).json()["cart_token"]
+        self.add(self.pen, 2, token)
+        self.client.force_authenticate(self.buyer)
+        self.add(self.book, 1)
+        self.client.force_authenticate(None)
+
+        response = self.client.post(
+            "/api/auth/login/",
+            {"username": "buyer", "password": "secret"},
+            format="json",
+            HTTP_X_CART_TOKEN=token,
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+
+        self.client.force_authenticate(self.buyer)
+        response = self.client.get("/api/products/cart/me/")
+        self.assertEqual(self.quantities(response), {self.book.id: 2, self.pen.id: 2})
+        self.assertFalse(self.redis.exists(f"cart:anon:{token}", f"cart:anon:{token}:meta"))
+
+    def test_login_succeeds_when_merge_fails(self):
+        token = self.add(self.book, 1).json()["cart_token"]
+        with mock.patch.object(
+            get_cart_store(), "merge", side_effect=RedisConnectionError("down")
+        ):
+            response = self.client.post(
+                "/api/auth/login/",
+                {"username": "buyer", "password": "secret"},
+                format="json",
+                HTTP_X_CART_TOKEN=token,
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_batch_is_rolled_back_when_stock_is_short(self):
+        self.client.force_authenticate(self.buyer)
+        self.add(self.book, 1)
+
+        response = self.client.post(
+            "/api/products/cart/batch/",
+            {
+                "operations": [
+                    {"op": "update", "product_id": self.book.id, "quantity": 2},
+                    {"op": "add", "product_id": self.pen.id, "quantity": 4},
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get("/api/products/cart/me/")
+        self.assertEqual(self.quantities(response), {self.book.id: 1})
+
+    def test_checkout_creates_one_pending_order(self):
+        self.client.force_authenticate(self.buyer)
+        self.add(self.book, 2)
+        self.add(self.pen, 1)
+        self.assertFalse(Order.objects.exists())
+
+        response = self.client.post("/api/products/cart/checkout/")
+        self.assertEqual(response.status_code, 201)
+
+        order = Order.objects.get()
+        self.assertEqual(order.buyer, self.buyer)
+        self.assertEqual(order.status, Order.PENDING)
+        self.assertEqual(
+            dict(order.order_items.values_list("product_id", "quantity")),
+            {self.book.id: 2, self.pen.id: 1},
+        )
+        self.assertEqual(self.quantities(self.client.get("/api/products/cart/me/")), {})
+
+        # An empty cart is not checked out again
+        response = self.client.post("/api/products/cart/checkout/")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Order.objects.count(), 1)
+
+
+@override_settings(BACKEND_DOMAIN="https://api.example.com", COMPRESSION_MIN_SIZE=256)
+class AsyncCatalogViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seller = User.objects.create_user(
+            username="seller", email="seller@example.com", password="secret"
+        )
+        category = ProductCategory.objects.create(name="Books", icon="books.png")
+        cls.products = [
+            Product.objects.create(
+                seller=seller,
+                category=category,
+                name=f"Book {number}",
+                image=f"products/book-{number}.jpg",
+                price=Decimal("5.00"),
+                quantity=3,
+            )
+            for number in range(10)
+        ]
+
+    def setUp(self):
+        self.redis = fakeaioredis.FakeRedis()
+        patcher = mock.patch("config.cache.get_async_redis", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def cached_keys(self):
+        return sorted(key.decode() for key in await self.redis.keys("catalog:*"))
+
+    async def test_cache_miss_then_hit(self):
+        product = self.products[0]
+        path = f"/api/products/async/{product.pk}/"
+
+        with mock.patch.object(
+            AsyncProductDetailView, "render", autospec=True,
+            side_effect=AsyncProductDetailView.render,
+        ) as render:
+            first = await self.async_client.get(path)
+            second = await self.async_client.get(path)
+
+        render.assert_called_once()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()["name"], product.name)
+        self.assertEqual(
+            first.json()["image"],
+            "https://api.example.com/media/products/book-0.jpg",
+        )
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(
+            await self.cached_keys(), [f"catalog:identity:https://api.example.com{path}"]
+        )
+
+    async def test_not_found_is_rendered_every_time(self):
+        with mock.patch.object(
+            AsyncProductDetailView, "render", autospec=True,
+            side_effect=AsyncProductDetailView.render,
+        ) as render:
+            for _ in range(2):
+                response = await self.async_client.get("/api/products/async/0/")
+                self.assertEqual(response.status_code, 404)
+
+        self.assertEqual(render.call_count, 2)
+        self.assertEqual(await self.cached_keys(), [])
+
+    async def test_render_is_required(self):
+        view = AsyncCatalogView.as_view()
+        with self.assertRaisesMessage(ImproperlyConfigured, "missing a render() method"):
+            await view(AsyncRequestFactory().get("/api/products/async/"))
+
+    async def test_one_entry_per_encoding(self):
+        plain = await self.async_client.get("/api/products/async/")
+        self.assertEqual(plain.status_code, 200)
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        self.assertIn("Accept-Encoding", plain["Vary"])
+
+        compressed = await self.async_client.get(
+            "/api/products/async/", headers={"Accept-Encoding": "gzip"}
+        )
+        self.assertEqual(compressed["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+
+        # Served from the gzip entry, not compressed again
+        with mock.patch("products.views.encode") as encode:
+            again = await self.async_client.get(
+                "/api/products/async/", headers={"Accept-Encoding": "gzip, deflate"}
+            )
+        encode.assert_not_called()
+        self.assertEqual(again.content, compressed.content)
+
+        self.assertEqual(
+            await self.cached_keys(),
+            [
+                "catalog:gzip:https://api.example.com/api/products/async/",
+                "catalog:identity:https://api.example.com/api/products/async/",
+            ],
+        )
+        entry = await self.redis.get(
+            "catalog:gzip:https://api.example.com/api/products/async/"
+        )
+        self.assertEqual(entry, b"gzip\n" + compressed.content)
+
+    async def test_not_found_is_not_cached(self):
+        response = await self.async_client.get(
+            "/api/products/async/0/", headers={"Accept-Encoding": "gzip"}
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {"detail": "Not found."})
+        self.assertEqual(await self.cached_keys(), [])
@@ -1,7 +1,14 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from products.views import ProductCategoryViewSet, ProductViewSet, CartViewSet
+from products.views import (
+    AsyncProductCategoryListView,
+    AsyncProductDetailView,
+    AsyncProductListView,
+    CartViewSet,
+    ProductCategoryViewSet,
+    ProductViewSet,
+)
 
 app_name = "products"
 
@@ -12,5 +19,15 @@ router.register(r"", ProductViewSet)
 
 
 urlpatterns = [
+    # Async, cached versions of the public catalog endpoints (see README)
+    path("async/", AsyncProductListView.as_view(), name="async_product_list"),
+    path(
+        "async/<int:pk>/", AsyncProductDetailView.as_view(), name="async_product_detail"
+    ),
+    path(
+        "async/categories/",
+        AsyncProductCategoryListView.as_view(),
+        name="async_category_list",
+    ),
     path("", include(router.urls)),
 ]
@@ -1,4 +1,12 @@
-from django.shortcuts import get_object_or_404
+import logging
+from urllib.parse import urlencode, urljoin
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.db import transaction
+from django.views import View
 from rest_framework import permissions, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, AllowAny
@@ -6,21 +14,34 @@ from rest_framework.response import Response
 from rest_framework.viewsets import ReadOnlyModelViewSet
 from rest_framework import status
 
-from products.models import Product, ProductCategory, Cart, CartItem
-from products.permissions import IsSellerOrAdmin
+from config.cache import aget_bytes, aset_bytes
+from config.compression import choose_encoding, encode
+from config.db.routers import ReplicaReadMixin
+from config.renderers import dumps
+from config.serializers import ValuesListMixin
+from orders.models import Order, OrderItem
+from orders.serializers import OrderReadSerializer
+from products.cart import CartError, CartOwner, get_cart_store
+from products.models import Product, ProductCategory, Cart
+from products.permissions import IsAuthenticatedOrCartToken, IsSellerOrAdmin
 from products.serializers import (
     ProductCategoryReadSerializer,
     ProductCategoryWriteSerializer,
+    ProductCardSerializer,
+    ProductCardValuesSerializer,
     ProductReadSerializer,
     ProductWriteSerializer,
     CartSerializer,
     CartItemSerializer,
     AddToCartSerializer,
+    CartBatchSerializer,
     UpdateCartItemSerializer,
 )
 
+logger = logging.getLogger(__name__)
+
 
-class ProductCategoryViewSet(viewsets.ModelViewSet):
+class ProductCategoryViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """
     CRUD product categories
     """
@@ -35,43 +56,173 @@ class ProductCategoryViewSet(viewsets.ModelViewSet):
         return ProductCategoryReadSerializer
 
 
-class ProductViewSet(ReadOnlyModelViewSet):
+class ProductViewSet(ValuesListMixin, ReplicaReadMixin, ReadOnlyModelViewSet):
     """
     List and retrieve products - Public access, no authentication required
+
+    Listings return compact product cards, the full product is returned by
+    the detail endpoint.
     """
 
     queryset = Product.objects.all()
     serializer_class = ProductReadSerializer
+    values_serializer_class = ProductCardValuesSerializer
     permission_classes = [AllowAny]  # Public access for product listing
 
+    def get_serializer_class(self):
+        if self.action == "list":
+            return ProductCardSerializer
+
+        return ProductReadSerializer
+
+
+class BackendURLBuilder:
+    """
+    Stands for the request in serializer contexts, building absolute URLs on
+    ``BACKEND_DOMAIN`` rather than on the client supplied ``Host`` header.
+    """
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    def build_absolute_uri(self, location):
+        return urljoin(self.base_url, location)
+
+
+class AsyncCatalogView(View):
+    """
+    Base class for public, read-only catalog endpoints served natively on ASGI
+
+    The rendered JSON body is cached in Redis for CATALOG_CACHE_SECONDS through
+    the non-blocking client. The key is made of the path and the query
+    parameters listed in ``cache_params`` only, so made up parameters cannot
+    bypass the cache, and media URLs are built on ``BACKEND_DOMAIN``. Bodies
+    are cached compressed by the rules of ``config.compression``, once per
+    encoding clients ask for, so hot responses are not compressed again.
+    Cache entries are the encoding applied, if any, and the body separated by
+    a newline.
+
+    Subclasses define ``async def render(self, request, *args, **kwargs)``
+    returning ``(body, status)``: the JSON body as bytes and the HTTP status
+    code. Only 200 responses are cached, any other status is sent as it is,
+    uncompressed.
+    """
+    http_method_names = ['get', 'head', 'options']
+    # Query parameters the view reads, in the order they appear in the key
+    cache_params = ()
+    # Coroutine returning (body, status), to be defined by subclasses
+    render = None
+
+    def get_cache_key(self, request, encoding):
+        params = [(name, request.GET[name]) for name in self.cache_params if name in request.GET]
+        query = f'?{urlencode(params)}' if params else ''
+        return f'catalog:{encoding or "identity"}:{settings.BACKEND_DOMAIN}{request.path}{query}'
+
+    def get_serializer_context(self):
+        return {'request': BackendURLBuilder(settings.BACKEND_DOMAIN)}
+
+    async def get(self, request, *args, **kwargs):
+        if self.render is None:
+            raise ImproperlyConfigured(
+                f'{type(self).__name__} is missing a render() method returning (body, status).'
+            )
+
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        key = self.get_cache_key(request, encoding)
+        cached = await aget_bytes(key)
+
+        if cached is not None:
+            applied, _, body = cached.partition(b'\n')
+            applied = applied.decode() or None
+        else:
+            body, status_code = await self.render(request, *args, **kwargs)
+            if status_code != status.HTTP_200_OK:
+                return HttpResponse(body, status=status_code, content_type='application/json')
+            body, applied = encode(body, encoding)
+            await aset_bytes(
+                key, (applied or '').encode() + b'\n' + body, settings.CATALOG_CACHE_SECONDS
+            )
+
+        response = HttpResponse(body, content_type='application/json')
+        if applied is not None:
+            response['Content-Encoding'] = applied
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+class AsyncProductListView(AsyncCatalogView):
+    """
+    List products using the async ORM
+    """
+
+    async def render(self, request):
+        queryset = Product.objects.only('id', 'name', 'price', 'image', 'category_id', 'quantity')
+        products = [product async for product in queryset.aiterator()]
+        serializer = ProductCardSerializer(products, many=True, context=self.get_serializer_context())
+        return dumps(serializer.data), status.HTTP_200_OK
+
+
+class AsyncProductDetailView(AsyncCatalogView):
+    """
+    Retrieve a product using the async ORM
+    """
+
+    async def render(self, request, pk):
+        queryset = Product.objects.select_related('seller', 'category')
+        try:
+            product = await queryset.aget(pk=pk)
+        except Product.DoesNotExist:
+            return dumps({'detail': 'Not found.'}), status.HTTP_404_NOT_FOUND
+
+        serializer = ProductReadSerializer(product, context=self.get_serializer_context())
+        return dumps(serializer.data), status.HTTP_200_OK
+
+
+class AsyncProductCategoryListView(AsyncCatalogView):
+    """
+    List product categories using the async ORM
+    """
+
+    async def render(self, request):
+        categories = [category async for category in ProductCategory.objects.aiterator()]
+        serializer = ProductCategoryReadSerializer(
+            categories, many=True, context=self.get_serializer_context()
+        )
+        return dumps(serializer.data), status.HTTP_200_OK
+
 
 class CartViewSet(viewsets.GenericViewSet):
     """
-    Cart management ViewSet - Requires authentication
+    Cart management ViewSet
+
+    Carts are kept by the engine selected with ``CART_STORAGE``. With the
+    redis engine anonymous shoppers get a cart too, identified by the
+    ``X-Cart-Token`` header echoed back as ``cart_token``.
     """
-    permission_classes = [IsAuthenticated]  # Authentication required for cart operations
+    permission_classes = [IsAuthenticatedOrCartToken]
     serializer_class = CartSerializer
 
     def get_queryset(self):
         return Cart.objects.filter(user=self.request.user)
 
-    def get_or_create_cart(self):
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.store = get_cart_store()
+        self.owner = CartOwner.from_request(request)
+
+    def cart_response(self, status_code=status.HTTP_200_OK):
         """
-        Get or create cart for the current user
+        Return the current cart
         """
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
-        print("cart", cart)
-        return cart
+        data = self.store.render(self.owner, self.get_serializer_context())
+        return Response(data, status=status_code)
 
     @action(detail=False, methods=['get'])
     def me(self, request):
         """
         Get current user's cart
         """
-        print("request", request)
-        cart = self.get_or_create_cart()
-        serializer = self.get_serializer(cart)
-        return Response(serializer.data)
+        return self.cart_response()
 
     @action(detail=False, methods=['post'])
     def add_item(self, request):
@@ -80,31 +231,17 @@ class CartViewSet(viewsets.GenericViewSet):
         """
         serializer = AddToCartSerializer(data=request.data)
         if serializer.is_valid():
-            cart = self.get_or_create_cart()
-            product = get_object_or_404(Product, id=serializer.validated_data['product_id'])
-            quantity = serializer.validated_data['quantity']
-
-            # Check if item already exists in cart
-            cart_item, created = CartItem.objects.get_or_create(
-                cart=cart,
-                product=product,
-                defaults={'quantity': quantity}
-            )
-
-            if not created:
-                # Update quantity if item already exists
-                new_quantity = cart_item.quantity + quantity
-                if new_quantity > product.quantity:
-                    return Response(
-                        {'error': f'Only {product.quantity} items available in stock'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                cart_item.quantity = new_quantity
-                cart_item.save()
+            try:
+                self.store.add(
+                    self.owner,
+                    serializer.validated_data['product'],
+                    serializer.validated_data['quantity'],
+                )
+            except CartError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
             # Return updated cart
-            cart_serializer = CartSerializer(cart)
-            return Response(cart_serializer.data, status=status.HTTP_201_CREATED)
+            return self.cart_response(status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -120,26 +257,15 @@ class CartViewSet(viewsets.GenericViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        cart = self.get_or_create_cart()
-        cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
-
         serializer = UpdateCartItemSerializer(data=request.data)
         if serializer.is_valid():
-            quantity = serializer.validated_data['quantity']
-            
-            # Check stock availability
-            if quantity > cart_item.product.quantity:
-                return Response(
-                    {'error': f'Only {cart_item.product.quantity} items available in stock'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            cart_item.quantity = quantity
-            cart_item.save()
+            try:
+                self.store.update(self.owner, item_id, serializer.validated_data['quantity'])
+            except CartError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
             # Return updated cart
-            cart_serializer = CartSerializer(cart)
-            return Response(cart_serializer.data)
+            return self.cart_response()
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -155,22 +281,66 @@ class CartViewSet(viewsets.GenericViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        cart = self.get_or_create_cart()
-        cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
-        cart_item.delete()
+        self.store.remove(self.owner, item_id)
 
         # Return updated cart
-        cart_serializer = CartSerializer(cart)
-        return Response(cart_serializer.data)
+        return self.cart_response()
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Apply a list of add/update/remove operations, all or nothing
+        """
+        serializer = CartBatchSerializer(data=request.data)
+        if serializer.is_valid():
+            try:
+                self.store.batch(self.owner, serializer.validated_data['operations'])
+            except CartError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Return updated cart
+            return self.cart_response()
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     @action(detail=False, methods=['delete'])
     def clear(self, request):
         """
         Clear all items from cart
         """
-        cart = self.get_or_create_cart()
-        cart.cart_items.all().delete()
+        self.store.clear(self.owner)
 
         # Return updated cart
-        cart_serializer = CartSerializer(cart)
-        return Response(cart_serializer.data)
+        return self.cart_response()
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def checkout(self, request):
+        """
+        Turn the cart into a pending order and empty the cart
+        """
+        lines = self.store.lines(self.owner)
+        if not lines:
+            return Response({'error': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
+
+        for product, quantity in lines:
+            if product.seller_id == request.user.id:
+                return Response(
+                    {'error': f'Adding your own product ({product.name}) to your order is not allowed'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if quantity > product.quantity:
+                return Response(
+                    {'error': f'Only {product.quantity} {product.name} available in stock'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        with transaction.atomic():
+            order = Order.objects.create(buyer=request.user)
+            OrderItem.objects.bulk_create(
+                OrderItem(order=order, product=product, quantity=quantity)
+                for product, quantity in lines
+            )
+            self.store.clear(self.owner)
+
+        serializer = OrderReadSerializer(order, context=self.get_serializer_context())
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -1,7 +1,61 @@
+from django import forms
 from django.contrib import admin
+from django.utils.translation import gettext as _
+
+from config.admin import ScalableModelAdmin
 
 from .models import Address, PhoneNumber, Profile, User
 
-admin.site.register(PhoneNumber)
-admin.site.register(Profile)
-admin.site.register(Address)
+
+class UserRelatedAdmin(ScalableModelAdmin):
+    list_select_related = ("user",)
+    search_fields = ("user__email", "user__username")
+    autocomplete_fields = ("user",)
+
+
+class AddressAdminForm(forms.ModelForm):
+    class Meta:
+        model = Address
+        fields = "__all__"
+
+    def clean(self):
+        """
+        Reject an address identical to another one of the same user
+
+        The fingerprint is not a form field, so the unique constraint on it
+        is not validated by the form.
+        """
+        cleaned_data = super().clean()
+        user = cleaned_data.get("user")
+        if user is None or any(
+            field not in cleaned_data for field in Address.FINGERPRINT_FIELDS
+        ):
+            return cleaned_data
+
+        duplicates = Address.objects.filter(
+            user=user, fingerprint=Address.make_fingerprint(cleaned_data)
+        ).exclude(pk=self.instance.pk)
+        if duplicates.exists():
+            raise forms.ValidationError(
+                _("This user already has this address."), code="duplicate"
+            )
+        return cleaned_data
+
+
+class AddressAdmin(UserRelatedAdmin):
+    form = AddressAdminForm
+    list_display = (
+        "user",
+        "address_type",
+        "default",
+        "city",
+        "country",
+        "postal_code",
+        "created_at",
+    )
+    list_filter = ("address_type", "default", "created_at")
+
+
+admin.site.register(PhoneNumber, UserRelatedAdmin)
+admin.site.register(Profile, UserRelatedAdmin)
+admin.site.register(Address, AddressAdmin)
@@ -10,6 +10,9 @@ class EmailAuthBackend(ModelBackend):
     """
 
     def authenticate(self, request, username=None, password=None):
+        # Phone number logins cannot match an email address
+        if not username or "@" not in username:
+            return
         try:
             user = User.objects.get(email=username)
             if user.check_password(password):
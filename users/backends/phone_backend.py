@@ -1,8 +1,8 @@
-import phonenumbers
-from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend
-from phonenumbers.phonenumberutil import NumberParseException
+from django.db.models import Value
+
+from users.phone import normalize_phone_number
 
 User = get_user_model()
 
@@ -13,15 +13,14 @@ class PhoneNumberAuthBackend(ModelBackend):
     """
 
     def authenticate(self, request, username=None, password=None):
+        number = normalize_phone_number(username)
+        if number is None:
+            return
         try:
-            number = phonenumbers.parse(username, settings.PHONENUMBER_DEFAULT_REGION)
-            if not phonenumbers.is_valid_number(number):
-                return
-            try:
-                user = User.objects.get(phone__phone_number=number)
-                if user.check_password(password):
-                    return user
-            except User.DoesNotExist:
-                return
-        except NumberParseException:
+            # Compare the stored E.164 value as is, the model field would
+            # parse and validate the number again
+            user = User.objects.get(phone__phone_number=Value(number))
+        except User.DoesNotExist:
             return
+        if user.check_password(password):
+            return user
@@ -18,3 +18,9 @@ class InvalidCredentialsException(APIException):
     status_code = 401
     default_detail = _("Wrong username or password.")
     default_code = "invalid-credentials"
+
+
+class VerificationUnavailableException(APIException):
+    status_code = 503
+    default_detail = _("Security codes cannot be checked right now, try again later.")
+    default_code = "verification-unavailable"
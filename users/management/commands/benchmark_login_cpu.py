@@ -0,0 +1,107 @@
+import random
+
+from allauth.account.models import EmailAddress
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from config.benchmark import (
+    BenchmarkRecorder,
+    benchmark_database,
+    format_results,
+    write_results,
+)
+from users.models import PhoneNumber
+from users.phone import _parse, parse_phone_number
+from users.serializers import UserLoginSerializer
+
+User = get_user_model()
+
+PASSWORD = "benchmark-password"
+
+# Password hashing would hide everything else a login costs
+FAST_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the CPU time of login validation (email and phone number) "
+        "with a fast password hasher"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument(
+            "--iterations", type=int, default=500, help="Calls per scenario"
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--keepdb", action="store_true")
+        parser.add_argument("--output", help="Path of the JSON results file")
+
+    def handle(self, *args, **options):
+        with benchmark_database(keepdb=options["keepdb"]), override_settings(
+            PASSWORD_HASHERS=FAST_HASHERS
+        ):
+            results = self.run(options)
+
+        self.stdout.write(format_results(results))
+
+        parameters = {key: options[key] for key in ("users", "iterations", "seed")}
+        path = write_results("login_cpu", results, parameters, options["output"])
+        self.stdout.write(self.style.SUCCESS(f"Results written to {path}"))
+
+    def seed(self, users):
+        password = make_password(PASSWORD)
+        User.objects.bulk_create(
+            User(
+                username=f"bench-cpu-{i}",
+                email=f"bench-cpu-{i}@example.com",
+                password=password,
+            )
+            for i in range(users)
+        )
+        created = list(User.objects.filter(username__startswith="bench-cpu-"))
+        PhoneNumber.objects.bulk_create(
+            PhoneNumber(
+                user=user, phone_number=f"+9198765{i:05d}", is_verified=True
+            )
+            for i, user in enumerate(created)
+        )
+        EmailAddress.objects.bulk_create(
+            EmailAddress(user=user, email=user.email, verified=True, primary=True)
+            for user in created
+        )
+        return [
+            (user.email, f"98765 {i:05d}") for i, user in enumerate(created)
+        ]
+
+    def run(self, options):
+        self.stdout.write("Seeding benchmark dataset...")
+        identifiers = self.seed(options["users"])
+
+        rng = random.Random(options["seed"])
+        recorder = BenchmarkRecorder(trace_allocations=False)
+
+        def normalize(scenario, phone_number):
+            with recorder.measure(scenario) as sample:
+                sample["ok"] = parse_phone_number(phone_number) is not None
+
+        def login(scenario, data):
+            with recorder.measure(scenario) as sample:
+                serializer = UserLoginSerializer(data={**data, "password": PASSWORD})
+                sample["ok"] = serializer.is_valid()
+
+        self.stdout.write("Running scenarios...")
+        for _ in range(options["iterations"]):
+            email, phone_number = rng.choice(identifiers)
+            login("email", {"email": email})
+            login("phone_number", {"phone_number": phone_number})
+            normalize("normalize", phone_number)
+            # Every parse below misses the normalization cache
+            _parse.cache_clear()
+            login("phone_number_uncached", {"phone_number": phone_number})
+            _parse.cache_clear()
+            normalize("normalize_uncached", phone_number)
+
+        return recorder.summary()
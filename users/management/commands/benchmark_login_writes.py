@@ -0,0 +1,137 @@
+import random
+from contextlib import ExitStack
+
+from allauth.account.models import EmailAddress
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from config.benchmark import (
+    BenchmarkRecorder,
+    WriteCounter,
+    benchmark_database,
+    format_results,
+    write_results,
+)
+from users.models import Profile
+
+User = get_user_model()
+
+PASSWORD = "benchmark-password"
+
+
+class Command(BaseCommand):
+    help = "Count the database writes caused by each login and profile update"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument(
+            "--iterations", type=int, default=50, help="Calls per scenario"
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--keepdb", action="store_true")
+        parser.add_argument("--output", help="Path of the JSON results file")
+
+    def handle(self, *args, **options):
+        with benchmark_database(keepdb=options["keepdb"]):
+            results = self.run(options)
+
+        self.stdout.write(format_results(results))
+        for scenario, result in results.items():
+            writes = ", ".join(
+                f"{statement} x{count:.2f}"
+                for statement, count in result["writes_by_statement"].items()
+            )
+            self.stdout.write(
+                f"{scenario}: {result['writes_per_call']:.2f} writes per call"
+                + (f" ({writes})" if writes else "")
+            )
+
+        parameters = {key: options[key] for key in ("users", "iterations", "seed")}
+        path = write_results("login_writes", results, parameters, options["output"])
+        self.stdout.write(self.style.SUCCESS(f"Results written to {path}"))
+
+    def seed(self, users):
+        password = make_password(PASSWORD)
+        User.objects.bulk_create(
+            User(
+                username=f"bench-login-{i}",
+                email=f"bench-login-{i}@example.com",
+                first_name="Bench",
+                last_name=f"Login {i}",
+                password=password,
+            )
+            for i in range(users)
+        )
+        created = list(User.objects.filter(username__startswith="bench-login-"))
+        Profile.objects.bulk_create(Profile(user=user) for user in created)
+        # Logins require a verified email outside of DEBUG
+        EmailAddress.objects.bulk_create(
+            EmailAddress(user=user, email=user.email, verified=True, primary=True)
+            for user in created
+        )
+        return created
+
+    def run(self, options):
+        self.stdout.write("Seeding benchmark dataset...")
+        users = self.seed(options["users"])
+
+        rng = random.Random(options["seed"])
+        client = Client(raise_request_exception=False)
+        # Password hashing dominates login latency, allocations are not of interest
+        recorder = BenchmarkRecorder(trace_allocations=False)
+        writes = {}
+
+        def call(scenario, method, path, expected, **kwargs):
+            counter = WriteCounter()
+            with recorder.measure(scenario) as sample, ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(counter))
+                response = getattr(client, method)(
+                    path, content_type="application/json", **kwargs
+                )
+                sample["ok"] = response.status_code == expected
+            writes.setdefault(scenario, []).append(counter.writes)
+
+        self.stdout.write("Running scenarios...")
+        for _ in range(options["iterations"]):
+            user = rng.choice(users)
+            credentials = {"email": user.email, "password": PASSWORD}
+            call("user_login", "post", "/api/user/login/", 200, data=credentials)
+            call(
+                "auth_login",
+                "post",
+                "/api/auth/login/",
+                200,
+                data={"username": user.username, **credentials},
+            )
+
+            token = f"Bearer {RefreshToken.for_user(user).access_token}"
+            bio = f"Bio {rng.random()}"
+            for scenario in ("profile_update", "profile_update_unchanged"):
+                call(
+                    scenario,
+                    "patch",
+                    "/api/user/profile/",
+                    200,
+                    data={"bio": bio},
+                    HTTP_AUTHORIZATION=token,
+                )
+
+        results = recorder.summary()
+        for scenario, samples in writes.items():
+            statements = {}
+            for sample in samples:
+                for statement, count in sample.items():
+                    statements[statement] = statements.get(statement, 0) + count
+            results[scenario]["writes_per_call"] = sum(statements.values()) / len(
+                samples
+            )
+            results[scenario]["writes_by_statement"] = {
+                statement: count / len(samples)
+                for statement, count in sorted(statements.items())
+            }
+        return results
@@ -0,0 +1,103 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from users.models import Address
+
+
+class Command(BaseCommand):
+    help = (
+        "Fingerprint addresses created before address deduplication and merge "
+        "duplicates of the same user into their oldest row"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report duplicates found within each batch without writing anything",
+        )
+
+    def handle(self, *args, **options):
+        # Foreign keys to be repointed from a duplicate to the row it is merged into
+        self.relations = [
+            relation
+            for relation in Address._meta.related_objects
+            if relation.one_to_many or relation.one_to_one
+        ]
+
+        fingerprinted = merged = 0
+        last_id = 0
+
+        while True:
+            with transaction.atomic():
+                addresses = list(
+                    Address.objects.select_for_update()
+                    .filter(fingerprint__isnull=True, id__gt=last_id)
+                    .order_by("id")[: options["batch_size"]]
+                )
+                if not addresses:
+                    break
+                last_id = addresses[-1].id
+
+                kept, duplicates = self.process_batch(addresses, options["dry_run"])
+                fingerprinted += kept
+                merged += duplicates
+
+            self.stdout.write(
+                f"Up to address {last_id}: {fingerprinted} fingerprinted, {merged} merged"
+            )
+
+        message = f"{fingerprinted} addresses fingerprinted, {merged} duplicates merged"
+        if options["dry_run"]:
+            message += " (dry run)"
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def process_batch(self, addresses, dry_run):
+        for address in addresses:
+            address.fingerprint = Address.make_fingerprint(
+                {field: getattr(address, field) for field in Address.FINGERPRINT_FIELDS}
+            )
+
+        # Rows fingerprinted by checkout or an earlier batch win over this batch
+        canonical = {
+            (user_id, fingerprint): address_id
+            for address_id, user_id, fingerprint in Address.objects.filter(
+                user_id__in={address.user_id for address in addresses},
+                fingerprint__in={address.fingerprint for address in addresses},
+            ).values_list("id", "user_id", "fingerprint")
+        }
+
+        kept = []
+        duplicates = {}
+        defaults = set()
+        for address in addresses:
+            key = (address.user_id, address.fingerprint)
+            if key not in canonical:
+                canonical[key] = address.id
+                kept.append(address)
+                continue
+
+            duplicates.setdefault(canonical[key], []).append(address.id)
+            if address.default:
+                defaults.add(canonical[key])
+
+        if dry_run:
+            return len(kept), sum(len(ids) for ids in duplicates.values())
+
+        for address_id, duplicate_ids in duplicates.items():
+            for relation in self.relations:
+                column = relation.field.attname
+                relation.related_model._base_manager.filter(
+                    **{f"{column}__in": duplicate_ids}
+                ).update(**{column: address_id})
+
+        Address.objects.filter(
+            id__in=[
+                duplicate_id for ids in duplicates.values() for duplicate_id in ids
+            ]
+        ).delete()
+        Address.objects.filter(id__in=defaults).update(default=True)
+        Address.objects.bulk_update(kept, ["fingerprint"], batch_size=500)
+
+        return len(kept), sum(len(ids) for ids in duplicates.values())
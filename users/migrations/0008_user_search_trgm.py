@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.db import migrations
+
+from config.db.operations import AddTrigramIndex
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('users', '0007_address_created_idx'),
+    ]
+
+    operations = [
+        AddTrigramIndex(model=settings.AUTH_USER_MODEL, field='email', name='user_email_trgm'),
+        AddTrigramIndex(model=settings.AUTH_USER_MODEL, field='username', name='user_username_trgm'),
+        AddTrigramIndex(model=settings.AUTH_USER_MODEL, field='first_name', name='user_first_name_trgm'),
+        AddTrigramIndex(model=settings.AUTH_USER_MODEL, field='last_name', name='user_last_name_trgm'),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:21
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_user_search_trgm'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='phonenumber',
+            name='security_code',
+        ),
+        migrations.RemoveField(
+            model_name='phonenumber',
+            name='sent',
+        ),
+    ]
@@ -1,26 +1,32 @@
-import datetime
+import hashlib
+import logging
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
 from django.utils import timezone
-from django.utils.crypto import get_random_string
 from django.utils.translation import gettext as _
 from django_countries.fields import CountryField
 from phonenumber_field.modelfields import PhoneNumberField
-from rest_framework.exceptions import NotAcceptable
+from redis.exceptions import RedisError
+from requests import RequestException
+from rest_framework.exceptions import NotAcceptable, Throttled
 from twilio.base.exceptions import TwilioRestException
-from twilio.rest import Client
+
+from config.http import get_twilio_client
+
+from .exceptions import VerificationUnavailableException
+from .otp import LOCKED, VERIFIED, get_otp_store
 
 User = get_user_model()
 
+logger = logging.getLogger(__name__)
+
 
 class PhoneNumber(models.Model):
     user = models.OneToOneField(User, related_name="phone", on_delete=models.CASCADE)
     phone_number = PhoneNumberField(unique=True)
-    security_code = models.CharField(max_length=120)
     is_verified = models.BooleanField(default=False)
-    sent = models.DateTimeField(null=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -31,62 +37,72 @@ class PhoneNumber(models.Model):
     def __str__(self):
         return self.phone_number.as_e164
 
-    def generate_security_code(self):
+    def send_confirmation(self):
         """
-        Returns a unique random `security_code` for given `TOKEN_LENGTH` in the settings.
-        Default token length = 6
+        Send a new security code by SMS, the code itself is only kept in Redis
         """
-        token_length = getattr(settings, "TOKEN_LENGTH", 6)
-        return get_random_string(token_length, allowed_chars="0123456789")
-
-    def is_security_code_expired(self):
-        expiration_date = self.sent + datetime.timedelta(
-            minutes=settings.TOKEN_EXPIRE_MINUTES
-        )
-        return expiration_date <= timezone.now()
-
-    def send_confirmation(self):
         twilio_account_sid = settings.TWILIO_ACCOUNT_SID
         twilio_auth_token = settings.TWILIO_AUTH_TOKEN
         twilio_phone_number = settings.TWILIO_PHONE_NUMBER
 
-        self.security_code = self.generate_security_code()
-
-        # print(
-        #     f'Sending security code {self.security_code} to phone {self.phone_number}')
+        if not all([twilio_account_sid, twilio_auth_token, twilio_phone_number]):
+            logger.warning("Twilio credentials are not set")
+            return
 
-        if all([twilio_account_sid, twilio_auth_token, twilio_phone_number]):
-            try:
-                twilio_client = Client(twilio_account_sid, twilio_auth_token)
-                twilio_client.messages.create(
-                    body=f"Your activation code is {self.security_code}",
-                    to=str(self.phone_number),
-                    from_=twilio_phone_number,
+        number = self.phone_number.as_e164
+        store = get_otp_store()
+        try:
+            if store.is_locked(number):
+                raise Throttled(
+                    detail=_("Too many wrong security codes, try again later.")
                 )
-                self.sent = timezone.now()
-                self.save()
-                return True
-            except TwilioRestException as e:
-                print(e)
-        else:
-            print("Twilio credentials are not set")
-
-    def check_verification(self, security_code):
-        if (
-            not self.is_security_code_expired()
-            and security_code == self.security_code
-            and not self.is_verified
-        ):
-            self.is_verified = True
-            self.save()
-        else:
+            security_code = store.issue(number)
+        except RedisError:
+            logger.exception("Storing the security code failed")
+            return
+
+        try:
+            twilio_client = get_twilio_client(twilio_account_sid, twilio_auth_token)
+            twilio_client.messages.create(
+                body=f"Your activation code is {security_code}",
+                to=number,
+                from_=twilio_phone_number,
+            )
+            return True
+        except (TwilioRestException, RequestException):
+            logger.exception("Sending confirmation SMS failed")
+            try:
+                store.discard(number)
+            except RedisError:
+                # The unsent code expires on its own
+                logger.warning("Discarding the security code failed", exc_info=True)
+
+    @classmethod
+    def check_verification(cls, phone_number, security_code):
+        """
+        Verify ``phone_number`` if ``security_code`` is the code sent to it.
+
+        Nothing is read from the database and a single UPDATE is made when
+        the code is right.
+        """
+        try:
+            result = get_otp_store().verify(phone_number.as_e164, security_code)
+        except RedisError:
+            logger.exception("Checking the security code failed")
+            raise VerificationUnavailableException()
+        if result == LOCKED:
+            raise Throttled(detail=_("Too many wrong security codes, try again later."))
+
+        if result != VERIFIED or not cls.objects.filter(
+            phone_number=phone_number, is_verified=False
+        ).update(is_verified=True, updated_at=timezone.now()):
             raise NotAcceptable(
                 _(
                     "Your security code is wrong, expired or this phone is verified before."
                 )
             )
 
-        return self.is_verified
+        return True
 
 
 class Profile(models.Model):
@@ -119,12 +135,52 @@ class Address(models.Model):
     street_address = models.CharField(max_length=100)
     apartment_address = models.CharField(max_length=100)
     postal_code = models.CharField(max_length=20, blank=True)
+    # Hash of the normalized content, identical addresses of a user share a row.
+    # Null until backfilled by the dedupe_addresses command.
+    fingerprint = models.CharField(max_length=64, null=True, editable=False)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    FINGERPRINT_FIELDS = (
+        "address_type",
+        "country",
+        "city",
+        "street_address",
+        "apartment_address",
+        "postal_code",
+    )
+
     class Meta:
         ordering = ("-created_at",)
+        indexes = [models.Index(fields=["created_at", "id"], name="address_created_idx")]
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "fingerprint"), name="unique_user_address_fingerprint"
+            ),
+        ]
 
     def __str__(self):
         return self.user.get_full_name()
+
+    @classmethod
+    def make_fingerprint(cls, data):
+        """
+        Hash the content of an address given as a dict, ignoring case and
+        whitespace differences
+        """
+        parts = []
+        for field in cls.FINGERPRINT_FIELDS:
+            value = str(data.get(field) or "").casefold()
+            separator = "" if field == "postal_code" else " "
+            parts.append(separator.join(value.split()))
+        return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+    def save(self, *args, **kwargs):
+        self.fingerprint = self.make_fingerprint(
+            {field: getattr(self, field) for field in self.FINGERPRINT_FIELDS}
+        )
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "fingerprint"}
+        super().save(*args, **kwargs)
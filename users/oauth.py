@@ -0,0 +1,279 @@
+"""
+Cached Google OpenID Connect discovery document and signing keys.
+
+allauth downloads Google's certificates on every social login that checks an
+``id_token`` signature. Here the discovery document and the JWKS it points to
+are cached for their ``Cache-Control: max-age``: in process memory and in
+Redis, so that one worker's download serves all of them. Copies are refreshed
+by a background thread before they expire, so logins do not wait on Google,
+and expired copies keep being served for up to ``STALE_SECONDS`` while Google
+cannot be reached.
+
+``GOOGLE_OPENID_CONFIGURATION_URL`` can point to a local stub server.
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+from functools import lru_cache
+
+import jwt
+import requests
+from allauth.socialaccount.providers.google.views import GoogleOAuth2Adapter
+from allauth.socialaccount.providers.oauth2.client import OAuth2Error
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from config.cache import get_redis
+
+logger = logging.getLogger(__name__)
+
+MAX_AGE_RE = re.compile(r"(?:^|,)\s*max-age\s*=\s*(\d+)", re.IGNORECASE)
+
+FETCH_TIMEOUT = 5
+# Used when a response has no max-age
+DEFAULT_MAX_AGE = 60 * 60
+# Copies are refreshed once this fraction of their lifetime has passed
+REFRESH_AHEAD = 0.8
+# How long expired copies are kept to be served when refreshing fails
+STALE_SECONDS = 60 * 60 * 6
+# Delay before retrying a failed or concurrent background refresh
+RETRY_SECONDS = 30
+# Minimum delay between refreshes forced by an unknown key id
+FORCED_REFRESH_SECONDS = 60
+
+
+def max_age(response):
+    """
+    Return how many seconds ``response`` may be cached, per ``Cache-Control``.
+    """
+    cache_control = response.headers.get("Cache-Control", "")
+    if "no-store" in cache_control or "no-cache" in cache_control:
+        return 0
+    match = MAX_AGE_RE.search(cache_control)
+    if match is None:
+        return DEFAULT_MAX_AGE
+    age = response.headers.get("Age", "0")
+    return max(int(match.group(1)) - (int(age) if age.isdigit() else 0), 0)
+
+
+class CachedDocument:
+    """
+    A JSON document fetched over HTTP and cached for its max-age.
+
+    ``url`` is a string or a callable returning one.
+    """
+
+    def __init__(self, name, url):
+        self.url = url
+        self.key = f"oauth:{name}"
+        self._entry = None
+        self._refreshing = threading.Lock()
+
+    @property
+    def redis(self):
+        return get_redis(settings.OAUTH_CACHE_REDIS_URL)
+
+    def get(self):
+        now = time.time()
+        entry = self._entry
+        if entry is None or entry["expires_at"] <= now:
+            # Another worker may have refreshed it already
+            entry = self._read() or entry
+
+        if entry is None:
+            # Nothing to serve yet, only the first login waits for Google
+            entry = self.refresh()
+        elif entry["refresh_at"] <= now:
+            # Expired copies are still served until the refresh succeeds
+            self.refresh_in_background()
+
+        if self._entry is None or self._entry["expires_at"] < entry["expires_at"]:
+            self._entry = entry
+        return entry["data"]
+
+    def refresh(self):
+        """
+        Download the document, store it and return the new cache entry.
+        """
+        url = self.url() if callable(self.url) else self.url
+        response = requests.get(url, timeout=FETCH_TIMEOUT)
+        response.raise_for_status()
+        data = response.json()
+
+        lifetime = max_age(response)
+        now = time.time()
+        entry = {
+            "data": data,
+            "refresh_at": now + lifetime * REFRESH_AHEAD,
+            "expires_at": now + lifetime,
+        }
+        try:
+            self.redis.set(
+                self.key, json.dumps(entry), ex=int(lifetime + STALE_SECONDS)
+            )
+        except RedisError:
+            logger.warning("Storing %s in Redis failed", self.key, exc_info=True)
+        self._entry = entry
+        logger.info("Refreshed %s", self.key, extra={"max_age": lifetime})
+        return entry
+
+    def refresh_in_background(self):
+        if not self._refreshing.acquire(blocking=False):
+            return
+        threading.Thread(
+            target=self._background_refresh, name=f"refresh {self.key}", daemon=True
+        ).start()
+
+    def _background_refresh(self):
+        try:
+            entry = self._read()
+            if entry is not None and entry["refresh_at"] > time.time():
+                self._entry = entry
+            elif self._claim():
+                self.refresh()
+            else:
+                self._postpone()
+        except Exception:
+            logger.warning("Refreshing %s failed", self.key, exc_info=True)
+            self._postpone()
+        finally:
+            self._refreshing.release()
+
+    def _postpone(self):
+        if self._entry is not None:
+            self._entry = {**self._entry, "refresh_at": time.time() + RETRY_SECONDS}
+
+    def _claim(self, lock="lock", seconds=RETRY_SECONDS):
+        """
+        Return whether this process should refresh the shared copy.
+        """
+        try:
+            return bool(self.redis.set(f"{self.key}:{lock}", 1, nx=True, ex=seconds))
+        except RedisError:
+            return True
+
+    def _read(self):
+        try:
+            value = self.redis.get(self.key)
+        except RedisError:
+            logger.warning("Reading %s from Redis failed", self.key, exc_info=True)
+            return None
+        return json.loads(value) if value else None
+
+
+@lru_cache(maxsize=32)
+def load_jwk(jwk):
+    """
+    Return the public key of a JWK given as JSON.
+    """
+    return jwt.PyJWK.from_json(jwk).key
+
+
+class GoogleSigningKeys:
+    """
+    Google's ID token signing keys, found through the discovery document.
+    """
+
+    def __init__(self):
+        self.discovery = CachedDocument(
+            "google:openid-configuration",
+            lambda: settings.GOOGLE_OPENID_CONFIGURATION_URL,
+        )
+        self.jwks = CachedDocument(
+            "google:jwks", lambda: self.discovery.get()["jwks_uri"]
+        )
+        self._forced_refresh_at = 0
+        self._forcing = threading.Lock()
+
+    def find(self, jwks, kid):
+        for jwk in jwks.get("keys", ()):
+            if jwk.get("kid") == kid:
+                return load_jwk(json.dumps(jwk, sort_keys=True)), jwk.get("alg", "RS256")
+        return None
+
+    def get(self, kid):
+        """
+        Return the public key with id ``kid`` and its algorithm, or ``None``.
+
+        An unknown id may be a key Google just started to use, so the key set
+        is downloaded again, see ``force_refresh``.
+        """
+        key = self.find(self.jwks.get(), kid)
+        if key is None:
+            entry = self.force_refresh()
+            if entry is not None:
+                key = self.find(entry["data"], kid)
+        return key
+
+    def force_refresh(self):
+        """
+        Download the key set again and return the new cache entry.
+
+        Only one thread of one worker downloads it per ``FORCED_REFRESH_SECONDS``
+        and the others do not wait for it: workers that lose the Redis lock
+        return the shared copy, other threads and later calls return ``None``.
+        """
+        if not self._forcing.acquire(blocking=False):
+            return None
+        try:
+            if time.time() - self._forced_refresh_at <= FORCED_REFRESH_SECONDS:
+                return None
+            self._forced_refresh_at = time.time()
+            if self.jwks._claim("forced", FORCED_REFRESH_SECONDS):
+                return self.jwks.refresh()
+            return self.jwks._read()
+        finally:
+            self._forcing.release()
+
+    def decode(self, credential, issuer, audience, verify_signature=True):
+        """
+        Validate an ``id_token`` like allauth does and return its claims.
+        """
+        try:
+            if verify_signature:
+                found = self.get(jwt.get_unverified_header(credential).get("kid"))
+                if found is None:
+                    raise OAuth2Error("Invalid 'kid'")
+                key, algorithm = found
+                algorithms = [algorithm]
+            else:
+                key = ""
+                algorithms = None
+            return jwt.decode(
+                credential,
+                key=key,
+                options={
+                    "verify_signature": verify_signature,
+                    "verify_iss": True,
+                    "verify_aud": True,
+                    "verify_exp": True,
+                },
+                issuer=issuer,
+                audience=audience,
+                algorithms=algorithms,
+            )
+        except jwt.PyJWTError as e:
+            raise OAuth2Error("Invalid id_token") from e
+        except (requests.RequestException, ValueError) as e:
+            raise OAuth2Error("Google signing keys are unavailable") from e
+
+
+google_signing_keys = GoogleSigningKeys()
+
+
+class CachedGoogleOAuth2Adapter(GoogleOAuth2Adapter):
+    """
+    ``GoogleOAuth2Adapter`` checking ``id_token`` signatures with cached keys.
+    """
+
+    def _decode_id_token(self, app, id_token):
+        # Tokens fetched by the server itself over TLS need no signature check
+        return google_signing_keys.decode(
+            id_token,
+            issuer=self.id_token_issuer,
+            audience=app.client_id,
+            verify_signature=not self.did_fetch_access_token,
+        )
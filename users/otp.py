@@ -0,0 +1,101 @@
+"""
+One-time codes for phone number verification, kept in Redis.
+
+A code lives under ``otp:<number>`` and expires after
+``TOKEN_EXPIRE_MINUTES``. It is compared and deleted by one Lua script, so it
+can be used only once. Wrong codes are counted under ``otp:<number>:attempts``.
+After ``OTP_MAX_ATTEMPTS`` of them the code is dropped and the number is
+locked out for ``OTP_LOCKOUT_SECONDS``.
+"""
+
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.crypto import get_random_string
+
+from config.cache import get_redis
+
+# Results of OTPStore.verify
+VERIFIED = 1
+INVALID = 0
+LOCKED = -1
+
+
+def generate_code():
+    """
+    Return a random numeric code of ``TOKEN_LENGTH`` digits.
+    """
+    return get_random_string(settings.TOKEN_LENGTH, allowed_chars="0123456789")
+
+
+class OTPStore:
+    """
+    Codes and failed attempt counters of phone numbers, keyed by E.164 number.
+    """
+
+    # KEYS: code, attempts. ARGV: submitted code, max attempts, lockout seconds
+    VERIFY_SCRIPT = """
+    local max_attempts = tonumber(ARGV[2])
+    if tonumber(redis.call('GET', KEYS[2]) or '0') >= max_attempts then
+        return -1
+    end
+    local code = redis.call('GET', KEYS[1])
+    if code and code == ARGV[1] then
+        redis.call('DEL', KEYS[1], KEYS[2])
+        return 1
+    end
+    local attempts = redis.call('INCR', KEYS[2])
+    if attempts == 1 then
+        redis.call('EXPIRE', KEYS[2], ARGV[3])
+    end
+    if attempts >= max_attempts then
+        redis.call('DEL', KEYS[1])
+        return -1
+    end
+    return 0
+    """
+
+    def __init__(self):
+        self.redis = get_redis(settings.OTP_REDIS_URL)
+        self.ttl = settings.TOKEN_EXPIRE_MINUTES * 60
+        self.max_attempts = settings.OTP_MAX_ATTEMPTS
+        self.lockout = settings.OTP_LOCKOUT_SECONDS
+        self.verify_script = self.redis.register_script(self.VERIFY_SCRIPT)
+
+    def keys(self, number):
+        code = f"otp:{number}"
+        return code, f"{code}:attempts"
+
+    def is_locked(self, number):
+        _, attempts = self.keys(number)
+        return int(self.redis.get(attempts) or 0) >= self.max_attempts
+
+    def issue(self, number):
+        """
+        Store a new code for ``number``, replacing any previous one, and return it.
+        """
+        code_key, _ = self.keys(number)
+        code = generate_code()
+        self.redis.set(code_key, code, ex=self.ttl)
+        return code
+
+    def discard(self, number):
+        code_key, _ = self.keys(number)
+        self.redis.delete(code_key)
+
+    def verify(self, number, code):
+        """
+        Check ``code`` against the one issued to ``number``, consuming it on success.
+
+        Returns ``VERIFIED``, ``INVALID`` or ``LOCKED``.
+        """
+        return int(
+            self.verify_script(
+                keys=self.keys(number), args=[code, self.max_attempts, self.lockout]
+            )
+        )
+
+
+@lru_cache
+def get_otp_store():
+    return OTPStore()
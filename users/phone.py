@@ -0,0 +1,73 @@
+"""
+Cached phone number normalization.
+
+Parsing and validating a number with ``phonenumbers`` is CPU heavy and it
+happens on every login attempt, so the results are kept in a bounded LRU
+cache shared by the authentication backend and the serializers.
+"""
+
+from functools import lru_cache
+
+import phonenumbers
+from django.conf import settings
+from phonenumber_field.phonenumber import PhoneNumber
+from phonenumber_field.serializerfields import PhoneNumberField
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+CACHE_SIZE = 4096
+
+# No valid phone number is this long, even with formatting and an extension
+MAX_LENGTH = 64
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse(value, region):
+    try:
+        number = phonenumbers.parse(value, region)
+    except phonenumbers.NumberParseException:
+        return None
+    if not phonenumbers.is_valid_number(number):
+        return None
+    return number
+
+
+def parse_phone_number(value, region=None):
+    """
+    Return ``value`` as a valid ``PhoneNumber``, or ``None``.
+
+    Values that contain an ``@`` are email addresses and are never parsed.
+    A new instance is returned on every call, callers may modify it.
+    """
+    if not value or len(value) > MAX_LENGTH or "@" in value:
+        return None
+    number = _parse(value.strip(), region or settings.PHONENUMBER_DEFAULT_REGION)
+    if number is None:
+        return None
+    phone_number = PhoneNumber()
+    phone_number.merge_from(number)
+    return phone_number
+
+
+def normalize_phone_number(value, region=None):
+    """
+    Return ``value`` in E.164 format, or ``None`` if it is not a valid number.
+    """
+    number = parse_phone_number(value, region)
+    return number.as_e164 if number is not None else None
+
+
+class CachedPhoneNumberField(PhoneNumberField):
+    """
+    ``PhoneNumberField`` parsing its input through the normalization cache.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, PhoneNumber):
+            return super().to_internal_value(data)
+
+        value = serializers.CharField.to_internal_value(self, data)
+        phone_number = parse_phone_number(value, self.region)
+        if phone_number is None:
+            raise ValidationError(self.error_messages["invalid"])
+        return phone_number
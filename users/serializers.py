@@ -3,16 +3,18 @@ from django.conf import settings
 from django.contrib.auth import authenticate, get_user_model
 from django.utils.translation import gettext as _
 from django_countries.serializers import CountryFieldMixin
-from phonenumber_field.serializerfields import PhoneNumberField
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 
+from config.serializers import Computed, ExpandableFieldsMixin, ValuesSerializer, full_name
+
 from .exceptions import (
     AccountDisabledException,
     AccountNotRegisteredException,
     InvalidCredentialsException,
 )
 from .models import Address, PhoneNumber, Profile
+from .phone import CachedPhoneNumberField
 
 User = get_user_model()
 
@@ -25,7 +27,7 @@ class UserRegistrationSerializer(RegisterSerializer):
     username = None
     first_name = serializers.CharField(required=True, write_only=True)
     last_name = serializers.CharField(required=True, write_only=True)
-    phone_number = PhoneNumberField(
+    phone_number = CachedPhoneNumberField(
         required=False,
         write_only=True,
     )
@@ -63,13 +65,12 @@ class UserRegistrationSerializer(RegisterSerializer):
     def create_extra(self, user, validated_data):
         user.first_name = self.validated_data.get("first_name")
         user.last_name = self.validated_data.get("last_name")
-        user.save()
+        user.save(update_fields=["first_name", "last_name"])
 
         phone_number = validated_data.get("phone_number")
 
         if phone_number:
             PhoneNumber.objects.create(user=user, phone_number=phone_number)
-            user.phone.save()
 
     def custom_signup(self, request, user):
         self.create_extra(user, self.get_cleaned_data_extra())
@@ -88,7 +89,7 @@ class UserLoginSerializer(serializers.Serializer):
     Serializer to login users with email or phone number.
     """
 
-    phone_number = PhoneNumberField(required=False, allow_blank=True)
+    phone_number = CachedPhoneNumberField(required=False, allow_blank=True)
     email = serializers.EmailField(required=False, allow_blank=True)
     password = serializers.CharField(write_only=True, style={"input_type": "password"})
 
@@ -97,8 +98,8 @@ class UserLoginSerializer(serializers.Serializer):
 
         if email and password:
             user = authenticate(username=email, password=password)
-        elif str(phone_number) and password:
-            user = authenticate(username=str(phone_number), password=password)
+        elif phone_number and password:
+            user = authenticate(username=phone_number.as_e164, password=password)
         else:
             raise serializers.ValidationError(
                 _("Enter a phone number or an email and password.")
@@ -145,23 +146,25 @@ class PhoneNumberSerializer(serializers.ModelSerializer):
     Serializer class to serialize phone number.
     """
 
-    phone_number = PhoneNumberField()
+    phone_number = CachedPhoneNumberField()
 
     class Meta:
         model = PhoneNumber
         fields = ("phone_number",)
 
-    def validate_phone_number(self, value):
-        try:
-            queryset = User.objects.get(phone__phone_number=value)
-            if queryset.phone.is_verified:
-                err_message = _("Phone number is already verified")
-                raise serializers.ValidationError(err_message)
-
-        except User.DoesNotExist:
+    def validate(self, validated_data):
+        phone = PhoneNumber.objects.filter(
+            phone_number=validated_data["phone_number"]
+        ).first()
+        if phone is None:
             raise AccountNotRegisteredException()
+        if phone.is_verified:
+            raise serializers.ValidationError(
+                {"phone_number": [_("Phone number is already verified")]}
+            )
 
-        return value
+        validated_data["phone"] = phone
+        return validated_data
 
 
 class VerifyPhoneNumberSerialzier(serializers.Serializer):
@@ -169,23 +172,14 @@ class VerifyPhoneNumberSerialzier(serializers.Serializer):
     Serializer class to verify OTP.
     """
 
-    phone_number = PhoneNumberField()
+    phone_number = CachedPhoneNumberField()
     otp = serializers.CharField(max_length=settings.TOKEN_LENGTH)
 
-    def validate_phone_number(self, value):
-        queryset = User.objects.filter(phone__phone_number=value)
-        if not queryset.exists():
-            raise AccountNotRegisteredException()
-        return value
-
     def validate(self, validated_data):
-        phone_number = str(validated_data.get("phone_number"))
-        otp = validated_data.get("otp")
-
-        queryset = PhoneNumber.objects.get(phone_number=phone_number)
-
-        queryset.check_verification(security_code=otp)
-
+        # Unknown numbers have no code, they fail like a wrong code
+        PhoneNumber.check_verification(
+            validated_data["phone_number"], security_code=validated_data["otp"]
+        )
         return validated_data
 
 
@@ -203,6 +197,23 @@ class ProfileSerializer(serializers.ModelSerializer):
             "updated_at",
         )
 
+    def update(self, instance, validated_data):
+        """
+        Write only the fields that changed, and nothing if none did
+        """
+        changed = [
+            attr
+            for attr, value in validated_data.items()
+            if getattr(instance, attr) != value
+        ]
+        for attr in changed:
+            setattr(instance, attr, validated_data[attr])
+
+        if changed:
+            instance.save(update_fields=[*changed, "updated_at"])
+
+        return instance
+
 
 class AddressReadOnlySerializer(CountryFieldMixin, serializers.ModelSerializer):
     """
@@ -213,16 +224,30 @@ class AddressReadOnlySerializer(CountryFieldMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Address
-        fields = "__all__"
+        exclude = ("fingerprint",)
 
 
-class UserSerializer(serializers.ModelSerializer):
+class AddressValuesSerializer(ValuesSerializer):
+    """
+    ``AddressReadOnlySerializer`` output for lists, built from ``.values()`` rows
+    """
+
+    serializer_class = AddressReadOnlySerializer
+    mappers = {
+        "user": Computed(("user__first_name", "user__last_name"), full_name),
+    }
+
+
+class UserSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     """
     Serializer class to seralize User model
+
+    Profile, phone number and addresses are only included when requested
+    with ``?expand=``
     """
 
     profile = ProfileSerializer(read_only=True)
-    phone_number = PhoneNumberField(source="phone", read_only=True)
+    phone_number = CachedPhoneNumberField(source="phone", read_only=True)
     addresses = AddressReadOnlySerializer(read_only=True, many=True)
 
     class Meta:
@@ -237,6 +262,7 @@ class UserSerializer(serializers.ModelSerializer):
             "profile",
             "addresses",
         )
+        expandable_fields = ("profile", "phone_number", "addresses")
 
 
 class ShippingAddressSerializer(CountryFieldMixin, serializers.ModelSerializer):
@@ -250,7 +276,7 @@ class ShippingAddressSerializer(CountryFieldMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Address
-        fields = "__all__"
+        exclude = ("fingerprint",)
         read_only_fields = ("address_type",)
 
     def to_representation(self, instance):
@@ -271,7 +297,7 @@ class BillingAddressSerializer(CountryFieldMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Address
-        fields = "__all__"
+        exclude = ("fingerprint",)
         read_only_fields = ("address_type",)
 
     def to_representation(self, instance):
@@ -8,11 +8,11 @@ User = get_user_model()
 
 
 @receiver(post_save, sender=User)
-def create_profile(sender, instance, created, **kwargs):
-    if created:
+def create_profile(sender, instance, created, raw=False, **kwargs):
+    """
+    Create the profile of every new user, whatever created it (registration,
+    social login, admin, createsuperuser). Later saves of the user, such as
+    the last_login update of each login, write nothing here.
+    """
+    if created and not raw:
         Profile.objects.create(user=instance)
-
-
-@receiver(post_save, sender=User)
-def save_profile(sender, instance, **kwargs):
-    instance.profile.save()
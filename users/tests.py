@@ -0,0 +1,363 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+
+import fakeredis
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from jwt.algorithms import RSAAlgorithm
+from redis.exceptions import ConnectionError as RedisConnectionError
+from rest_framework.test import APITestCase
+
+from config.cache import _sync_clients
+from config.testing import ValuesParityMixin
+from orders.models import Order
+from users.admin import AddressAdminForm
+from users.models import Address, PhoneNumber, Profile
+from users.oauth import GoogleSigningKeys
+from users.otp import INVALID, LOCKED, VERIFIED, get_otp_store
+from users.serializers import AddressValuesSerializer
+
+User = get_user_model()
+
+
+class AddressValuesSerializerTests(ValuesParityMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        named = User.objects.create_user(
+            username="named", email="named@example.com", password="secret",
+            first_name="Meera", last_name="Iyer",
+        )
+        unnamed = User.objects.create_user(
+            username="unnamed", email="unnamed@example.com", password="secret"
+        )
+        Address.objects.create(
+            user=named,
+            address_type=Address.SHIPPING,
+            default=True,
+            country="IN",
+            city="Pune",
+            street_address="1 Test Street",
+            apartment_address="Flat 2",
+            postal_code="411001",
+        )
+        # Blank country and postal code, no fingerprint yet
+        Address.objects.create(
+            user=unnamed,
+            address_type=Address.BILLING,
+            country="",
+            city="Nowhere",
+            street_address="",
+            apartment_address="",
+        )
+
+        cls.contexts = {
+            "without request": {},
+            "with request": {"request": RequestFactory().get("/api/user/addresses/")},
+        }
+
+    def test_addresses(self):
+        queryset = Address.objects.select_related("user")
+        for label, context in self.contexts.items():
+            with self.subTest(label):
+                data = self.assertValuesParity(queryset, AddressValuesSerializer, context)
+                self.assertEqual(len(data), 2)
+
+    def test_empty_list(self):
+        self.assertEqual(
+            self.assertValuesParity(Address.objects.none(), AddressValuesSerializer), []
+        )
+
+
+class AddressDeduplicationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="secret"
+        )
+        cls.other = User.objects.create_user(
+            username="other", email="other@example.com", password="secret"
+        )
+        cls.data = {
+            "address_type": Address.SHIPPING,
+            "country": "IN",
+            "city": "Pune",
+            "street_address": "1 Test Street",
+            "apartment_address": "Flat 2",
+            "postal_code": "411001",
+        }
+
+    def form(self, instance=None, **changes):
+        data = {"user": self.user.pk, **self.data, **changes}
+        return AddressAdminForm(data, instance=instance)
+
+    def test_admin_form_rejects_duplicates(self):
+        address = Address.objects.create(user=self.user, **self.data)
+
+        form = self.form(city="PUNE", postal_code="411 001")
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.non_field_errors().as_data()[0].code, "duplicate")
+
+        self.assertTrue(self.form(city="Mumbai").is_valid())
+        self.assertTrue(self.form(user=self.other.pk).is_valid())
+        # Saving an address unchanged is not a duplicate of itself
+        self.assertTrue(self.form(instance=address).is_valid())
+
+    def test_dedupe_merges_into_oldest_row(self):
+        def legacy(user, **changes):
+            address = Address.objects.create(user=user, **{**self.data, **changes})
+            Address.objects.filter(pk=address.pk).update(fingerprint=None)
+            return address
+
+        copy = legacy(self.user, city=" pune ")
+        moved = legacy(self.user, city="Mumbai")
+        moved_copy = legacy(self.user, city="MUMBAI", default=True)
+        unrelated = legacy(self.other)
+        # Fingerprinted by a checkout, wins over the older unfingerprinted copy
+        checked_out = Address.objects.create(user=self.user, **self.data)
+
+        order = Order.objects.create(
+            buyer=self.user, shipping_address=copy, billing_address=moved_copy
+        )
+
+        call_command("dedupe_addresses", batch_size=2, stdout=StringIO())
+
+        self.assertEqual(
+            set(Address.objects.values_list("pk", flat=True)),
+            {checked_out.pk, moved.pk, unrelated.pk},
+        )
+        self.assertFalse(Address.objects.filter(fingerprint__isnull=True).exists())
+        order.refresh_from_db()
+        self.assertEqual(order.shipping_address_id, checked_out.pk)
+        self.assertEqual(order.billing_address_id, moved.pk)
+        moved.refresh_from_db()
+        self.assertTrue(moved.default)
+
+    def test_dedupe_dry_run_writes_nothing(self):
+        for city in ("Pune", "PUNE"):
+            address = Address.objects.create(user=self.user, **{**self.data, "city": city})
+            Address.objects.filter(pk=address.pk).update(fingerprint=None)
+
+        stdout = StringIO()
+        call_command("dedupe_addresses", dry_run=True, stdout=stdout)
+
+        self.assertIn("1 addresses fingerprinted, 1 duplicates merged", stdout.getvalue())
+        self.assertEqual(Address.objects.filter(fingerprint__isnull=True).count(), 2)
+
+
+class ProfileCreationTests(APITestCase):
+    def test_every_new_user_gets_a_profile(self):
+        user = User.objects.create_user(
+            username="plain", email="plain@example.com", password="secret"
+        )
+        admin = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="secret"
+        )
+        self.assertTrue(Profile.objects.filter(user=user).exists())
+        self.assertTrue(Profile.objects.filter(user=admin).exists())
+
+    def test_registration_creates_one_profile(self):
+        response = self.client.post(
+            "/api/user/register/",
+            {
+                "email": "new@example.com",
+                "first_name": "New",
+                "last_name": "User",
+                "password1": "a-Long-passw0rd",
+                "password2": "a-Long-passw0rd",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(Profile.objects.filter(user__email="new@example.com").count(), 1)
+
+    def test_later_saves_do_not_write_the_profile(self):
+        user = User.objects.create_user(
+            username="plain", email="plain@example.com", password="secret"
+        )
+        with self.assertNumQueries(1):
+            user.save(update_fields=["last_login"])
+
+    def test_expanded_profile(self):
+        user = User.objects.create_user(
+            username="plain", email="plain@example.com", password="secret"
+        )
+        self.client.force_authenticate(user)
+        response = self.client.get("/api/user/", {"expand": "profile"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("profile", response.json())
+
+
+@override_settings(OTP_REDIS_URL="redis://otp-tests", OTP_MAX_ATTEMPTS=3)
+class OTPStoreTests(APITestCase):
+    number = "+919876500000"
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        _sync_clients["redis://otp-tests"] = self.redis
+        get_otp_store.cache_clear()
+        self.addCleanup(get_otp_store.cache_clear)
+        self.addCleanup(_sync_clients.pop, "redis://otp-tests")
+        self.store = get_otp_store()
+
+    def test_code_is_consumed_once(self):
+        code = self.store.issue(self.number)
+        self.assertEqual(self.store.verify(self.number, code), VERIFIED)
+        self.assertEqual(self.store.verify(self.number, code), INVALID)
+
+    def test_wrong_code_is_counted(self):
+        code = self.store.issue(self.number)
+        self.assertEqual(self.store.verify(self.number, "x" + code[1:]), INVALID)
+        self.assertEqual(self.redis.get(f"otp:{self.number}:attempts"), b"1")
+        self.assertGreater(self.redis.ttl(f"otp:{self.number}:attempts"), 0)
+        # The right code still works, and resets the counter
+        self.assertEqual(self.store.verify(self.number, code), VERIFIED)
+        self.assertFalse(self.redis.exists(f"otp:{self.number}:attempts"))
+
+    def test_lockout_after_max_attempts(self):
+        code = self.store.issue(self.number)
+        self.assertEqual(self.store.verify(self.number, "wrong"), INVALID)
+        self.assertEqual(self.store.verify(self.number, "wrong"), INVALID)
+        self.assertEqual(self.store.verify(self.number, "wrong"), LOCKED)
+
+        # The code is dropped, even the right one is refused now
+        self.assertFalse(self.redis.exists(f"otp:{self.number}"))
+        self.assertEqual(self.store.verify(self.number, code), LOCKED)
+        self.assertTrue(self.store.is_locked(self.number))
+
+    def test_check_verification_issues_one_update(self):
+        user = User.objects.create_user(
+            username="phone", email="phone@example.com", password="secret"
+        )
+        phone = PhoneNumber.objects.create(user=user, phone_number=self.number)
+        code = self.store.issue(self.number)
+
+        with self.assertNumQueries(1):
+            PhoneNumber.check_verification(phone.phone_number, code)
+        phone.refresh_from_db()
+        self.assertTrue(phone.is_verified)
+
+    def test_verify_without_redis(self):
+        with mock.patch.object(
+            self.store, "verify", side_effect=RedisConnectionError("down")
+        ):
+            response = self.client.post(
+                "/api/user/verify-phone/",
+                {"phone_number": self.number, "otp": "123456"},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 503)
+
+
+class StubGoogleHandler(BaseHTTPRequestHandler):
+    """
+    Serves the discovery document and the key set of ``StubGoogleServer``.
+    """
+
+    def do_GET(self):
+        server = self.server
+        if self.path == "/.well-known/openid-configuration":
+            document = {"jwks_uri": f"{server.url}/certs"}
+        elif self.path == "/certs":
+            with server.lock:
+                server.jwks_requests += 1
+            # Slow enough for concurrent logins to overlap
+            time.sleep(0.2)
+            document = {"keys": list(server.keys)}
+        else:
+            self.send_error(404)
+            return
+
+        body = json.dumps(document).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Cache-Control", "public, max-age=3600")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubGoogleServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubGoogleHandler)
+        self.url = f"http://127.0.0.1:{self.server_address[1]}"
+        self.keys = []
+        self.jwks_requests = 0
+        self.lock = threading.Lock()
+
+
+def make_jwk(kid):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(RSAAlgorithm.to_jwk(private_key.public_key()))
+    return {**jwk, "kid": kid, "alg": "RS256", "use": "sig"}
+
+
+@override_settings(
+    # Nothing listens there, every worker refreshes on its own
+    OAUTH_CACHE_REDIS_URL="redis://127.0.0.1:1/0",
+)
+class GoogleSigningKeysTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = StubGoogleServer()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.addClassCleanup(cls.server.server_close)
+        cls.addClassCleanup(cls.server.shutdown)
+        cls.old_key = make_jwk("old")
+        cls.new_key = make_jwk("new")
+
+    def setUp(self):
+        self.server.keys = [self.old_key]
+        self.server.jwks_requests = 0
+        settings_override = override_settings(
+            GOOGLE_OPENID_CONFIGURATION_URL=(
+                f"{self.server.url}/.well-known/openid-configuration"
+            )
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.signing_keys = GoogleSigningKeys()
+        self.assertIsNotNone(self.signing_keys.get("old"))
+        self.assertEqual(self.server.jwks_requests, 1)
+
+    def test_unknown_kid_refreshes_once(self):
+        self.server.keys = [self.old_key, self.new_key]
+        barrier = threading.Barrier(8)
+        found = []
+
+        def login():
+            barrier.wait()
+            found.append(self.signing_keys.get("new"))
+
+        threads = [threading.Thread(target=login) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # One download, the logins that did not make it failed without waiting
+        self.assertEqual(self.server.jwks_requests, 2)
+        self.assertEqual(sum(key is not None for key in found), 1)
+        self.assertIsNotNone(self.signing_keys.get("new"))
+
+        # Forged ids do not trigger more downloads
+        self.assertIsNone(self.signing_keys.get("forged"))
+        self.assertEqual(self.server.jwks_requests, 2)
+
+    def test_other_worker_refreshing(self):
+        self.server.keys = [self.old_key, self.new_key]
+        with mock.patch.object(self.signing_keys.jwks, "_claim", return_value=False):
+            self.assertIsNone(self.signing_keys.get("new"))
+        self.assertEqual(self.server.jwks_requests, 1)
@@ -1,8 +1,10 @@
-from allauth.socialaccount.providers.google.views import GoogleOAuth2Adapter
+import logging
+
 from allauth.socialaccount.providers.oauth2.client import OAuth2Client
 from dj_rest_auth.registration.views import RegisterView, SocialLoginView
 from dj_rest_auth.views import LoginView
 from django.contrib.auth import get_user_model
+from django.db.models import prefetch_related_objects
 from django.utils.translation import gettext as _
 from rest_framework import permissions, status
 from rest_framework.generics import (
@@ -14,10 +16,15 @@ from rest_framework.response import Response
 from rest_framework.viewsets import ReadOnlyModelViewSet
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from users.models import Address, PhoneNumber, Profile
+from config.db.routers import ReplicaReadMixin
+from config.serializers import ValuesListMixin, parse_field_list
+from products.cart import merge_anonymous_cart
+from users.models import Address, Profile
+from users.oauth import CachedGoogleOAuth2Adapter
 from users.permissions import IsUserAddressOwner, IsUserProfileOwner
 from users.serializers import (
     AddressReadOnlySerializer,
+    AddressValuesSerializer,
     PhoneNumberSerializer,
     ProfileSerializer,
     UserLoginSerializer,
@@ -28,6 +35,8 @@ from users.serializers import (
 
 User = get_user_model()
 
+logger = logging.getLogger(__name__)
+
 
 class UserRegisterationAPIView(RegisterView):
     """
@@ -79,10 +88,6 @@ class UserLoginAPIView(GenericAPIView):
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
-        print("request.data:", request.data)
-        print("serializer.is_valid():", serializer.is_valid())
-        if not serializer.is_valid():
-            print("serializer.errors:", serializer.errors)
         if serializer.is_valid():
             user = serializer.validated_data['user']
             
@@ -110,9 +115,12 @@ class UserLoginAPIView(GenericAPIView):
                     'date_joined': user.date_joined.isoformat(),
                 }
             }
+
+            merge_anonymous_cart(request, user)
             
             return Response(data, status=status.HTTP_200_OK)
-        
+
+        logger.info("Login failed", extra={"errors": serializer.errors})
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -128,15 +136,7 @@ class SendOrResendSMSAPIView(GenericAPIView):
 
         if serializer.is_valid():
             # Send OTP
-            phone_number = str(serializer.validated_data["phone_number"])
-
-            user = User.objects.filter(phone__phone_number=phone_number).first()
-
-            sms_verification = PhoneNumber.objects.filter(
-                user=user, is_verified=False
-            ).first()
-
-            sms_verification.send_confirmation()
+            serializer.validated_data["phone"].send_confirmation()
 
             return Response(status=status.HTTP_200_OK)
 
@@ -160,12 +160,28 @@ class VerifyPhoneNumberAPIView(GenericAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class GoogleLogin(SocialLoginView):
+class MergeCartLoginMixin:
+    """
+    dj_rest_auth login view mixin moving the anonymous cart into the user's
+    """
+
+    def login(self):
+        super().login()
+        merge_anonymous_cart(self.request, self.user)
+
+
+class TokenLoginView(MergeCartLoginMixin, LoginView):
+    """
+    dj_rest_auth's username or email and password login
+    """
+
+
+class GoogleLogin(MergeCartLoginMixin, SocialLoginView):
     """
     Social authentication with Google
     """
 
-    adapter_class = GoogleOAuth2Adapter
+    adapter_class = CachedGoogleOAuth2Adapter
     callback_url = "call_back_url"
     client_class = OAuth2Client
 
@@ -180,29 +196,59 @@ class ProfileAPIView(RetrieveUpdateAPIView):
     permission_classes = (IsUserProfileOwner,)
 
     def get_object(self):
-        return self.request.user.profile
+        # Users created before profiles were created on signup get theirs on
+        # first access
+        profile, _ = Profile.objects.get_or_create(user=self.request.user)
+        return profile
 
 
 class UserAPIView(RetrieveAPIView):
     """
     Get user details
+
+    ``?expand=profile,phone_number,addresses`` adds the related objects,
+    ``?fields=id,email`` restricts the response to the listed fields.
     """
 
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
-    def get_object(self):
-        return self.request.user
+    # Prefetch needed by each expansion
+    expand_prefetches = {
+        "profile": "profile",
+        "phone_number": "phone",
+        "addresses": "addresses",
+    }
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["expand"] = parse_field_list(self.request.query_params.get("expand"))
+        context["fields"] = parse_field_list(self.request.query_params.get("fields"))
+        return context
 
-class AddressViewSet(ReadOnlyModelViewSet):
+    def get_object(self):
+        user = self.request.user
+        context = self.get_serializer_context()
+        lookups = [
+            lookup
+            for name, lookup in self.expand_prefetches.items()
+            if name in context["expand"]
+            and (not context["fields"] or name in context["fields"])
+        ]
+        if lookups:
+            prefetch_related_objects([user], *lookups)
+        return user
+
+
+class AddressViewSet(ValuesListMixin, ReplicaReadMixin, ReadOnlyModelViewSet):
     """
     List and Retrieve user addresses
     """
 
     queryset = Address.objects.all()
     serializer_class = AddressReadOnlySerializer
+    values_serializer_class = AddressValuesSerializer
     permission_classes = (IsUserAddressOwner,)
 
     def get_queryset(self):